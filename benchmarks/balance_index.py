@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Measures the cost of one increase_balance call as the number of
+balances grows, with and without the balance index.
+Usage:
+$ python -m benchmarks.balance_index [calls]
+"""
+import contextlib
+import io
+import sys
+import time
+from cosmos_genesis_tinker import GenesisTinker
+
+SIZES = (1000, 10000, 100000, 500000)
+
+
+def balances_genesis(count):
+    """
+    Returns a genesis with count balances holding uatom
+    """
+    balances = [{'address': f'cosmos1{index:038d}',
+                 'coins': [{'denom': 'uatom', 'amount': '1000'}]}
+                for index in range(count)]
+    return {'app_state': {'bank': {
+        'balances': balances,
+        'supply': [{'denom': 'uatom', 'amount': str(1000 * count)}]}}}
+
+
+def per_call(count, calls, use_indexes):
+    """
+    Returns the time of the first increase_balance call on a genesis
+    with count balances and the average time of the following calls,
+    in seconds. Addresses are spread over the list.
+    """
+    gentink = GenesisTinker(use_indexes=use_indexes)
+    gentink.genesis = balances_genesis(count)
+    addresses = [f'cosmos1{(index * 7919) % count:038d}'
+                 for index in range(calls + 1)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        gentink.increase_balance(addresses[0], 1)
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        for address in addresses[1:]:
+            gentink.increase_balance(address, 1)
+        return first, (time.perf_counter() - start) / calls
+
+
+def main(calls=50):
+    """
+    Prints the per call cost for every size in SIZES.
+    The first indexed call includes building the index.
+    """
+    calls = int(calls)
+    print(f'{"balances":>10} {"scan":>12} {"index build":>12} '
+          f'{"index":>12} {"speedup":>8}')
+    for count in SIZES:
+        _, scan = per_call(count, calls, False)
+        build, index = per_call(count, calls, True)
+        print(f'{count:>10} {scan * 1e6:>10.1f}us {build * 1e6:>10.1f}us '
+              f'{index * 1e6:>10.1f}us {scan / index:>7.0f}x')
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
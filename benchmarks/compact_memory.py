@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+Compares the memory used by a genesis file parsed with the json module
+and as a compact tree (see compact_tree): the peak and retained
+resident memory of the parse, measured in a fresh process each, the
+parse time, and whether both trees save the same bytes.
+Without a genesis file, a synthetic one at the scale of cosmoshub-4
+is generated (see genesis_generator), with as many accounts as given.
+Returns 1 if the outputs differ.
+
+Usage:
+$ python -m benchmarks.compact_memory [--genesis genesis.json]
+      [--accounts 1000000]
+"""
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from hashlib import sha256
+import compact_tree
+from genesis_generator import PRESETS, generate_genesis
+from json_backend import get_backend
+
+MODES = ('json', 'compact')
+
+
+def resident_bytes():
+    """
+    Returns the current resident memory of this process, or the peak
+    where the current one can't be read
+    """
+    try:
+        with open('/proc/self/statm', 'r', encoding='ascii') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return peak_bytes()
+
+
+def peak_bytes():
+    """
+    Returns the peak resident memory of this process
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def measure(path, mode):
+    """
+    Parses the genesis file at path in the given mode and returns the
+    parse time, the peak and retained memory added by the parse and
+    the sha256 of the saved genesis
+    """
+    with open(path, 'rb') as file:
+        content = file.read()
+    before = resident_bytes()
+    start = time.perf_counter()
+    if mode == 'compact':
+        genesis = compact_tree.loads(content)
+        compact_tree.compact(genesis)
+    else:
+        genesis = json.loads(content)
+    seconds = time.perf_counter() - start
+    peak = peak_bytes() - before
+    retained = resident_bytes() - before
+    del content
+    shasum = sha256(get_backend().dumps(genesis)).hexdigest()
+    return seconds, peak, retained, shasum
+
+
+def compare(path):
+    """
+    Prints the parse time and memory of every mode for the genesis
+    file at path, returns False if the modes saved different bytes
+    """
+    print(f'Genesis file: {path} ({os.path.getsize(path) / 1e6:.1f} MB)')
+    print(f'{"mode":<8} {"parse":>8} {"peak":>10} {"retained":>10}  sha256')
+    context = multiprocessing.get_context('spawn')
+    shasums = set()
+    for mode in MODES:
+        # A fresh process per mode, so the peaks don't include each other
+        with concurrent.futures.ProcessPoolExecutor(
+                1, mp_context=context) as executor:
+            seconds, peak, retained, shasum = \
+                executor.submit(measure, path, mode).result()
+        shasums.add(shasum)
+        print(f'{mode:<8} {seconds:>7.2f}s {peak / 1e6:>8.1f}MB '
+              f'{retained / 1e6:>8.1f}MB  {shasum[:16]}')
+    return len(shasums) == 1
+
+
+def main(argv=None):
+    """
+    Compares the modes on the given or a generated genesis file
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--genesis')
+    parser.add_argument('--accounts', type=int, default=1000000)
+    args = parser.parse_args(argv)
+
+    if args.genesis is not None:
+        return 0 if compare(args.genesis) else 1
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'genesis.json')
+        # The cosmoshub preset scaled to the number of accounts
+        preset = PRESETS['cosmoshub']
+        scale = args.accounts / preset['accounts']
+        generate_genesis(path, **{name: max(1, int(count * scale))
+                                  for name, count in preset.items()})
+        return 0 if compare(path) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Compares the JSON backends (see json_backend) on a genesis file:
+the best time of several runs of loads and dumps, and whether the
+output of each backend matches the json module byte for byte.
+Without a genesis file, a synthetic one is generated (see
+genesis_generator). Returns 1 if the outputs differ.
+
+Usage:
+$ python -m benchmarks.json_backends [--genesis genesis.json] [--runs 3]
+      [--accounts 100000]
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+from hashlib import sha256
+from genesis_generator import generate_genesis
+from json_backend import available_backends, get_backend
+
+
+def best_time(function, runs):
+    """
+    Returns the fastest of several runs of function, in seconds,
+    and the result of the last run
+    """
+    times = []
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def compare(path, runs=3):
+    """
+    Prints the load and save times of every backend for the genesis
+    file at path, returns False if a backend saved different bytes
+    """
+    with open(path, 'rb') as file:
+        content = file.read()
+    print(f'Genesis file: {path} ({len(content) / 1e6:.1f} MB)')
+    print(f'{"backend":<10} {"loads":>9} {"dumps":>9}  sha256')
+
+    shasums = set()
+    baseline = None
+    for name in reversed(available_backends()):
+        backend = get_backend(name)
+        loads, genesis = best_time(lambda: backend.loads(content), runs)
+        dumps, output = best_time(lambda: backend.dumps(genesis), runs)
+        del genesis
+        shasum = sha256(output).hexdigest()
+        shasums.add(shasum)
+        if baseline is None:
+            baseline = (loads, dumps)
+        print(f'{name:<10} {loads:>8.3f}s {dumps:>8.3f}s  {shasum[:16]} '
+              f'({baseline[0] / loads:.1f}x, {baseline[1] / dumps:.1f}x)')
+    return len(shasums) == 1
+
+
+def main(argv=None):
+    """
+    Compares the backends on the given or a generated genesis file
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--genesis')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--accounts', type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    if args.genesis is not None:
+        return 0 if compare(args.genesis, args.runs) else 1
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'genesis.json')
+        generate_genesis(path, accounts=args.accounts,
+                         balances=args.accounts)
+        return 0 if compare(path, args.runs) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Compares loading a genesis file without a snapshot (cold start)
+and from its snapshot (warm start).
+Usage:
+$ python -m benchmarks.snapshot_cache [genesis file] [runs]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from snapshot_cache import SnapshotCache
+
+
+def best_time(function, runs):
+    """
+    Returns the fastest of several runs of function, in seconds
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(path='tests/fresh_genesis.json', runs=5):
+    """
+    Prints the cold and warm load times for the genesis file at path
+    """
+    runs = int(runs)
+    size = os.path.getsize(path)
+
+    def json_load():
+        with open(path, 'r', encoding='utf8') as file:
+            json.load(file)
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SnapshotCache(directory)
+        cold = best_time(json_load, runs)
+        populate = best_time(lambda: cache.load(path), 1)
+        assert cache.last_status == 'miss'
+        warm = best_time(lambda: cache.load(path), runs)
+        assert cache.last_status == 'hit'
+        snapshot_size = cache.size()
+
+    print(f'Genesis file:   {path} ({size / 1e6:.1f} MB)')
+    print(f'Snapshot:       {snapshot_size / 1e6:.1f} MB')
+    print(f'json.load:      {cold:.3f}s')
+    print(f'First load:     {populate:.3f}s (parse and write snapshot)')
+    print(f'Snapshot load:  {warm:.3f}s ({cold / warm:.1f}x faster)')
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
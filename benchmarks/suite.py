@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+"""
+Runs every GenesisTinker operation against synthetic genesis files of
+increasing size (see genesis_generator) and records the best time of
+several runs and the peak of traced memory of each one.
+
+Results are saved as JSON and CSV. With a baseline, the run fails when
+an operation is slower or uses more memory than the baseline allows.
+Timings depend on the machine, so a baseline should be saved on the
+machine that is compared against it; traced memory does not.
+
+Usage:
+$ python -m benchmarks.suite [--sizes 1000,10000] [--repeat 3]
+      [--report report.json] [--csv report.csv]
+      [--baseline baseline.json] [--save-baseline]
+      [--max-slowdown 1.5] [--max-memory-growth 1.2]
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import marshal
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from cosmos_genesis_tinker import GenesisTinker, Delegator, Validator
+from genesis_generator import MODULE_ACCOUNTS, bech32, generate_genesis
+
+SIZES = (1000, 10000, 100000)
+OPERATIONS = ('replace_validator', 'replace_delegator', 'increase_balance',
+              'increase_validator_stake',
+              'increase_delegator_stake_to_validator', 'create_coin',
+              'load_file', 'save_file', 'run_tasks')
+# Differences below this are measurement noise
+MIN_SECONDS = 0.001
+MIN_MEMORY = 1 << 16
+
+
+def size_counts(accounts):
+    """
+    Returns the generator counts of a genesis with the given accounts
+    """
+    return {'accounts': accounts,
+            'balances': accounts,
+            'delegations': accounts * 6 // 5,
+            'starting_infos': accounts * 6 // 5,
+            'validators': min(200, accounts // 10),
+            'max_validators': min(180, accounts // 20),
+            'denoms': 20,
+            'ibc_packets': accounts // 10}
+
+
+class Context:  # pylint: disable=R0902,R0903
+    """
+    Genesis file of one size and the entities the operations act on
+    """
+
+    def __init__(self, directory, accounts, seed=0):
+        self.directory = directory
+        self.genesis_file = os.path.join(directory, f'genesis_{accounts}.json')
+        generate_genesis(self.genesis_file, seed, **size_counts(accounts))
+        self.genesis_bytes = os.path.getsize(self.genesis_file)
+        with open(self.genesis_file, 'rb') as file:
+            genesis = json.load(file)
+        self.snapshot = marshal.dumps(genesis)
+
+        # A bonded validator whose operator account has a public key,
+        # the operator of validator n is account n
+        app_state = genesis['app_state']
+        accounts = app_state['auth']['accounts'][len(MODULE_ACCOUNTS):]
+        consensus = genesis['consensus']['validators']
+        index = next(index for index in range(len(consensus))
+                     if accounts[index]['pub_key'] is not None)
+        operator = accounts[index]
+        validator = app_state['staking']['validators'][index]
+        self.validator = Validator()
+        self.validator.self_delegation_address = operator['address']
+        self.validator.self_delegation_public_key = operator['pub_key']['key']
+        self.validator.operator_address = validator['operator_address']
+        self.validator.public_key = validator['consensus_pubkey']['key']
+        self.validator.address = consensus[index]['address']
+        self.validator.consensus_address = \
+            app_state['slashing']['signing_infos'][index]['address']
+
+        # The operator is also the first delegator of its validator
+        self.delegator = Delegator()
+        self.delegator.address = self.validator.self_delegation_address
+        self.delegator.public_key = self.validator.self_delegation_public_key
+
+        self.new_validator = Validator()
+        self.new_validator.self_delegation_address = bech32('cosmos', b'v' * 20)
+        self.new_validator.self_delegation_public_key = 'A' + 'v' * 43
+        self.new_validator.operator_address = bech32('cosmosvaloper',
+                                                     b'v' * 20)
+        self.new_validator.public_key = 'V' * 43 + '='
+        self.new_validator.address = 'AB' * 20
+        self.new_validator.consensus_address = bech32('cosmosvalcons',
+                                                      b'\xab' * 20)
+        self.new_delegator = Delegator()
+        self.new_delegator.address = bech32('cosmos', b'd' * 20)
+        self.new_delegator.public_key = 'A' + 'd' * 43
+
+    def tinker(self, loaded=True):
+        """
+        Returns a GenesisTinker for the genesis file, with a fresh copy
+        of the parsed genesis if loaded is set
+        """
+        tinker = GenesisTinker(
+            input_file=self.genesis_file,
+            output_file=os.path.join(self.directory, 'tinkered.json'),
+            preprocessing_file=os.path.join(self.directory,
+                                            'preprocessing.json'))
+        if loaded:
+            tinker.load_genesis(marshal.loads(self.snapshot))
+        return tinker
+
+
+def operation(name, context):
+    """
+    Returns the operation with the given name on a new tinker, the
+    preparation of the tinker is not part of the operation
+    """
+    increase = {'amount': 1000000, 'denom': 'uatom'}
+    if name == 'load_file':
+        tinker = context.tinker(loaded=False)
+        return lambda: tinker.load_file(context.genesis_file)
+    if name == 'replace_validator':
+        tinker = context.tinker(loaded=False)
+        return lambda: tinker.replace_validator(context.validator,
+                                                context.new_validator)
+    if name == 'replace_delegator':
+        tinker = context.tinker(loaded=False)
+        return lambda: tinker.replace_delegator(context.delegator,
+                                                context.new_delegator)
+    if name == 'run_tasks':
+        tinker = context.tinker(loaded=False)
+        tinker.add_task(tinker.replace_validator,
+                        old_validator=context.validator,
+                        new_validator=context.new_validator)
+        tinker.add_task(tinker.increase_balance,
+                        address=context.new_validator.self_delegation_address,
+                        amount=1000)
+        tinker.add_task(tinker.increase_validator_stake,
+                        operator_address=context.new_validator.operator_address,
+                        increase=1000000)
+        return tinker.run_tasks
+
+    tinker = context.tinker()
+    if name == 'increase_balance':
+        return lambda: tinker.increase_balance(context.delegator.address, 1000)
+    if name == 'increase_validator_stake':
+        return lambda: tinker.increase_validator_stake(
+            context.validator.operator_address, 1000000)
+    if name == 'increase_delegator_stake_to_validator':
+        return lambda: tinker.increase_delegator_stake_to_validator(
+            context.delegator, context.validator, increase)
+    if name == 'create_coin':
+        return lambda: tinker.create_coin('ubenchmark', '1000')
+    if name == 'save_file':
+        return lambda: tinker.save_file(os.path.join(context.directory,
+                                                     'saved.json'))
+    raise Exception('Unknown operation', name)
+
+
+def measure(name, context, repeat):
+    """
+    Returns the best time of repeat runs of an operation, in seconds,
+    and the peak of memory traced during one more run, in bytes
+    """
+    times = []
+    for _ in range(repeat):
+        run = operation(name, context)
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    run = operation(name, context)
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(times), peak - start
+
+
+def run_suite(directory, sizes=SIZES, operations=OPERATIONS, repeat=3,
+              seed=0):
+    """
+    Returns the results of every operation on a genesis of every size
+    """
+    results = []
+    for accounts in sizes:
+        with contextlib.redirect_stdout(io.StringIO()):
+            context = Context(directory, accounts, seed)
+        for name in operations:
+            with contextlib.redirect_stdout(io.StringIO()):
+                seconds, memory_peak = measure(name, context, repeat)
+            results.append({'accounts': accounts,
+                            'genesis_bytes': context.genesis_bytes,
+                            'operation': name,
+                            'seconds': round(seconds, 6),
+                            'memory_peak': memory_peak})
+    return results
+
+
+def compare(results, baseline, max_slowdown=1.5, max_memory_growth=1.2):
+    """
+    Returns a description of every result that regressed from the
+    result of the same operation and size in baseline
+    """
+    expected = {(result['accounts'], result['operation']): result
+                for result in baseline}
+    regressions = []
+    for result in results:
+        old = expected.get((result['accounts'], result['operation']))
+        if old is None:
+            continue
+        case = f'{result["operation"]} with {result["accounts"]} accounts'
+        if result['seconds'] > old['seconds'] * max_slowdown and \
+                result['seconds'] - old['seconds'] > MIN_SECONDS:
+            regressions.append(f'{case}: {result["seconds"]:.6f}s, '
+                               f'baseline {old["seconds"]:.6f}s')
+        if result['memory_peak'] > old['memory_peak'] * max_memory_growth \
+                and result['memory_peak'] - old['memory_peak'] > MIN_MEMORY:
+            regressions.append(f'{case}: {result["memory_peak"]} bytes, '
+                               f'baseline {old["memory_peak"]} bytes')
+    return regressions
+
+
+def write_report(results, path):
+    """
+    Saves results as JSON
+    """
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'python': sys.version.split()[0], 'results': results},
+                  file, indent=2)
+
+
+def write_csv(results, path):
+    """
+    Saves results as CSV
+    """
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def read_results(path):
+    """
+    Returns the results saved in a JSON report
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)['results']
+
+
+def main(argv=None):
+    """
+    Runs the suite, saves the report and compares it with the baseline.
+    Returns 1 if an operation regressed.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)))
+    parser.add_argument('--operations', default=','.join(OPERATIONS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--report', default='benchmark_report.json')
+    parser.add_argument('--csv', default='benchmark_report.csv')
+    parser.add_argument('--baseline', default='benchmark_baseline.json')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--max-slowdown', type=float, default=1.5)
+    parser.add_argument('--max-memory-growth', type=float, default=1.2)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = run_suite(directory,
+                            [int(size) for size in args.sizes.split(',')],
+                            args.operations.split(','), args.repeat,
+                            args.seed)
+
+    print(f'{"operation":<40} {"accounts":>9} {"time":>11} {"memory":>10}')
+    for result in results:
+        print(f'{result["operation"]:<40} {result["accounts"]:>9} '
+              f'{result["seconds"] * 1e3:>9.2f}ms '
+              f'{result["memory_peak"] / 1e6:>8.2f}MB')
+    write_report(results, args.report)
+    write_csv(results, args.csv)
+
+    if args.save_baseline:
+        write_report(results, args.baseline)
+        print(f'Baseline saved to {args.baseline}')
+        return 0
+    if not os.path.isfile(args.baseline):
+        print(f'No baseline at {args.baseline}')
+        return 0
+    regressions = compare(results, read_results(args.baseline),
+                          args.max_slowdown, args.max_memory_growth)
+    for regression in regressions:
+        print('Regression: ' + regression)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
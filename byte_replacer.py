@@ -0,0 +1,294 @@
+"""
+Byte Replacer
+
+This module provides a multi-pattern byte replacement engine used by
+the byte phase of the Genesis Tinker.
+
+All old -> new pairs are compiled into a single alternation and the
+input is rewritten in one streaming pass, instead of one full rewrite
+of the file per pair.
+
+At every position the longest matching pattern wins and matching
+resumes after the replaced bytes. This gives the same output as
+applying the pairs one after the other with `sed 's%old%new%g'` as
+long as no old value is part of a later one or starts with the end of
+a later one, and no new value can form a later old value, alone or
+with the bytes around it.
+find_conflicts lists the pairs for which this does not hold.
+
+Large files can be split into shards that are replaced by a pool of
+worker processes. Shards end right after a byte that appears in none of
+the patterns, so no match can straddle two shards and the stitched
+output is identical to a sequential pass.
+"""
+
+import mmap
+import multiprocessing
+import os
+import re
+import tempfile
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+DEFAULT_SHARD_SIZE = 1 << 26
+# Bytes that are common in JSON and rare in replaced values
+SEPARATOR_CANDIDATES = b'\n, :"{}[]'
+
+
+class ByteReplacer:
+    """
+    Replaces every occurrence of a set of byte patterns in a single pass.
+    Keeps track of:
+    Bytes scanned
+    Replacements made per pattern
+    """
+
+    def __init__(self, pairs, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        pairs is an iterable of (old, new) tuples.
+        Strings are encoded as utf-8.
+        """
+        self._table = {}
+        for old, new in pairs:
+            old = _to_bytes(old)
+            new = _to_bytes(new)
+            if not old:
+                raise ValueError('Cannot replace an empty pattern')
+            if self._table.get(old, new) != new:
+                raise ValueError('Conflicting replacements for pattern',
+                                 old, self._table[old], new)
+            self._table[old] = new
+
+        if not self._table:
+            raise ValueError('At least one replacement pair is required')
+
+        # Longest patterns first so the alternation prefers them
+        patterns = sorted(self._table, key=len, reverse=True)
+        self._pattern = re.compile(b'|'.join(re.escape(old)
+                                             for old in patterns))
+        self._overlap = len(patterns[0]) - 1
+        self.chunk_size = max(chunk_size, 1)
+        self.bytes_scanned = 0
+        self.replacements = {old: 0 for old in self._table}
+
+    @property
+    def pairs(self):
+        """
+        Getter function for the (old, new) pairs
+        """
+        return list(self._table.items())
+
+    def report(self):
+        """
+        Returns the bytes scanned and the replacements made per pattern
+        """
+        return {
+            'bytes_scanned': self.bytes_scanned,
+            'replacements': {old.decode('utf-8', 'replace'): count
+                             for old, count in self.replacements.items()}
+        }
+
+    def replace(self, data: bytes):
+        """
+        Returns a copy of data with all patterns replaced
+        """
+        self.bytes_scanned += len(data)
+        output, _ = self._substitute(data, len(data))
+        return output
+
+    def replace_stream(self, source, target):
+        """
+        Reads source and writes the replaced bytes to target, one chunk
+        at a time. Both must be binary file objects.
+        """
+        carry = b''
+        while True:
+            chunk = source.read(self.chunk_size)
+            self.bytes_scanned += len(chunk)
+            buffer = carry + chunk
+            if not chunk:
+                output, _ = self._substitute(buffer, len(buffer))
+                target.write(output)
+                return self
+            # A match starting before the cutoff is complete in this buffer
+            cutoff = len(buffer) - self._overlap
+            if cutoff <= 0:
+                carry = buffer
+                continue
+            output, consumed = self._substitute(buffer, cutoff)
+            target.write(output)
+            carry = buffer[consumed:]
+
+    def replace_file(self, path: str, workers: int = 1,
+                     shard_size: int = DEFAULT_SHARD_SIZE):
+        """
+        Rewrites the file at path in place.
+        With more than one worker, the file is split into shards of about
+        shard_size bytes which are replaced in parallel.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        handle, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with open(path, 'rb') as source, os.fdopen(handle, 'wb') as target:
+                shards = self.shards(source, shard_size) if workers > 1 else []
+                if len(shards) > 1:
+                    self._replace_shards(path, shards, target, workers)
+                else:
+                    self.replace_stream(source, target)
+            os.chmod(tmp_path, os.stat(path).st_mode)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return self
+
+    def shards(self, source, shard_size: int = DEFAULT_SHARD_SIZE):
+        """
+        Returns (start, end) offsets splitting the file object source into
+        shards of at least shard_size bytes, each ending right after a
+        separator byte that none of the patterns contain.
+        Returns a single shard if there is no such byte.
+        """
+        size = os.fstat(source.fileno()).st_size
+        separator = self._separator()
+        if not size:
+            return []
+        if separator is None or size <= shard_size:
+            return [(0, size)]
+
+        shards = []
+        with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            while start < size:
+                position = data.find(separator, start + max(shard_size, 1) - 1)
+                end = size if position == -1 else position + 1
+                shards.append((start, end))
+                start = end
+        return shards
+
+    def _separator(self):
+        """
+        Returns a byte that none of the patterns contain, or None
+        """
+        used = set(b''.join(self._table))
+        for value in list(SEPARATOR_CANDIDATES) + list(range(256)):
+            if value not in used:
+                return bytes([value])
+        return None
+
+    def _replace_shards(self, path: str, shards, target, workers: int):
+        """
+        Replaces the shards of the file at path in a pool of worker
+        processes and writes the results to target in order
+        """
+        jobs = [(path, self.pairs, start, end) for start, end in shards]
+        with multiprocessing.Pool(min(workers, len(shards))) as pool:
+            for output, scanned, replacements in pool.imap(_replace_shard,
+                                                           jobs):
+                target.write(output)
+                self.bytes_scanned += scanned
+                for old, count in replacements.items():
+                    self.replacements[old] += count
+
+    def _substitute(self, buffer: bytes, cutoff: int):
+        """
+        Replaces all matches starting before cutoff.
+        Returns the output and the number of input bytes consumed.
+        """
+        pieces = []
+        position = 0
+        for match in self._pattern.finditer(buffer):
+            start = match.start()
+            if start >= cutoff:
+                break
+            old = match.group()
+            pieces.append(buffer[position:start])
+            pieces.append(self._table[old])
+            self.replacements[old] += 1
+            position = match.end()
+        consumed = max(position, cutoff)
+        pieces.append(buffer[position:consumed])
+        return b''.join(pieces), consumed
+
+
+def _replace_shard(job):
+    """
+    Worker process entry point: replaces one shard of a file.
+    Returns the output, the bytes scanned and the replacements made.
+    """
+    path, pairs, start, end = job
+    replacer = ByteReplacer(pairs)
+    with open(path, 'rb') as source, \
+            mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        output = replacer.replace(data[start:end])
+    return output, replacer.bytes_scanned, replacer.replacements
+
+
+def merge_pairs(pairs):
+    """
+    Returns the (old, new) byte pairs that applying pairs one after the
+    other actually performs:
+    No-op pairs are dropped
+    When the same old value appears more than once the first one wins,
+    since nothing is left for the later ones to replace
+    """
+    table = {}
+    for old, new in pairs:
+        old = _to_bytes(old)
+        new = _to_bytes(new)
+        if old != new and old not in table:
+            table[old] = new
+    return list(table.items())
+
+
+def find_conflicts(pairs):
+    """
+    Returns a list of messages describing the pairs that cannot be
+    applied in a single pass without changing the result of applying
+    them one after the other:
+    A new value that contains a later old value, or forms one with the
+    bytes around it (A -> B, B -> C chains)
+    An old value contained in a later, longer old value
+    An old value that starts with the end of a later old value
+    """
+    pairs = merge_pairs(pairs)
+    conflicts = []
+    for index, (old, new) in enumerate(pairs):
+        for later_old, later_new in pairs[index + 1:]:
+            if later_old in new or new in later_old or \
+                    _overlap(new, later_old) or _overlap(later_old, new):
+                conflicts.append(f'{_show(old)} -> {_show(new)} introduces '
+                                 f'{_show(later_old)} which is replaced '
+                                 f'with {_show(later_new)}')
+            if old in later_old:
+                conflicts.append(f'{_show(old)} is replaced before '
+                                 f'{_show(later_old)} which contains it')
+            elif _overlap(later_old, old):
+                conflicts.append(f'{_show(old)} is replaced before '
+                                 f'{_show(later_old)} which overlaps it')
+    return conflicts
+
+
+def _overlap(first: bytes, second: bytes):
+    """
+    Returns whether first ends with the start of second, without either
+    containing the other
+    """
+    return any(first.endswith(second[:size])
+               for size in range(1, min(len(first), len(second))))
+
+
+def _show(value):
+    """
+    Decodes a pattern for display
+    """
+    return value.decode('utf-8', 'replace')
+
+
+def _to_bytes(value):
+    """
+    Encodes strings as utf-8, leaves bytes as they are
+    """
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    return bytes(value)
@@ -0,0 +1,121 @@
+"""
+Cache Directory
+
+This module provides the on-disk storage shared by the download and
+snapshot caches.
+
+Every entry is a data file named after its key, with optional
+companion files using the same key and another suffix. Files are
+written to a temporary file and moved into place, so concurrent jobs
+never see a partial entry. The data file modification time records
+when the entry was last used, and once the cache grows past its size
+budget the least recently used entries are evicted.
+"""
+
+import contextlib
+import os
+import tempfile
+import time
+
+DEFAULT_MAX_BYTES = 20 << 30
+
+
+class CacheDirectory:
+    """
+    A directory of cache entries with a size budget.
+    Keeps track of:
+    The status of the last lookup: hit, revalidated or miss
+    """
+    data_suffix = '.data'
+    suffixes = ('.data',)
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.last_status = None
+        os.makedirs(directory, exist_ok=True)
+
+    def entries(self):
+        """
+        Returns (key, size, last used) for all entries,
+        least recently used first
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.data_suffix):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((name[:-len(self.data_suffix)], stat.st_size,
+                            stat.st_mtime_ns))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def size(self):
+        """
+        Returns the total size of the entries in bytes
+        """
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep: str = None):
+        """
+        Removes the least recently used entries until the cache fits
+        its size budget. The entry with key keep is never removed.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if key != keep:
+                self._remove(key)
+                total -= size
+
+    @contextlib.contextmanager
+    def _atomic_file(self, path: str):
+        """
+        Yields a binary file that replaces path once the block completes
+        """
+        handle, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as target:
+                yield target
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _open_entry(self, key: str):
+        """
+        Opens the data for key and marks it as recently used,
+        returns None if it was evicted in the meantime
+        """
+        path = self._path(key)
+        try:
+            source = open(path, 'rb')  # pylint: disable=R1732
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path, ns=(time.time_ns(), time.time_ns()))
+        except FileNotFoundError:
+            pass
+        return source
+
+    def _remove(self, key: str):
+        """
+        Removes all the files for key
+        """
+        for suffix in self.suffixes:
+            try:
+                os.remove(self._path(key, suffix))
+            except FileNotFoundError:
+                pass
+
+    def _path(self, key: str, suffix: str = None):
+        """
+        Returns the path of an entry file, the data file by default
+        """
+        return os.path.join(self.directory,
+                            key + (suffix or self.data_suffix))
@@ -0,0 +1,265 @@
+"""
+Compact Tree
+
+This module provides a memory-compact form of parsed genesis trees,
+for genesis files with millions of accounts.
+
+loads parses a document with the json module and shares repeated
+strings (denoms, type URLs, small amounts) between the values that
+hold them, the way the parser already shares repeated keys.
+
+The entries of the large lists at COMPACT_PATHS (balances, delegations
+and delegator starting infos) and the objects nested in them are
+stored as records: objects that keep the values of a JSON object in
+slots and its keys in their class, which take about a third of the
+memory of a dict. Entries with the keys of RECORD_KEYS become records
+as soon as they are parsed, so the dicts are never all held at once.
+
+The lists become CompactList, which turns a record back into a dict,
+and stores it in place of the record, the first time it is read
+through indexing, iteration or pop, so tasks change entries as usual.
+Values obtained otherwise (list.__iter__, sort keys) may be records,
+which can be indexed by key: the key functions of genesis_index work
+on them. The JSON backends write records through to_dict.
+"""
+
+import json
+
+COMPACT_PATHS = (
+    ('app_state', 'bank', 'balances'),
+    ('app_state', 'staking', 'delegations'),
+    ('app_state', 'distribution', 'delegator_starting_infos'),
+)
+# Objects with these keys, in any order, become records when parsed:
+# the entries of the lists at COMPACT_PATHS and the objects they hold
+RECORD_KEYS = (
+    frozenset(('address', 'coins')),
+    frozenset(('denom', 'amount')),
+    frozenset(('delegator_address', 'validator_address', 'shares')),
+    frozenset(('delegator_address', 'validator_address', 'starting_info')),
+    frozenset(('height', 'previous_period', 'stake')),
+)
+
+_record_types = {}
+
+
+class Record:
+    """
+    The values of a JSON object, see record_type
+    """
+    __slots__ = ()
+    # Maps the keys of the object to the slots holding their values
+    slot_names = {}
+
+    def __getitem__(self, key):
+        return getattr(self, self.slot_names[key])
+
+    def get(self, key, default=None):
+        """
+        Returns the value of key, or default
+        """
+        if key in self.slot_names:
+            return self[key]
+        return default
+
+    def to_dict(self):
+        """
+        Returns the object as a dict, with nested records as dicts too
+        """
+        record = {}
+        for key, slot in self.slot_names.items():
+            value = getattr(self, slot)
+            record[key] = value.to_dict() if isinstance(value, Record) \
+                else value
+        return record
+
+    def __repr__(self):
+        return f'Record({self.to_dict()!r})'
+
+
+def record_type(keys: tuple):
+    """
+    Returns the Record subclass for objects with the given keys,
+    in that order
+    """
+    record_class = _record_types.get(keys)
+    if record_class is None:
+        slots = tuple(f'_{position}' for position in range(len(keys)))
+        # A generated __init__ assigns the slots without a loop, which
+        # matters for millions of records
+        source = f'def __init__(self, {", ".join(slots)}):\n' + ''.join(
+            f'    self.{slot} = {slot}\n' for slot in slots)
+        namespace = {}
+        exec(source, namespace)  # pylint: disable=W0122
+        record_class = type('Record', (Record,), {
+            '__slots__': slots,
+            '__init__': namespace['__init__'],
+            'slot_names': dict(zip(keys, slots)),
+        })
+        _record_types[keys] = record_class
+    return record_class
+
+
+def to_record(value: dict):
+    """
+    Returns a dict as a record, with nested dicts as records and lists
+    as CompactLists
+    """
+    members = []
+    for member in value.values():
+        if isinstance(member, dict):
+            member = to_record(member)
+        elif isinstance(member, list):
+            member = compact_list(member)
+        members.append(member)
+    return record_type(tuple(value))(*members)
+
+
+def compact_list(items: list):
+    """
+    Returns items as a CompactList with its dicts as records.
+    items is emptied as it is copied, so the dicts are freed one by one.
+    """
+    compacted = CompactList()
+    append = compacted.append
+    for position, item in enumerate(items):
+        append(to_record(item) if isinstance(item, dict) else item)
+        items[position] = None
+    items.clear()
+    return compacted
+
+
+class CompactList(list):
+    """
+    A list of records that turns them into dicts when they are read
+    """
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position]
+                    for position in range(*index.indices(len(self)))]
+        value = list.__getitem__(self, index)
+        if isinstance(value, Record):
+            value = value.to_dict()
+            list.__setitem__(self, index, value)
+        return value
+
+    def __iter__(self):
+        position = 0
+        while position < len(self):
+            yield self[position]
+            position += 1
+
+    def __reversed__(self):
+        for position in range(len(self) - 1, -1, -1):
+            yield self[position]
+
+    def pop(self, index=-1):
+        value = list.pop(self, index)
+        return value.to_dict() if isinstance(value, Record) else value
+
+    def copy(self):
+        return CompactList(list.__iter__(self))
+
+    def __contains__(self, value):
+        return value in plain(self)
+
+    def __eq__(self, other):
+        return plain(self) == plain(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+
+def plain(value):
+    """
+    Returns a copy of value with its records as dicts and its
+    CompactLists as lists
+    """
+    if isinstance(value, Record):
+        return {key: plain(getattr(value, slot))
+                for key, slot in value.slot_names.items()}
+    if isinstance(value, dict):
+        return {key: plain(member) for key, member in value.items()}
+    if isinstance(value, list):
+        return [plain(item) for item in list.__iter__(value)]
+    return value
+
+
+def loads(data):
+    """
+    Returns the tree of the JSON document in data (str, bytes or
+    bytearray) with repeated strings shared and the objects with the
+    keys of RECORD_KEYS as records. Call compact to finish the tree.
+    """
+    # pylint: disable=C0123
+    strings = _Strings()
+    record_classes = {}
+
+    def object_hook(value: dict):
+        keys = tuple(value)
+        record_class = record_classes.get(keys, Record)
+        if record_class is Record:
+            record_class = record_type(keys) \
+                if frozenset(keys) in RECORD_KEYS else None
+            record_classes[keys] = record_class
+        if record_class is None:
+            for key, member in value.items():
+                if type(member) is str:
+                    value[key] = strings[member]
+            return value
+        return record_class(*[
+            strings[member] if type(member) is str else
+            CompactList(member) if type(member) is list else member
+            for member in value.values()])
+
+    return json.loads(data, object_hook=object_hook)
+
+
+class _Strings(dict):
+    """
+    Maps strings to the first equal string seen
+    """
+
+    def __missing__(self, string):
+        self[string] = string
+        return string
+
+
+def compact(genesis, paths=COMPACT_PATHS):
+    """
+    Stores the lists at paths of a tree returned by loads as
+    CompactLists, and turns the records parsed anywhere else back into
+    dicts. Returns the number of entries in the compacted lists.
+    """
+    entries = 0
+    for path in paths:
+        parent = genesis
+        for key in path[:-1]:
+            parent = parent.get(key) if isinstance(parent, dict) else None
+        items = parent.get(path[-1]) if isinstance(parent, dict) else None
+        if type(items) is list:  # pylint: disable=C0123
+            parent[path[-1]] = compact_list(items)
+            entries += len(parent[path[-1]])
+    _restore(genesis)
+    return entries
+
+
+def _restore(container):
+    """
+    Turns the records in plain dicts and lists under container into
+    dicts, and the CompactLists they hold into lists
+    """
+    if type(container) is dict:  # pylint: disable=C0123
+        members = container.items()
+    elif type(container) is list:  # pylint: disable=C0123
+        members = enumerate(container)
+    else:
+        return
+    for key, member in members:
+        if isinstance(member, Record):
+            container[key] = plain(member)
+        else:
+            _restore(member)
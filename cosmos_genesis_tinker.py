@@ -11,19 +11,56 @@ This module provides an interface for modifying Cosmos genesis files.
 
 See fresh_genesis_tinker.py for an example.
 """
+# pylint: disable=C0302
 
-import json
 from hashlib import sha256
 from zipfile import ZipFile
 from io import BytesIO
 import gzip
 import tarfile
+import contextlib
 import functools
 import bisect
+import heapq
+import mmap
+import multiprocessing
 import shutil
-import subprocess
 import os
+import tempfile
+import time
 import requests
+import compact_tree
+import cow_tree
+import lazy_json
+import stream_rewrite
+from byte_replacer import ByteReplacer, find_conflicts, merge_pairs
+from download_cache import DownloadCache, decodes_content
+from genesis_index import ListIndex, scan, scan_many
+from json_backend import get_backend
+from json_stream import apply_edits, balance_coin_edits, normalise_file
+from numeric_store import NumericStore
+from snapshot_cache import SnapshotCache
+from task_planner import describe, estimate_cost, plan_tasks, task_arguments
+from task_profiler import TaskProfiler
+
+BYTES_TASKS = ('replace_validator', 'replace_delegator')
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+# Downloads larger than this are spooled to disk
+SPOOL_SIZE = 1 << 26
+# Json tasks that can run in streaming mode -> the section they change
+STREAMING_SECTIONS = {
+    'set_chain_id': ('chain_id',),
+    'set_unbonding_time': ('app_state', 'staking', 'params'),
+    'set_max_deposit_period': ('app_state', 'gov', 'params'),
+    'set_min_deposit': ('app_state', 'gov', 'params'),
+    'set_tally_param': ('app_state', 'gov', 'params'),
+    'set_voting_period': ('app_state', 'gov', 'params'),
+    'create_coin': ('app_state', 'bank', 'supply'),
+    'increase_supply': ('app_state', 'bank', 'supply'),
+}
+# In streaming mode balances are changed one at a time
+STREAMING_BALANCE_TASKS = ('increase_balance', 'increase_balances')
+BALANCE_PATH = ('app_state', 'bank', 'balances', stream_rewrite.ELEMENT)
 
 
 class Validator:
@@ -161,11 +198,13 @@ class TinkerTaskList:
     tasks
     next
     """
-    _bytes_tasks = []
-    _json_tasks = []
-    _bytes_tasks_names = ('replace_validator', 'replace_delegator')
-    _phase = 'bytes'
-    _user_tasks = []
+    _bytes_tasks_names = BYTES_TASKS
+
+    def __init__(self):
+        self._bytes_tasks = []
+        self._json_tasks = []
+        self._phase = 'bytes'
+        self._user_tasks = []
 
     def add(self, task):
         """
@@ -210,6 +249,18 @@ class TinkerTaskList:
         """
         return self._phase
 
+    def json_tasks(self):
+        """
+        Returns the json tasks left in the queue
+        """
+        return self._json_tasks
+
+    def set_json_tasks(self, tasks):
+        """
+        Replaces the json tasks left in the queue
+        """
+        self._json_tasks = list(tasks)
+
     def clear(self):
         """
         Resets the task lists and phase
@@ -220,25 +271,158 @@ class TinkerTaskList:
         self._phase = 'bytes'
 
 
+class HashingWriter:  # pylint: disable=R0902
+    """
+    File-like object that computes the sha256 of everything written
+    through it and passes the bytes on to a binary file, if any.
+    Strings are encoded as utf-8 and small writes are buffered.
+    The time spent hashing is kept in hash_seconds and hash_cpu_seconds.
+    """
+
+    def __init__(self, target=None, buffer_size: int = 1 << 16):
+        self.target = target
+        self.buffer_size = buffer_size
+        self.bytes_written = 0
+        self.hash_seconds = 0.0
+        self.hash_cpu_seconds = 0.0
+        self._hash = sha256()
+        self._pending = []
+        self._pending_size = 0
+
+    def write(self, data):
+        """
+        Queues data for hashing and writing
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._pending.append(data)
+        self._pending_size += len(data)
+        if self._pending_size >= self.buffer_size:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        """
+        Hashes and writes the queued data
+        """
+        data = b''.join(self._pending)
+        self._pending = []
+        self._pending_size = 0
+        start = time.perf_counter()
+        cpu = time.process_time()
+        self._hash.update(data)
+        self.hash_seconds += time.perf_counter() - start
+        self.hash_cpu_seconds += time.process_time() - cpu
+        self.bytes_written += len(data)
+        if self.target is not None:
+            self.target.write(data)
+
+    def hexdigest(self):
+        """
+        Returns the sha256 of all the data written so far
+        """
+        self.flush()
+        return self._hash.hexdigest()
+
+
 class GenesisTinker:  # pylint: disable=R0902,R0904
     """
-    Provides primitives for modifying Cosmos genesis files
+    Provides primitives for modifying Cosmos genesis files.
+    Every instance has its own task list and genesis, so separate
+    instances can run in threads or processes at the same time as long
+    as they use different output and preprocessing files. A single
+    instance must only be used by one thread at a time.
     """
-    genesis = {}
-    _task_list = TinkerTaskList()
     _step_count = 0
     _phase = 'bytes'
     _preprocessing = False
-
-    def __init__(self,
+    output_shasum = None
+    report = None
+    _profiler = None
+    _pending_pairs = None
+    _pending_sort_coins = False
+    _preprocessed = None
+
+    def __init__(self,  # pylint: disable=R0913,R0914,R0917
                  input_file: str = "genesis.json",
                  shasum: str = "",
                  output_file: str = "tinkered_genesis.json",
-                 preprocessing_file: str = "preprocessing.json"):
+                 preprocessing_file: str = "preprocessing.json",
+                 in_memory: bool = False,
+                 keep_preprocessing_file: bool = False,
+                 workers: int = 1,
+                 download_cache: DownloadCache = None,
+                 snapshot_cache: SnapshotCache = None,
+                 use_indexes: bool = True,
+                 lazy: bool = False,
+                 streaming: bool = False,
+                 json_backend: str = None,
+                 compact: bool = False,
+                 numeric_store: bool = False):
+        """
+        With in_memory set, byte operations are done on a buffer that is
+        passed straight to the json parser. The preprocessing file is then
+        only written if keep_preprocessing_file is set.
+        With more than one worker, byte replacements on the preprocessing
+        file are split into shards and done in parallel processes.
+        With a download_cache, load_url reads remote files through it.
+        With a snapshot_cache, load_file reuses the parsed tree of inputs
+        it has already loaded.
+        With use_indexes set, lookups in the large genesis lists go through
+        indexes that are built on first use instead of scanning the lists.
+        With lazy set, the sections of a genesis in two space layout are
+        only parsed when a task reads them, and the others are saved as
+        they were read, see lazy_json. This takes precedence over the
+        snapshot cache.
+        With streaming set, run_tasks never loads the genesis: the json
+        tasks are applied while it is rewritten to the output file, see
+        stream_rewrite, so memory use is bounded by the largest section
+        or balance they change. Only the tasks in STREAMING_SECTIONS and
+        STREAMING_BALANCE_TASKS can run this way, and optimise is ignored.
+        json_backend is the name of the JSON parser and encoder used to
+        load and save the genesis, by default the fastest one installed,
+        see json_backend. Every backend saves the same bytes.
+        With compact set, repeated strings are shared as the genesis is
+        parsed and the entries of its balances, delegations and delegator
+        starting infos are stored as records until a task reads them, see
+        compact_tree, which takes less memory but parses more slowly. This
+        takes the place of the json backend and snapshot cache when
+        loading, lazy takes precedence over it.
+        With numeric_store set, the amounts, tokens, shares and stakes the
+        helpers change are parsed once and only formatted back into the
+        genesis when it is saved or generated, see numeric_store. Code
+        other than the helpers must not change those fields in between.
+        """
         self.input_file = input_file
         self.shasum = shasum
         self.output_file = output_file
         self.preprocessing_file = preprocessing_file
+        self.in_memory = in_memory
+        self.keep_preprocessing_file = keep_preprocessing_file
+        self.workers = workers
+        self.download_cache = download_cache
+        self.snapshot_cache = snapshot_cache
+        self.use_indexes = use_indexes
+        self.lazy = lazy
+        self.streaming = streaming
+        self.json_backend = get_backend(json_backend)
+        self.compact = compact
+        self._numbers = NumericStore(deferred=numeric_store)
+        self.genesis = {}
+        self._task_list = TinkerTaskList()
+        self._indexes = {
+            'balances': ListIndex(lambda balance: balance['address']),
+            'validators': ListIndex(
+                lambda validator: validator['operator_address']),
+            'last_validator_powers': ListIndex(
+                lambda power: power['address']),
+            'delegations': ListIndex(
+                lambda delegation: (delegation['delegator_address'],
+                                    delegation['validator_address'])),
+            'starting_infos': ListIndex(
+                lambda info: info['delegator_address']),
+            'module_accounts': ListIndex(lambda account: account.get('name'))
+        }
 
     @property
     def app_state(self):
@@ -293,11 +477,18 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
         """
         self._task_list.clear()
 
-    def run_tasks(self):
+    def run_tasks(self, optimise: bool = False, report_file: str = None,
+                  on_event=None):
         """
         Run the list of tasks:
         - All byte operations are done before the json ones
         - All byte operations are done on a the pre-processing
+        - With optimise set, redundant json tasks are merged once the
+          genesis is loaded, see task_planner
+        Every task and phase (preprocessing, replacements, load, save and
+        hashing) is measured, see task_profiler. The report is kept in
+        self.report and saved as JSON to report_file if it is set.
+        on_event, if set, is called with every event as it is measured.
         """
 
         if self._task_list.tasks() != self._task_list.user_tasks():
@@ -307,38 +498,319 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
                 [task.func.__name__ for task in self._task_list.tasks()]))
             return True
 
+        if self.streaming and self._phase == 'bytes':
+            unsupported = [describe(task)
+                           for task in self._task_list.json_tasks()
+                           if not self._streamable(task)]
+            if unsupported:
+                raise Exception('Tasks not supported in streaming mode',
+                                unsupported)
+
+        self._profiler = TaskProfiler(on_event)
+        try:
+            with self._profiler.measure('run', 'run_tasks'):
+                failed = self._run_queue(optimise)
+        finally:
+            self.report = self._profiler.report()
+            if report_file is not None:
+                self._profiler.write(report_file)
+            self._profiler = None
+        return failed
+
+    def _run_queue(self, optimise: bool):
+        """
+        Runs the queued tasks and saves the output,
+        returns True if the replacements failed
+        """
+        # Byte tasks only queue their replacements,
+        # which are all applied together before the json phase
+        self._pending_pairs = []
+        streamed = None
         while self._task_list.tasks():
             task = self._task_list.next()
             if self._task_list.phase() == 'json' and self._phase == 'bytes':
+                self._apply_replacements()
+                if self.streaming:
+                    # The json tasks run while the genesis is saved
+                    streamed = [task] + self._task_list.json_tasks()
+                    break
                 # load json only if required
                 self._phase = 'json'
-                self.auto_load()
-            task()
+                with self._measure('phase', 'load'):
+                    self.auto_load()
+                if optimise:
+                    task = self._optimise_tasks(task)
+            with self._measure('task', task.func.__name__):
+                task()
 
         self._task_list.clear()
 
-        if self._phase == 'json':
-            self.save_file(self.output_file)
-            content = self.generate_json()
-            content_bytes = content.encode('utf-8')
-        else:
-            shutil.copy2(self.preprocessing_file, self.output_file)
-            with open(self.preprocessing_file, 'rb') as infile:
-                content_bytes = infile.read()
+        if self._phase == 'bytes':
+            self._apply_replacements()
+
+        # The checksum is computed from the bytes as they are written
+        with self._measure('phase', 'save'):
+            if streamed is not None:
+                shasum = self._stream_json(streamed)
+            elif self._phase == 'json':
+                self.log_step("Saving genesis to file " + self.output_file)
+                shasum = self._write_json(self.output_file)
+            elif self.in_memory:
+                with open(self.output_file, 'wb') as outfile:
+                    writer = HashingWriter(outfile)
+                    writer.write(self._preprocessed)
+                    shasum = self._hexdigest(writer)
+                self._preprocessed = None
+            else:
+                with open(self.preprocessing_file, 'rb') as infile, \
+                        open(self.output_file, 'wb') as outfile:
+                    writer = HashingWriter(outfile)
+                    shutil.copyfileobj(infile, writer)
+                    shasum = self._hexdigest(writer)
+                shutil.copystat(self.preprocessing_file, self.output_file)
+
+        self.output_shasum = shasum
+        print(f'SHA256SUM: {shasum}')
+        return None
 
-        print(f'SHA256SUM: {sha256(content_bytes).hexdigest()}')
+    def _measure(self, kind: str, name: str):
+        """
+        Returns a context measuring a block of the current run,
+        which does nothing outside of run_tasks
+        """
+        if self._profiler is None:
+            return contextlib.nullcontext()
+        return self._profiler.measure(kind, name)
+
+    def _hexdigest(self, writer: HashingWriter):
+        """
+        Returns the digest of writer and reports the time spent hashing
+        """
+        shasum = writer.hexdigest()
+        if self._profiler is not None:
+            self._profiler.add('phase', 'hash', writer.hash_seconds,
+                               writer.hash_cpu_seconds)
+        return shasum
+
+    def _optimise_tasks(self, task):
+        """
+        Replaces task and the json tasks queued after it with an
+        equivalent plan, logs both plans and returns the first task to run
+        """
+        tasks = [task] + self._task_list.json_tasks()
+        plan = plan_tasks(self, tasks)
+        for title, planned_tasks in (('Original', tasks), ('Optimised', plan)):
+            costs = [estimate_cost(self, planned) for planned in planned_tasks]
+            total = sum(cost for cost in costs if cost is not None)
+            self.log_step(f"{title} plan: {len(planned_tasks)} tasks, "
+                          f"estimated cost {total}")
+            for planned, cost in zip(planned_tasks, costs):
+                print(f'   {describe(planned)}: '
+                      f'{"?" if cost is None else cost}')
+        self._task_list.set_json_tasks(plan[1:])
+        return plan[0]
+
+    def run_variants(self, variants, workers: int = 1):
+        """
+        Produces several tinkered genesis files from the input file,
+        which is loaded and preprocessed once.
+        variants maps output file names to lists of (task name, keyword
+        arguments) tuples, e.g. {'a.json': [('set_chain_id', {'chain_id': 'a'})]}
+        Variants with the same byte tasks share one parsed base tree, and
+        each of them runs its json tasks on a copy-on-write view of it, so
+        the subtrees a variant doesn't touch are never copied.
+        With more than one worker, variants run in a process pool.
+        Returns a dictionary of output file names to SHA256 sums.
+        """
+        groups = {}
+        for output_file, tasks in variants.items():
+            byte_tasks = [task for task in tasks
+                          if task[0] in BYTES_TASKS]
+            if tasks[:len(byte_tasks)] != byte_tasks:
+                raise Exception('Invalid sequence: replace_validator and '
+                                'replace_delegator must come before all '
+                                'other functions.', output_file)
+            key = _task_key(byte_tasks)
+            groups.setdefault(key, (byte_tasks, []))[1].append(
+                (output_file, tasks[len(byte_tasks):]))
+
+        self.log_step(f"Running {len(variants)} variants "
+                      f"from {len(groups)} base trees")
+        normalised = None
+        settings = (self.in_memory, self.lazy, self.compact)
+        # Copy-on-write views only wrap fully parsed trees of plain lists
+        self.in_memory, self.lazy, self.compact = True, False, False
+        try:
+            if any(byte_tasks for byte_tasks, _ in groups.values()):
+                self.create_preprocessing_file()
+                normalised = self._preprocessed
+            bases = {key: self._load_base(byte_tasks, normalised)
+                     for key, (byte_tasks, _) in groups.items()}
+        finally:
+            self.in_memory, self.lazy, self.compact = settings
+            self._preprocessed = None
+        jobs = [(key, output_file, json_tasks)
+                for key, (_, outputs) in groups.items()
+                for output_file, json_tasks in outputs]
+
+        if workers > 1 and len(jobs) > 1:
+            # Forked workers share the base trees with this process
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context(
+                'fork' if 'fork' in methods else None)
+            with context.Pool(min(workers, len(jobs)),
+                              initializer=_set_variant_bases,
+                              initargs=(bases,)) as pool:
+                return dict(pool.map(_run_variant, jobs))
+
+        return dict(map(functools.partial(_run_variant, bases=bases), jobs))
+
+    def _load_base(self, byte_tasks, normalised):
+        """
+        Returns the genesis parsed after applying byte_tasks
+        to the normalised input
+        """
+        self._preprocessing = bool(byte_tasks)
+        if byte_tasks:
+            self._preprocessed = normalised
+            self._pending_pairs = []
+            for name, kwargs in byte_tasks:
+                getattr(self, name)(**kwargs)
+            self._apply_replacements()
+            self._pending_pairs = None
+        self.auto_load()
+        self._preprocessing = False
+        return self.genesis
 
     def create_preprocessing_file(self):
         """
         Creates a preprocessing json file in which
         all byte replacement operations will take place.
+        With in_memory set, the preprocessing data is kept in a buffer instead.
         """
-        self.log_step("Creating preprocessing file " +
-                      self.preprocessing_file)
         self._preprocessing = True
-        subprocess.run(f"jq '.' {self.input_file} > {self.preprocessing_file}",
-                check=True, shell=True)
-        # shutil.copy2(self.input_file, self.preprocessing_file)
+        with self._measure('phase', 'preprocess'):
+            if self.in_memory:
+                self.log_step("Creating preprocessing buffer in memory")
+                buffer = BytesIO()
+                report = normalise_file(self.input_file, buffer)
+                self._preprocessed = buffer.getvalue()
+            else:
+                self.log_step("Creating preprocessing file " +
+                              self.preprocessing_file)
+                # Same layout as jq '.', without holding the document in memory
+                report = normalise_file(self.input_file,
+                                        self.preprocessing_file)
+        print(f"   {report['bytes_read'] / 1e6:.1f} MB normalised in "
+              f"{report['seconds']:.3f}s ({report['mb_per_second']:.1f} MB/s)")
+
+    def _apply_replacements(self):
+        """
+        Apply the replacements queued by replace_validator and
+        replace_delegator to the preprocessing file, see _replace_bytes
+        """
+        pairs = self._pending_pairs
+        sort_coins = self._pending_sort_coins
+        self._pending_pairs = None
+        self._pending_sort_coins = False
+
+        if not pairs:
+            return
+
+        with self._measure('phase', 'replace'):
+            self._replace_bytes(pairs, sort_coins)
+
+        if self.in_memory and self.keep_preprocessing_file:
+            self.log_step("Saving preprocessing file " +
+                          self.preprocessing_file)
+            with open(self.preprocessing_file, 'wb') as file:
+                file.write(self._preprocessed)
+
+    def _queue_replacements(self, pairs, sort_coins=False):
+        """
+        Queue byte replacements while run_tasks is collecting them,
+        otherwise apply them right away
+        """
+        if self._pending_pairs is None:
+            self._replace_bytes(pairs, sort_coins)
+            return
+        self._pending_pairs.extend(pairs)
+        self._pending_sort_coins = self._pending_sort_coins or sort_coins
+
+    def _replace_bytes(self, pairs, sort_coins=False):
+        """
+        Replace every old value with its new value in the preprocessing file.
+        pairs is a list of (old, new) tuples, all of which are applied
+        in a single pass over the file, unless that would give a different
+        result than applying them one after the other (see find_conflicts):
+        then every pair gets its own pass.
+        Returns the number of bytes scanned and replacements made per pattern.
+        """
+        pairs = merge_pairs(pairs)
+        conflicts = find_conflicts(pairs)
+        if conflicts:
+            print('Conflicting replacements: the following values would be '
+                  'replaced more than once.')
+            for conflict in conflicts:
+                print('   ' + conflict)
+            self.log_step(f"Applying {len(pairs)} byte replacements "
+                          "one after the other")
+            replacers = [ByteReplacer([pair]) for pair in pairs]
+        else:
+            self.log_step(f"Applying {len(pairs)} byte replacements "
+                          "in one pass")
+            replacers = [ByteReplacer(pairs)] if pairs else []
+        report = {'bytes_scanned': 0, 'replacements': {}}
+        replaced = set()
+        for replacer in replacers:
+            if self.in_memory:
+                self._preprocessed = replacer.replace(self._preprocessed)
+            else:
+                replacer.replace_file(self.preprocessing_file, self.workers)
+            report['bytes_scanned'] += replacer.bytes_scanned
+            report['replacements'].update(replacer.report()['replacements'])
+            replaced.update(old for old, count in
+                            replacer.replacements.items() if count)
+
+        self.log_step(f"Scanned {report['bytes_scanned']} bytes")
+        for old, count in report['replacements'].items():
+            print(f'   {old}: {count} replacements')
+
+        if sort_coins:
+            # Only denoms that received a new value can be out of order
+            self._sort_balances_coins([new for old, new in pairs
+                                      if old in replaced])
+
+        return report
+
+    def _sort_balances_coins(self, values):
+        """
+        Sort the coins of the balances in the preprocessing file
+        that have one of the given values in a denom.
+        Coin lists that are still sorted are left untouched.
+        """
+        self.log_step("Sorting balances coins")
+
+        edits = []
+        if values and self.in_memory:
+            edits = balance_coin_edits(self._preprocessed, values)
+            if edits:
+                target = BytesIO()
+                apply_edits(self._preprocessed, edits, target)
+                self._preprocessed = target.getvalue()
+        elif values and os.path.getsize(self.preprocessing_file):
+            sorted_file = self.preprocessing_file + '.sorted'
+            with open(self.preprocessing_file, 'rb') as file, \
+                    mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                edits = balance_coin_edits(buffer, values)
+                if edits:
+                    with open(sorted_file, 'wb') as target:
+                        apply_edits(buffer, edits, target)
+            if edits:
+                os.replace(sorted_file, self.preprocessing_file)
+
+        print(f'   {len(edits)} coin lists sorted')
+        return self
 
     def replace_delegator(self, old_delegator: Delegator, new_delegator: Delegator):
         """
@@ -347,6 +819,8 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
 
         This function will do a byte replacement on all instances of the old delegator data
         and save the changes to the current pre_processing.json file.
+        When run from run_tasks, the replacement is applied together with
+        all other byte tasks in a single pass.
         """
         if not self._preprocessing:
             self.create_preprocessing_file()
@@ -356,13 +830,9 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
         # Replace every property of the delegator object
         properties = [prop for prop in dir(Delegator) if prop[0] != '_']
 
-        for prop in properties:
-            subprocess.run([
-                'sed', '-i', 's%' +
-                getattr(old_delegator, prop) + '%' +
-                getattr(new_delegator, prop) + '%g',
-                self.preprocessing_file],
-                check=True)
+        self._queue_replacements([(getattr(old_delegator, prop),
+                                   getattr(new_delegator, prop))
+                                  for prop in properties])
 
     def replace_validator(self, old_validator: Validator, new_validator: Validator):
         """
@@ -371,6 +841,8 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
 
         This function will do a byte replacement on all instances of the old validator data
         and save the changes to the current pre_processing.json file.
+        When run from run_tasks, the replacement is applied together with
+        all other byte tasks in a single pass.
         """
         if not self._preprocessing:
             self.create_preprocessing_file()
@@ -381,21 +853,10 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
         # Replace every property of the validator object
         properties = [prop for prop in dir(Validator) if prop[0] != '_']
 
-        for prop in properties:
-            subprocess.run([
-                'sed', '-i', 's%' +
-                getattr(old_validator, prop) + '%' +
-                getattr(new_validator, prop) + '%g',
-                self.preprocessing_file],
-                check=True)
-
-        # Sort coins in bank balances
-        self.log_step("Sorting balances coins")
-        subprocess.run("jq '.app_state.bank.balances |= map(.coins |= sort_by(.denom))' " + \
-                      f"{self.preprocessing_file} > sorted.json",
-                check=True, shell=True)
-        subprocess.run(f"mv sorted.json {self.preprocessing_file}",
-                check=True, shell=True)
+        self._queue_replacements([(getattr(old_validator, prop),
+                                   getattr(new_validator, prop))
+                                  for prop in properties],
+                                 sort_coins=True)
 
     def load_file(self, path):
         """
@@ -404,14 +865,67 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
 
         self.log_step("Loading genesis from file " + path)
 
-        with open(path, "r", encoding="utf8") as file:
-            self.genesis = json.load(file)
+        if self.snapshot_cache is not None and \
+                not (self.lazy or self.compact):
+            self.genesis = self.snapshot_cache.load(path,
+                                                    self.json_backend.loads)
+            print(f'   Snapshot cache {self.snapshot_cache.last_status}')
+        else:
+            with open(path, "rb") as file:
+                self.genesis = self._parse(file.read())
+        self._reset_indexes()
 
         if os.path.isfile(self.preprocessing_file):
             os.remove(self.preprocessing_file)
 
         return self
 
+    def load_genesis(self, genesis):
+        """
+        Uses an already parsed genesis, run_tasks will not load one
+        """
+
+        self.log_step("Loading parsed genesis")
+
+        self.genesis = genesis
+        self._reset_indexes()
+        self._phase = 'json'
+
+        return self
+
+    def load_bytes(self, content):
+        """
+        Loads a genesis file from JSON data already in memory
+        """
+
+        self.log_step(f"Loading genesis from {len(content)} bytes in memory")
+
+        self.genesis = self._parse(content)
+        self._reset_indexes()
+
+        return self
+
+    def _parse(self, content):
+        """
+        Returns the genesis in content, lazily parsed if lazy is set
+        and compacted if compact is set
+        """
+        if not self.lazy and self.compact:
+            genesis = compact_tree.loads(content)
+            entries = compact_tree.compact(genesis)
+            print(f'   Compacted {entries} entries')
+            return genesis
+        if not self.lazy:
+            return self.json_backend.loads(content)
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        genesis = lazy_json.loads(content)
+        if isinstance(genesis, lazy_json.LazyObject):
+            print(f'   Lazily parsing {len(genesis)} sections')
+        else:
+            print('   Not in two space layout, parsed in full')
+        return genesis
+
     def load_url(self, url, shasum=None):
         """
         Download and parse a genesis file from the web.
@@ -426,35 +940,70 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
 
         self.log_step(log_string)
 
-        request = requests.get(url, allow_redirects=True, stream=True)
-
-        # Auto-read from zipfiles
-        if '.tar.gz' in url:
-            with tarfile.open(fileobj=request.raw, mode='r|gz') as archive:
-                archive.list()
-                with archive.extractfile('genesis.json') as file:
-                    content = file.read()
-        elif '.gz' in url:
-            with gzip.open(request.raw, 'r') as file:
-                content = file.read()
-        elif '.zip' in url:
-            with ZipFile(BytesIO(request.content), 'r') as archive:
-                with archive.open('genesis.json', 'r') as file:
-                    content = file.read()
-        else:
-            content = request.content
-
-        if shasum is not None:
-            got_digest = sha256(content).hexdigest()
-            if got_digest != shasum:
+        # The genesis is hashed as it is decompressed into a spooled file,
+        # so neither the download nor the decompressed data are kept in memory
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as spool:
+            writer = HashingWriter(spool)
+            if self.download_cache is None:
+                with requests.get(url, allow_redirects=True,
+                                  stream=True) as request:
+                    request.raw.decode_content = decodes_content(url)
+                    self._extract(url, request.raw, writer)
+            else:
+                with self.download_cache.open(url, shasum) as source:
+                    self._extract(url, source, writer)
+                print(f'   Download cache {self.download_cache.last_status}')
+            got_digest = writer.hexdigest()
+            print(f'   {writer.bytes_written} bytes downloaded')
+
+            if shasum is not None and got_digest != shasum:
+                if self.download_cache is not None:
+                    self.download_cache.discard(url, shasum)
                 raise Exception(
                     "Got invalid digest from remote file", got_digest, shasum)
+            if shasum is None and self.download_cache is not None:
+                self.download_cache.link(url, got_digest)
 
-        self.genesis = json.loads(content)
+            spool.seek(0)
+            self.genesis = self._parse(spool.read())
+        self._reset_indexes()
         _phase = 'json'
 
         return self
 
+    @staticmethod
+    def _extract(url, source, writer):
+        """
+        Writes the genesis file from the binary file object source to writer,
+        extracting it from an archive according to the url
+        """
+        # Auto-read from zipfiles
+        if '.tar.gz' in url:
+            with tarfile.open(fileobj=source, mode='r|gz') as archive:
+                for member in archive:
+                    if member.name == 'genesis.json':
+                        with archive.extractfile(member) as file:
+                            shutil.copyfileobj(file, writer, DOWNLOAD_CHUNK_SIZE)
+                        return
+            raise Exception("No genesis.json found in archive", url)
+        if '.gz' in url:
+            with gzip.open(source, 'r') as file:
+                shutil.copyfileobj(file, writer, DOWNLOAD_CHUNK_SIZE)
+            return
+        if '.zip' in url:
+            if source.seekable():
+                with ZipFile(source, 'r') as archive:
+                    with archive.open('genesis.json', 'r') as file:
+                        shutil.copyfileobj(file, writer, DOWNLOAD_CHUNK_SIZE)
+                return
+            # Zip archives are indexed at the end, so they need a seekable file
+            with tempfile.TemporaryFile() as compressed:
+                shutil.copyfileobj(source, compressed, DOWNLOAD_CHUNK_SIZE)
+                compressed.seek(0)
+                GenesisTinker._extract(url, compressed, writer)
+            return
+        shutil.copyfileobj(source, writer, DOWNLOAD_CHUNK_SIZE)
+
     def auto_load(self):
         """
         Attempts to load the genesis file from CLI arguments
@@ -462,6 +1011,12 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
         --shasum CLI fla gcan be used to specify a shasum to verify against
         """
 
+        if self._preprocessing and self.in_memory:
+            self.log_step('Autoloading preprocessing buffer')
+            content = self._preprocessed
+            self._preprocessed = None
+            return self.load_bytes(content)
+
         if self._preprocessing:
             input_name = self.preprocessing_file
         else:
@@ -479,11 +1034,52 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
 
         return self.load_file(input_name)
 
+    def _reset_indexes(self):
+        """
+        Drops the lookup indexes and stored numbers after the genesis
+        has been replaced
+        """
+        for index in self._indexes.values():
+            index.invalidate()
+        self._numbers.clear()
+
+    def _lookup(self, name: str, items: list, key):
+        """
+        Returns the first item of items with the given key, or None.
+        Uses the index called name unless indexes are disabled:
+        balances: app_state.bank.balances by address
+        validators: app_state.staking.validators by operator address
+        last_validator_powers: app_state.staking.last_validator_powers
+        by operator address
+        delegations: app_state.staking.delegations by
+        (delegator address, operator address)
+        starting_infos: app_state.distribution.delegator_starting_infos
+        by delegator address
+        module_accounts: app_state.auth.accounts by module account name
+        """
+        index = self._indexes[name]
+        if self.use_indexes:
+            return index.get(items, key)
+        return scan(items, index.key, key)
+
+    def _lookup_many(self, name: str, items: list, keys):
+        """
+        Returns a dictionary of the first item of items for every key
+        that has one, see _lookup
+        """
+        index = self._indexes[name]
+        if self.use_indexes:
+            return index.get_many(items, keys)
+        return scan_many(items, index.key, keys)
+
     def generate_json(self):
         """
         Generates the JSON for the current genesis state
         """
-        return json.dumps(self.genesis, indent=False)
+        self._numbers.flush()
+        # Lazy sections that were never parsed stay unparsed
+        return lazy_json.dumps(self.genesis,
+                               self.json_backend).decode('ascii')
 
     def save_file(self, path):
         """
@@ -492,18 +1088,174 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
 
         self.log_step("Saving genesis to file " + path)
 
-        with open(path, "w", encoding="utf8") as file:
-            json.dump(self.genesis, file, indent=False)
+        self._write_json(path)
 
         return self
 
+    def _write_json(self, path=None):
+        """
+        Streams the genesis JSON to path, or nowhere if path is None,
+        and returns the sha256 of the bytes written
+        """
+        self._numbers.flush()
+        # Copy-on-write views are written without copying them
+        if path is None:
+            writer = HashingWriter()
+            with cow_tree.reading():
+                lazy_json.dump(self.genesis, writer, self.json_backend)
+            return writer.hexdigest()
+
+        with open(path, 'wb') as file:
+            writer = HashingWriter(file)
+            with cow_tree.reading():
+                lazy_json.dump(self.genesis, writer, self.json_backend)
+            return self._hexdigest(writer)
+
+    def _streamable(self, task):
+        """
+        Returns whether task can run in streaming mode
+        """
+        name = task.func.__name__
+        arguments = task_arguments(task)
+        if getattr(task.func, '__self__', None) is not self or \
+                arguments is None:
+            return False
+        if name == 'increase_balances':
+            return not arguments['create_missing']
+        return name in STREAMING_SECTIONS or name in STREAMING_BALANCE_TASKS
+
+    def _stream_json(self, tasks):
+        """
+        Rewrites the preprocessing data or the input file to the output
+        file with tasks applied, and returns the sha256 of the output.
+        Every section a task changes is parsed on its own and the tasks
+        run against a genesis that only holds that section.
+        """
+        reached = set()
+        totals = {}
+        transforms = self._streaming_transforms(tasks, reached, totals)
+
+        if self._preprocessing:
+            input_name = self.preprocessing_file
+        elif self.input_file.startswith(('http://', 'https://')):
+            raise Exception('Streaming mode needs a local input file')
+        else:
+            input_name = self.input_file
+
+        self.log_step("Streaming genesis to file " + self.output_file)
+        try:
+            with contextlib.ExitStack() as stack:
+                if self._preprocessing and self.in_memory:
+                    source = BytesIO(self._preprocessed)
+                    self._preprocessed = None
+                else:
+                    source = stack.enter_context(open(input_name, 'rb'))
+                writer = HashingWriter(
+                    stack.enter_context(open(self.output_file, 'wb')))
+                stream_rewrite.rewrite(source, writer, transforms)
+                shasum = self._hexdigest(writer)
+            missing = [path for path in transforms
+                       if path != BALANCE_PATH and path not in reached]
+            if missing:
+                raise Exception('Could not find section', '.'.join(missing[0]))
+            if totals:
+                raise Exception('Could not find balance for address',
+                                next(iter(totals)))
+        except BaseException:
+            if os.path.isfile(self.output_file):
+                os.remove(self.output_file)
+            raise
+        finally:
+            self.genesis = {}
+
+        if self._preprocessing and os.path.isfile(self.preprocessing_file):
+            os.remove(self.preprocessing_file)
+        return shasum
+
+    def _streaming_transforms(self, tasks, reached: set, totals: dict):
+        """
+        Returns the stream_rewrite transforms that apply tasks.
+        Sections add their path to reached when they are found, balance
+        increases are collected in totals, which holds the amounts of
+        every address not found yet.
+        """
+        sections = {}
+        for task in tasks:
+            name = task.func.__name__
+            if name not in STREAMING_BALANCE_TASKS:
+                sections.setdefault(STREAMING_SECTIONS[name], []).append(task)
+                continue
+            arguments = task_arguments(task)
+            increases = arguments.get('increases') or \
+                [(arguments['address'], arguments['amount'],
+                  arguments['denom'])]
+            self.log_step(f"Increasing balances of "
+                          f"{len({increase[0] for increase in increases})} "
+                          f"addresses while streaming")
+            supply_totals = {}
+            for address, amount, denom in increases:
+                amounts = totals.setdefault(address, {})
+                amounts[denom] = amounts.get(denom, 0) + amount
+                supply_totals[denom] = supply_totals.get(denom, 0) + amount
+            # The supply is increased in task order like increase_balance does
+            sections.setdefault(STREAMING_SECTIONS['increase_supply'],
+                                []).extend(
+                functools.partial(self.increase_supply, increase=amount,
+                                  denom=denom)
+                for denom, amount in supply_totals.items())
+
+        transforms = {path: functools.partial(self._run_section, reached,
+                                              path, section_tasks)
+                      for path, section_tasks in sections.items()}
+        if totals:
+            transforms[BALANCE_PATH] = functools.partial(
+                _increase_streamed_balance, totals)
+        return transforms
+
+    def _run_section(self, reached, path, tasks, value):
+        """
+        Runs tasks on a genesis that only holds value at path, adds path
+        to the set reached and returns the new value
+        """
+        reached.add(path)
+        self.genesis = {}
+        parent = self.genesis
+        for key in path[:-1]:
+            parent = parent.setdefault(key, {})
+        parent[path[-1]] = value
+        for task in tasks:
+            with self._measure('task', task.func.__name__):
+                task()
+        self._numbers.flush()
+        self._numbers.clear()
+        return parent[path[-1]]
+
     def generate_shasum(self):
         """
         Generates a sha256 checksum of the genesis file (to verify later)
         """
-        content = self.generate_json()
-        content_bytes = content.encode('utf-8')
-        return sha256(content_bytes).hexdigest()
+        return self._write_json()
+
+    def get_module_account_address(self, name: str):
+        """
+        Return the address of the module account with the given name
+        in .app_state.auth.accounts, e.g. bonded_tokens_pool,
+        not_bonded_tokens_pool, distribution, gov, mint or fee_collector.
+        All module accounts are resolved in one pass on first use.
+        """
+        accounts = self.app_state['auth']['accounts']
+        account = self._lookup('module_accounts', accounts, name)
+        if account is None:
+            return None
+        return account['base_account']['address']
+
+    def get_module_accounts(self):
+        """
+        Return a dictionary of all module account names and addresses
+        """
+        return {account['name']: account['base_account']['address']
+                for account in self.app_state['auth']['accounts']
+                if 'name' in account}
 
     def get_bonded_pool_address(self):
         """
@@ -511,11 +1263,7 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
         check for "name": "bonded_tokens_pool"
         and return the address.
         """
-        accounts = self.genesis['app_state']['auth']['accounts']
-        for acct in accounts:
-            if 'name' in acct.keys() and acct['name'] == 'bonded_tokens_pool':
-                return acct['base_account']['address']
-        return None
+        return self.get_module_account_address('bonded_tokens_pool')
 
     def get_not_bonded_pool_address(self):
         """
@@ -523,11 +1271,20 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
         check for "name": "not_bonded_tokens_pool"
         and return the address.
         """
-        accounts = self.genesis['app_state']['auth']['accounts']
-        for acct in accounts:
-            if 'name' in acct.keys() and acct['name'] == 'not_bonded_tokens_pool':
-                return acct['base_account']['address']
-        return None
+        return self.get_module_account_address('not_bonded_tokens_pool')
+
+    def get_total_balance(self, denom: str = 'uatom'):
+        """
+        Returns the sum of the balances of denom over every account,
+        e.g. to check it against the supply
+        """
+        balances = self.app_state["bank"]["balances"]
+        # The lists are read as stored, nothing is copied or expanded
+        with cow_tree.reading():
+            coins = [coin for balance in list.__iter__(balances)
+                     for coin in list.__iter__(balance["coins"])
+                     if coin["denom"] == denom]
+        return self._numbers.total(coins, "amount")
 
     def set_chain_id(self, chain_id: str):
         """
@@ -667,9 +1424,7 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
         found_coin = False
         for coin in supplies:
             if coin["denom"] == denom:
-                old_amount = int(coin["amount"])
-                new_amount = old_amount + increase
-                coin["amount"] = str(new_amount)
+                self._numbers.add(coin, "amount", increase)
                 found_coin = True
                 break
 
@@ -689,32 +1444,70 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
 
         balances = self.app_state["bank"]["balances"]
 
-        found_balance = False
-        for balance in balances:
-            if balance["address"] == address:
-                found_balance = True
-                had_coin = False
-                for coin in balance["coins"]:
-                    if coin["denom"] == denom:
-                        old_amount = int(coin["amount"])
-                        new_amount = old_amount + amount
-                        coin["amount"] = str(new_amount)
-                        had_coin = True
-                        break
-                if not had_coin:
-                    # coins must be in ascending sorted order by denom
-                    bisect.insort_right(balance["coins"],
-                                        {"denom": denom,
-                                         "amount": str(amount)},
-                                        key=lambda x: x['denom'])
-                break
-
-        if not found_balance:
+        balance = self._lookup('balances', balances, address)
+        if balance is None:
             raise Exception('Could not find balance for address')
 
+        had_coin = False
+        for coin in balance["coins"]:
+            if coin["denom"] == denom:
+                self._numbers.add(coin, "amount", amount)
+                had_coin = True
+                break
+        if not had_coin:
+            # coins must be in ascending sorted order by denom
+            bisect.insort_right(balance["coins"],
+                                {"denom": denom,
+                                 "amount": str(amount)},
+                                key=lambda x: x['denom'])
+
         self.increase_supply(amount, denom)
         return self
 
+    def increase_balances(self, increases, create_missing: bool = False):
+        """
+        Increases the balances of many accounts in one pass
+        and the overall supply of each denom by the total amount.
+        increases is an iterable of (address, amount, denom) tuples.
+        With create_missing set, addresses without a balance get a new one,
+        otherwise nothing is changed if any of them is missing.
+        """
+
+        totals = {}
+        supply_totals = {}
+        for address, amount, denom in increases:
+            amounts = totals.setdefault(address, {})
+            amounts[denom] = amounts.get(denom, 0) + amount
+            supply_totals[denom] = supply_totals.get(denom, 0) + amount
+
+        self.log_step(f"Increasing balances of {len(totals)} addresses")
+
+        balances = self.app_state["bank"]["balances"]
+        found = self._lookup_many('balances', balances, totals)
+        missing = [address for address in totals if address not in found]
+        if missing and not create_missing:
+            raise Exception('Could not find balance for address', missing[0])
+
+        for address, balance in found.items():
+            _add_coins(balance["coins"], totals[address], self._numbers)
+
+        if missing:
+            self.log_step(f"Creating {len(missing)} new balances")
+            new_balances = []
+            for address in sorted(missing):
+                balance = {"address": address, "coins": []}
+                _add_coins(balance["coins"], totals[address])
+                new_balances.append(balance)
+            # One merge keeps the existing order and sorts in the new
+            # balances, entries of a compact tree stay records
+            merged = list(heapq.merge(list.__iter__(balances), new_balances,
+                                      key=lambda balance: balance["address"]))
+            balances[:] = merged
+
+        for denom, amount in supply_totals.items():
+            self.increase_supply(amount, denom)
+        return self
+
     def increase_validator_power(self,
                                  operator_address,
                                  validator_address,
@@ -767,12 +1560,13 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
                 smallest_validator_power = int(validator["power"])
 
         last_validator_powers = self.app_state["staking"]["last_validator_powers"]
-        for last_validator_power in last_validator_powers:
-            if last_validator_power["address"] == operator_address:
-                old_power = int(last_validator_power["power"])
-                new_power = old_power + power_increase
-                last_validator_power["power"] = str(new_power)
-                break
+        last_validator_power = self._lookup('last_validator_powers',
+                                            last_validator_powers,
+                                            operator_address)
+        if last_validator_power is not None:
+            old_power = int(last_validator_power["power"])
+            new_power = old_power + power_increase
+            last_validator_power["power"] = str(new_power)
 
         # TODO what happens if the validator is not in the validator set?
         # There are two ways we can do this, either increasing the number of validators or
@@ -797,30 +1591,22 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
 
         staking_validators = self.app_state["staking"]["validators"]
 
-        found_validator = False
-        for validator in staking_validators:
-            if validator["operator_address"] == operator_address:
-                old_amount = int(validator["tokens"])
-                if validator["status"] == "BOND_STATUS_UNBONDED":
-                    self.log_step("Changing bond status to BOND_STATUS_BONDED")
-                    validator["status"] = "BOND_STATUS_BONDED"
-                    self.increase_balance(
-                        self.get_bonded_pool_address(), old_amount, denom=denom)
-                    self.increase_balance(
-                        self.get_not_bonded_pool_address(), -1*old_amount, denom=denom)
-                new_amount = old_amount + increase
-                validator["tokens"] = str(new_amount)
-                old_shares = float(validator["delegator_shares"])
-                new_shares = old_shares + increase
-                validator["delegator_shares"] = str(
-                    format(new_shares, ".18f"))
-
-                found_validator = True
-                break
-
-        if not found_validator:
+        validator = self._lookup('validators', staking_validators,
+                                 operator_address)
+        if validator is None:
             raise Exception("Could not find operator_address")
 
+        old_amount = self._numbers.get(validator, "tokens")
+        if validator["status"] == "BOND_STATUS_UNBONDED":
+            self.log_step("Changing bond status to BOND_STATUS_BONDED")
+            validator["status"] = "BOND_STATUS_BONDED"
+            self.increase_balance(
+                self.get_bonded_pool_address(), old_amount, denom=denom)
+            self.increase_balance(
+                self.get_not_bonded_pool_address(), -1*old_amount, denom=denom)
+        self._numbers.set(validator, "tokens", old_amount + increase)
+        self._numbers.add(validator, "delegator_shares", increase)
+
         return self
 
     def increase_delegator_stake(self, delegator: Delegator, increase: int):
@@ -833,19 +1619,13 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
 
         starting_infos = self.app_state["distribution"]["delegator_starting_infos"]
 
-        found_stake = False
-        for info in starting_infos:
-            if info["delegator_address"] == delegator.address:
-                old_stake = float(info["starting_info"]["stake"])
-                new_stake = old_stake + increase
-                info["starting_info"]["stake"] = str(
-                    format(new_stake, ".18f"))
-                found_stake = True
-                break
-
-        if not found_stake:
+        info = self._lookup('starting_infos', starting_infos,
+                            delegator.address)
+        if info is None:
             raise Exception("Unable to find delegator_address")
 
+        self._numbers.add(info["starting_info"], "stake", increase)
+
         return self
 
     def increase_delegator_stake_to_validator(self,
@@ -871,12 +1651,86 @@ class GenesisTinker:  # pylint: disable=R0902,R0904
 
         delegations = self.app_state["staking"]["delegations"]
 
-        for delegation in delegations:
-            if delegation["delegator_address"] == delegator.address and \
-               delegation["validator_address"] == validator.operator_address:
-                share_increase = float(increase['amount'])
-                self.log_step("Increasing delegations of " + delegator.address +
-                              " with " + validator.operator_address + " by " + str(share_increase))
-                delegation["shares"] = format(
-                    float(delegation["shares"]) + share_increase, ".18f")
+        delegation = self._lookup('delegations', delegations,
+                                  (delegator.address, validator.operator_address))
+        if delegation is not None:
+            share_increase = float(increase['amount'])
+            self.log_step("Increasing delegations of " + delegator.address +
+                          " with " + validator.operator_address + " by " + str(share_increase))
+            self._numbers.add(delegation, "shares", share_increase)
         return self
+
+
+def _add_coins(coins: list, amounts: dict, numbers: NumericStore = None):
+    """
+    Adds amounts (a dictionary of denom to integer amount) to a list of
+    coins sorted by denom, in place, with a single sort for new denoms.
+    Existing amounts are changed through numbers when it is given.
+    """
+    amounts = dict(amounts)
+    for coin in coins:
+        if coin["denom"] not in amounts:
+            continue
+        if numbers is None:
+            coin["amount"] = str(int(coin["amount"]) +
+                                 amounts.pop(coin["denom"]))
+        else:
+            numbers.add(coin, "amount", amounts.pop(coin["denom"]))
+    if amounts:
+        # coins must be in ascending sorted order by denom
+        coins.extend({"denom": denom, "amount": str(amount)}
+                     for denom, amount in amounts.items())
+        coins.sort(key=lambda coin: coin["denom"])
+
+
+def _increase_streamed_balance(totals: dict, balance: dict):
+    """
+    Adds the amounts in totals for the address of balance, once,
+    see GenesisTinker._stream_json
+    """
+    amounts = totals.pop(balance.get("address"), None)
+    if amounts is not None:
+        _add_coins(balance["coins"], amounts)
+    return balance
+
+
+# Base trees of the variants run by the current process, see run_variants
+_variant_bases = {}
+
+
+def _set_variant_bases(bases):
+    """
+    Sets the base trees used by _run_variant
+    """
+    global _variant_bases  # pylint: disable=W0603
+    _variant_bases = bases
+
+
+def _run_variant(job, bases=None):
+    """
+    Runs the json tasks of one variant on a copy-on-write view of its
+    base tree, taken from bases or from the bases set for this worker.
+    Returns the output file name and its SHA256 sum.
+    """
+    key, output_file, tasks = job
+    if bases is None:
+        bases = _variant_bases
+    tinker = GenesisTinker(output_file=output_file)
+    tinker.load_genesis(cow_tree.view(bases[key]))
+    for name, kwargs in tasks:
+        tinker.add_task(getattr(tinker, name), **kwargs)
+    if tinker.run_tasks():
+        raise Exception('Variant tasks failed', output_file)
+    return output_file, tinker.output_shasum
+
+
+def _task_key(tasks):
+    """
+    Returns a hashable description of (task name, keyword arguments) tuples,
+    describing objects such as Validator by their attributes
+    """
+    return tuple((name, tuple(sorted(
+        (arg, tuple(sorted(vars(value).items()))
+         if hasattr(value, '__dict__') else value)
+        for arg, value in kwargs.items())))
+        for name, kwargs in tasks)
@@ -0,0 +1,114 @@
+"""
+Copy-on-write Tree
+
+This module provides copy-on-write views of parsed JSON trees, so
+several variants of a genesis can be tinkered from one parsed base
+without deep-copying it.
+
+A view is a shallow copy of a container. A nested dict or list is
+shallow copied too, and stored in its parent view, the first time it
+is accessed through a view, so changes made through the view never
+reach the base tree and subtrees that are never accessed stay shared.
+
+Only indexing, get, iteration and pop wrap nested containers:
+values obtained from items() or values() are the shared ones and must
+not be modified. Inside a reading() block nothing is wrapped, which
+lets the json encoder write a view without copying it.
+"""
+
+import contextlib
+import threading
+
+_state = threading.local()
+
+
+def view(value):
+    """
+    Returns a copy-on-write view of value if it is a plain dict or list,
+    value itself otherwise
+    """
+    if type(value) is dict:  # pylint: disable=C0123
+        return CowDict(value)
+    if type(value) is list:  # pylint: disable=C0123
+        return CowList(value)
+    return value
+
+
+@contextlib.contextmanager
+def reading():
+    """
+    Disables wrapping in the current thread, for read only traversals
+    """
+    previous = getattr(_state, 'reading', False)
+    _state.reading = True
+    try:
+        yield
+    finally:
+        _state.reading = previous
+
+
+def _needs_view(value):
+    """
+    Returns whether value is a container that still belongs to the base
+    and has to be wrapped
+    """
+    return type(value) in (dict, list) and \
+        not getattr(_state, 'reading', False)
+
+
+class CowDict(dict):
+    """
+    Copy-on-write view of a dict
+    """
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if _needs_view(value):
+            value = view(value)
+            dict.__setitem__(self, key, value)
+        return value
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            dict.__setitem__(self, key, default)
+        return self[key]
+
+    def pop(self, key, *default):
+        return view(dict.pop(self, key, *default))
+
+
+class CowList(list):
+    """
+    Copy-on-write view of a list
+    """
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position]
+                    for position in range(*index.indices(len(self)))]
+        value = list.__getitem__(self, index)
+        if _needs_view(value):
+            value = view(value)
+            list.__setitem__(self, index, value)
+        return value
+
+    def __iter__(self):
+        if getattr(_state, 'reading', False):
+            yield from list.__iter__(self)
+            return
+        position = 0
+        while position < len(self):
+            yield self[position]
+            position += 1
+
+    def __reversed__(self):
+        for position in range(len(self) - 1, -1, -1):
+            yield self[position]
+
+    def pop(self, index=-1):
+        return view(list.pop(self, index))
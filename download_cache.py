@@ -0,0 +1,161 @@
+"""
+Download Cache
+
+This module provides an on-disk cache for the genesis files and
+archives downloaded by GenesisTinker.load_url.
+
+Entries are keyed by URL and expected sha256 sum:
+An entry with a shasum is only used for that digest, so it is served
+without touching the network (the digest is still verified after loading)
+An entry without a shasum is revalidated with the server using the
+ETag and Last-Modified headers it was stored with
+
+Entries are stored in a CacheDirectory, which handles atomic population
+and least recently used eviction.
+"""
+
+import json
+import os
+import tempfile
+from hashlib import sha256
+import requests
+from cache_directory import CacheDirectory
+
+CHUNK_SIZE = 1 << 20
+# Seconds to wait for the server to accept the connection or send data
+TIMEOUT = 60
+
+
+def decodes_content(url: str):
+    """
+    Returns whether the Content-Encoding of the download of url is undone.
+    Gzip files and archives are kept as served, as servers often mark
+    them with their own compression (e.g. Apache's AddEncoding).
+    """
+    return '.gz' not in url
+
+
+class DownloadCache(CacheDirectory):
+    """
+    Stores downloaded files and their response headers in a directory
+    """
+    data_suffix = '.data'
+    suffixes = ('.json', '.data')
+
+    def open(self, url: str, shasum: str = None):
+        """
+        Returns a binary file object with the content of url,
+        downloading it into the cache if required
+        """
+        key = self._key(url, shasum)
+        metadata = self._metadata(key)
+
+        if metadata is not None and shasum is not None:
+            source = self._open_entry(key)
+            if source is not None:
+                self.last_status = 'hit'
+                return source
+
+        headers = {}
+        if metadata is not None:
+            if metadata.get('etag'):
+                headers['If-None-Match'] = metadata['etag']
+            if metadata.get('last_modified'):
+                headers['If-Modified-Since'] = metadata['last_modified']
+
+        if not self._download(url, key, shasum, headers):
+            source = self._open_entry(key)
+            if source is not None:
+                self.last_status = 'revalidated'
+                return source
+            # The entry was evicted since its metadata was read
+            self._download(url, key, shasum, {})
+
+        self.last_status = 'miss'
+        self.evict(keep=key)
+        return self._open_entry(key)
+
+    def link(self, url: str, shasum: str):
+        """
+        Registers the unpinned entry for url under shasum once its
+        content digest is known, so later lookups with it are hits
+        """
+        key = self._key(url, None)
+        pinned = self._key(url, shasum)
+        metadata = self._metadata(key)
+        if metadata is None or self._metadata(pinned) is not None:
+            return
+        metadata['shasum'] = shasum
+        link_path = self._path(pinned)
+        handle, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(handle)
+        os.remove(tmp_path)
+        try:
+            os.link(self._path(key), tmp_path)
+            os.replace(tmp_path, link_path)
+        except FileNotFoundError:
+            return
+        self._write_metadata(pinned, metadata)
+
+    def discard(self, url: str, shasum: str = None):
+        """
+        Removes the entry for url and shasum
+        """
+        self._remove(self._key(url, shasum))
+
+    def _download(self, url: str, key: str, shasum: str, headers):
+        """
+        Downloads url into the entry for key.
+        Returns False if the server answered that the entry is current.
+        """
+        with requests.get(url, headers=headers, allow_redirects=True,
+                          stream=True, timeout=TIMEOUT) as request:
+            if request.status_code == 304:
+                return False
+            request.raise_for_status()
+            # Undo any transport Content-Encoding,
+            # entries hold the file as published
+            request.raw.decode_content = decodes_content(url)
+            self._store(key, request.raw, {
+                'url': url,
+                'shasum': shasum,
+                'etag': request.headers.get('ETag'),
+                'last_modified': request.headers.get('Last-Modified')
+            })
+        return True
+
+    def _store(self, key: str, source, metadata):
+        """
+        Atomically writes source and its metadata to the entry for key
+        """
+        with self._atomic_file(self._path(key)) as target:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                target.write(chunk)
+        self._write_metadata(key, metadata)
+
+    def _write_metadata(self, key: str, metadata):
+        """
+        Atomically writes the metadata for key
+        """
+        with self._atomic_file(self._path(key, '.json')) as target:
+            target.write(json.dumps(metadata).encode('utf-8'))
+
+    def _metadata(self, key: str):
+        """
+        Returns the metadata for key, or None if there is no entry
+        """
+        try:
+            with open(self._path(key, '.json'), 'r', encoding='utf8') as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @staticmethod
+    def _key(url: str, shasum: str = None):
+        """
+        Returns the cache key for url and shasum
+        """
+        return sha256(f'{url}\n{shasum or ""}'.encode('utf-8')).hexdigest()
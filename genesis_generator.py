@@ -0,0 +1,695 @@
+#!/usr/bin/env python
+"""
+Genesis Generator
+
+This module builds synthetic genesis files with the structure of a
+cosmoshub-4 export, so the tinker can be exercised at realistic scale
+without downloading one.
+
+Every value is derived from sha256(seed, kind, index), so a file is
+fully determined by its seed and counts, and any entry can be computed
+on its own. Files are streamed to disk in key order: apart from one
+address per account, nothing proportional to the output is kept in
+memory.
+
+The generated state is consistent: supply matches the balances, the
+staking pools hold the tokens of the bonded and unbonded validators,
+validator tokens and shares match their delegations, and the bonded
+validators make up the consensus validator set and last total power.
+Addresses are valid bech32, module account addresses are derived from
+their names as in the SDK, and IBC denoms are the hashes of their
+denom traces.
+
+Usage:
+$ python genesis_generator.py output.json [preset] [seed]
+where preset is one of the names in PRESETS.
+"""
+
+import base64
+import functools
+import json
+import sys
+import time
+from hashlib import sha256
+
+DEFAULT_COUNTS = {
+    'accounts': 1000,
+    'balances': 1000,
+    'denoms': 5,
+    'validators': 20,
+    'max_validators': 10,
+    'delegations': 2000,
+    'starting_infos': 2000,
+    'ibc_clients': 5,
+    'ibc_channels': 10,
+    'ibc_packets': 100
+}
+# The order of magnitude of recent cosmoshub-4 exports
+PRESETS = {
+    'default': DEFAULT_COUNTS,
+    'small': dict(DEFAULT_COUNTS, accounts=100, balances=100, validators=5,
+                  max_validators=4, delegations=200, starting_infos=200,
+                  ibc_packets=10),
+    'cosmoshub': dict(DEFAULT_COUNTS, accounts=1000000, balances=1000000,
+                      denoms=300, validators=600, max_validators=180,
+                      delegations=1200000, starting_infos=1200000,
+                      ibc_clients=600, ibc_channels=700, ibc_packets=100000)
+}
+MODULE_ACCOUNTS = (
+    ('distribution', []),
+    ('bonded_tokens_pool', ['burner', 'staking']),
+    ('not_bonded_tokens_pool', ['burner', 'staking']),
+    ('gov', ['burner']),
+    ('mint', ['minter']),
+    ('transfer', ['minter', 'burner']),
+    ('fee_collector', [])
+)
+BOND_DENOM = 'uatom'
+DECIMALS = '.000000000000000000'
+GENESIS_TIME = '2024-01-01T00:00:00Z'
+ZERO_TIME = '1970-01-01T00:00:00Z'
+WRITE_BUFFER_SIZE = 1 << 20
+
+BECH32_CHARSET = 'qpzry9x8gf2tvdw0s3jn54khce6mua7l'
+BECH32_GENERATOR = (0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3)
+# Generator terms for every value of the top 5 bits of the checksum
+BECH32_TABLE = [functools.reduce(
+    int.__xor__, (generator for bit, generator in enumerate(BECH32_GENERATOR)
+                  if top >> bit & 1), 0) for top in range(32)]
+
+
+def bech32(prefix: str, data: bytes):
+    """
+    Returns data encoded as bech32 with the human readable prefix
+    """
+    bits = len(data) * 8
+    padding = -bits % 5
+    number = int.from_bytes(data, 'big') << padding
+    count = (bits + padding) // 5
+    words = [number >> 5 * (count - 1 - position) & 31
+             for position in range(count)]
+    checksum = _polymod(_prefix_values(prefix) + words + [0] * 6) ^ 1
+    words += [checksum >> 5 * (5 - position) & 31 for position in range(6)]
+    return prefix + '1' + ''.join([BECH32_CHARSET[word] for word in words])
+
+
+@functools.lru_cache()
+def _prefix_values(prefix: str):
+    """
+    Returns the expansion of a bech32 prefix used in the checksum
+    """
+    return [ord(char) >> 5 for char in prefix] + [0] + \
+        [ord(char) & 31 for char in prefix]
+
+
+def _polymod(values):
+    """
+    Returns the bech32 checksum polynomial of values
+    """
+    checksum = 1
+    table = BECH32_TABLE
+    for value in values:
+        checksum = table[checksum >> 25] ^ (checksum & 0x1ffffff) << 5 ^ value
+    return checksum
+
+
+def module_address(name: str):
+    """
+    Returns the address of the module account with the given name
+    """
+    return bech32('cosmos', sha256(name.encode('utf-8')).digest()[:20])
+
+
+def ibc_denom(path: str, base_denom: str):
+    """
+    Returns the IBC denom of a token with the given denom trace
+    """
+    trace = f'{path}/{base_denom}'.encode('utf-8')
+    return 'ibc/' + sha256(trace).hexdigest().upper()
+
+
+def generate_genesis(output, seed: int = 0, chain_id: str = 'synthetic-1',
+                     **counts):
+    """
+    Writes a synthetic genesis to output, a path or a binary file object.
+    counts override the entries of DEFAULT_COUNTS.
+    Returns a summary with the counts used and the bytes written.
+    """
+    generator = _Generator(seed, dict(DEFAULT_COUNTS, **counts))
+    genesis = generator.genesis(chain_id)
+    if isinstance(output, str):
+        with open(output, 'wb') as file:
+            written = _dump(genesis, file)
+    else:
+        written = _dump(genesis, output)
+    return dict(generator.counts, seed=seed, bytes_written=written)
+
+
+class _Generator:  # pylint: disable=R0902,R0903
+    """
+    Derives every entry of a synthetic genesis from the seed and counts
+    """
+
+    def __init__(self, seed: int, counts: dict):
+        self.seed = seed
+        self.counts = counts
+        for name, count in counts.items():
+            if count < 0:
+                raise Exception('Counts must not be negative', name)
+        if counts['validators'] > counts['accounts']:
+            raise Exception('Every validator needs an operator account')
+        if counts['balances'] > counts['accounts']:
+            raise Exception('There are more balances than accounts')
+        if counts['delegations'] > counts['accounts'] * counts['validators']:
+            raise Exception('Delegations must have distinct '
+                            'delegator and validator pairs')
+        if counts['starting_infos'] > counts['delegations']:
+            raise Exception('Starting infos must match delegations')
+        if counts['denoms'] < 1:
+            raise Exception('At least the bond denom is needed')
+        if counts['ibc_channels'] and not counts['ibc_clients']:
+            raise Exception('IBC channels need a client')
+        if counts['denoms'] > 1 and not counts['ibc_channels']:
+            raise Exception('IBC denoms need a channel')
+
+        self.bonded = min(counts['validators'], counts['max_validators'])
+        self.addresses = [bech32('cosmos', self._digest('account', index)[:20])
+                          for index in range(counts['accounts'])]
+        self.traces = [(f'transfer/channel-{index % counts["ibc_channels"]}',
+                        f'utoken{index}')
+                       for index in range(1, counts['denoms'])]
+        self.denoms = [ibc_denom(*trace) for trace in self.traces]
+        self.supply = {}
+
+        self.tokens = [0] * counts['validators']
+        for index in range(counts['delegations']):
+            _, validator = self._delegation_pair(index)
+            self.tokens[validator] += self._delegation_amount(index)
+        self.powers = [tokens // 1000000
+                       for tokens in self.tokens[:self.bonded]]
+        self.operators = [
+            bech32('cosmosvaloper', self._digest('account', index)[:20])
+            for index in range(counts['validators'])]
+        self.keys = [self._validator_keys(index)
+                     for index in range(counts['validators'])]
+
+    def _digest(self, kind: str, index: int):
+        """
+        Returns the 32 random bytes of an entry
+        """
+        return sha256(f'{self.seed}/{kind}/{index}'.encode('utf-8')).digest()
+
+    def _number(self, kind: str, index: int, limit: int):
+        """
+        Returns a random number from 0 to limit - 1 for an entry
+        """
+        return int.from_bytes(self._digest(kind, index)[:8], 'big') % limit
+
+    def _delegation_pair(self, index: int):
+        """
+        Returns the delegator and validator indexes of a delegation.
+        Account n delegates to validators n, n + 1, ... in turn, so pairs
+        are distinct and validator operators delegate to themselves first.
+        """
+        accounts = self.counts['accounts']
+        delegator = index % accounts
+        return delegator, (delegator + index // accounts) % \
+            self.counts['validators']
+
+    def _delegation_amount(self, index: int):
+        """
+        Returns the uatom delegated by a delegation
+        """
+        return 1000000 + self._number('delegation', index, 10 ** 10)
+
+    def _validator_keys(self, index: int):
+        """
+        Returns the consensus public key, hex address and
+        consensus address of a validator
+        """
+        public_key = self._digest('consensus', index)
+        address = sha256(public_key).digest()[:20]
+        return (base64.b64encode(public_key).decode('ascii'),
+                address.hex().upper(), bech32('cosmosvalcons', address))
+
+    def _coins(self, *amounts):
+        """
+        Returns coins for (denom, amount) tuples, sorted by denom,
+        and adds them to the supply
+        """
+        coins = []
+        for denom, amount in sorted(amounts):
+            self.supply[denom] = self.supply.get(denom, 0) + amount
+            coins.append({'denom': denom, 'amount': str(amount)})
+        return coins
+
+    def genesis(self, chain_id: str):
+        """
+        Returns the genesis, with generators for its large lists
+        """
+        validators = self.counts['validators']
+        return {
+            'app_hash': '',
+            'app_state': {
+                'auth': {'accounts': self._accounts(),
+                         'params': {'max_memo_characters': '512',
+                                    'sig_verify_cost_ed25519': '590',
+                                    'sig_verify_cost_secp256k1': '1000',
+                                    'tx_sig_limit': '7',
+                                    'tx_size_cost_per_byte': '10'}},
+                'bank': {'balances': self._balances(),
+                         'denom_metadata': [],
+                         'params': {'default_send_enabled': True,
+                                    'send_enabled': []},
+                         'send_enabled': [],
+                         'supply': _Deferred(self._supply)},
+                'distribution': self._distribution(),
+                'gov': {'deposits': [],
+                        'params': {'burn_proposal_deposit_prevote': False,
+                                   'burn_vote_quorum': False,
+                                   'burn_vote_veto': True,
+                                   'max_deposit_period': '1209600s',
+                                   'min_deposit': [{'denom': BOND_DENOM,
+                                                    'amount': '250000000'}],
+                                   'min_initial_deposit_ratio':
+                                       '0.000000000000000000',
+                                   'quorum': '0.400000000000000000',
+                                   'threshold': '0.500000000000000000',
+                                   'veto_threshold': '0.334000000000000000',
+                                   'voting_period': '1209600s'},
+                        'proposals': [],
+                        'starting_proposal_id': '1',
+                        'votes': []},
+                'ibc': self._ibc(),
+                'mint': {'minter': {'annual_provisions':
+                                    '0.000000000000000000',
+                                    'inflation': '0.100000000000000000'},
+                         'params': {'blocks_per_year': '4360000',
+                                    'goal_bonded': '0.670000000000000000',
+                                    'inflation_max': '0.200000000000000000',
+                                    'inflation_min': '0.070000000000000000',
+                                    'inflation_rate_change':
+                                        '1.000000000000000000',
+                                    'mint_denom': BOND_DENOM}},
+                'slashing': {
+                    'missed_blocks': (
+                        {'address': self.keys[index][2],
+                         'missed_blocks': []}
+                        for index in range(validators)),
+                    'params': {'downtime_jail_duration': '600s',
+                               'min_signed_per_window': '0.050000000000000000',
+                               'signed_blocks_window': '10000',
+                               'slash_fraction_double_sign':
+                                   '0.050000000000000000',
+                               'slash_fraction_downtime':
+                                   '0.000100000000000000'},
+                    'signing_infos': self._signing_infos()},
+                'staking': self._staking(),
+                'transfer': {'denom_traces': [
+                    {'base_denom': base_denom, 'path': path}
+                    for path, base_denom in self.traces],
+                    'params': {'receive_enabled': True,
+                               'send_enabled': True},
+                    'port_id': 'transfer'}
+            },
+            'chain_id': chain_id,
+            'consensus': {
+                'params': {'block': {'max_bytes': '200000',
+                                     'max_gas': '40000000'},
+                           'evidence': {'max_age_duration': '172800000000000',
+                                        'max_age_num_blocks': '1000000',
+                                        'max_bytes': '50000'},
+                           'validator': {'pub_key_types': ['ed25519']},
+                           'version': {'app': '0'}},
+                'validators': self._consensus_validators()},
+            'genesis_time': GENESIS_TIME,
+            'initial_height': '1'
+        }
+
+    def _accounts(self):
+        """
+        Yields the module accounts and the base accounts
+        """
+        for number, (name, permissions) in enumerate(MODULE_ACCOUNTS):
+            yield {'@type': '/cosmos.auth.v1beta1.ModuleAccount',
+                   'base_account': {'account_number': str(number),
+                                    'address': module_address(name),
+                                    'pub_key': None,
+                                    'sequence': '0'},
+                   'name': name,
+                   'permissions': permissions}
+        offset = len(MODULE_ACCOUNTS)
+        for index, address in enumerate(self.addresses):
+            digest = self._digest('public_key', index)
+            sequence = digest[0]
+            public_key = None
+            # Accounts that never sent a transaction have no public key
+            if sequence:
+                public_key = {
+                    '@type': '/cosmos.crypto.secp256k1.PubKey',
+                    'key': base64.b64encode(
+                        bytes([2 + digest[1] % 2]) + digest).decode('ascii')}
+            yield {'@type': '/cosmos.auth.v1beta1.BaseAccount',
+                   'account_number': str(offset + index),
+                   'address': address,
+                   'pub_key': public_key,
+                   'sequence': str(sequence)}
+
+    def _balances(self):
+        """
+        Yields the balances of the module accounts and the base accounts
+        """
+        bonded = sum(self.tokens[:self.bonded])
+        not_bonded = sum(self.tokens[self.bonded:])
+        pools = {'bonded_tokens_pool': bonded,
+                 'not_bonded_tokens_pool': not_bonded,
+                 'distribution': 1000000 * max(1, self.counts['validators'])}
+        for name, amount in pools.items():
+            if amount:
+                yield {'address': module_address(name),
+                       'coins': self._coins((BOND_DENOM, amount))}
+
+        for index in range(self.counts['balances']):
+            digest = self._digest('balance', index)
+            amounts = [(BOND_DENOM,
+                        1 + int.from_bytes(digest[:6], 'big') % 10 ** 12)]
+            # One account in eight also holds one to three IBC tokens
+            if self.denoms and digest[6] < 32:
+                for position in range(1 + digest[7] % 3):
+                    denom = self.denoms[int.from_bytes(
+                        digest[8 + 2 * position:10 + 2 * position],
+                        'big') % len(self.denoms)]
+                    if denom not in dict(amounts):
+                        amounts.append((denom, 1 + digest[16 + position]))
+            yield {'address': self.addresses[index],
+                   'coins': self._coins(*amounts)}
+
+    def _supply(self):
+        """
+        Returns the total supply of every denom in the balances
+        """
+        return [{'denom': denom, 'amount': str(amount)}
+                for denom, amount in sorted(self.supply.items())]
+
+    def _delegations(self):
+        """
+        Yields the delegations
+        """
+        for index in range(self.counts['delegations']):
+            delegator, validator = self._delegation_pair(index)
+            yield {'delegator_address': self.addresses[delegator],
+                   'shares': f'{self._delegation_amount(index)}{DECIMALS}',
+                   'validator_address': self.operators[validator]}
+
+    def _staking(self):
+        """
+        Returns the staking state
+        """
+        return {
+            'delegations': self._delegations(),
+            'exported': True,
+            'last_total_power': str(sum(self.powers)),
+            'last_validator_powers': (
+                {'address': self.operators[index], 'power': str(power)}
+                for index, power in enumerate(self.powers)),
+            'params': {'bond_denom': BOND_DENOM,
+                       'historical_entries': 10000,
+                       'max_entries': 7,
+                       'max_validators': self.counts['max_validators'],
+                       'min_commission_rate': '0.050000000000000000',
+                       'unbonding_time': '1814400s'},
+            'redelegations': [],
+            'unbonding_delegations': [],
+            'validators': self._staking_validators()
+        }
+
+    def _staking_validators(self):
+        """
+        Yields the staking validators, the first max_validators are bonded
+        """
+        for index, tokens in enumerate(self.tokens):
+            status = 'BOND_STATUS_BONDED' if index < self.bonded else \
+                'BOND_STATUS_UNBONDED'
+            yield {
+                'commission': {'commission_rates': {
+                    'max_change_rate': '0.010000000000000000',
+                    'max_rate': '0.200000000000000000',
+                    'rate': '0.050000000000000000'},
+                    'update_time': GENESIS_TIME},
+                'consensus_pubkey': {'@type': '/cosmos.crypto.ed25519.PubKey',
+                                     'key': self.keys[index][0]},
+                'delegator_shares': f'{tokens}{DECIMALS}',
+                'description': {'details': '', 'identity': '',
+                                'moniker': f'validator-{index}',
+                                'security_contact': '', 'website': ''},
+                'jailed': False,
+                'min_self_delegation': '1',
+                'operator_address': self.operators[index],
+                'status': status,
+                'tokens': str(tokens),
+                'unbonding_height': '0',
+                'unbonding_time': ZERO_TIME
+            }
+
+    def _consensus_validators(self):
+        """
+        Yields the consensus validator set
+        """
+        for index, power in enumerate(self.powers):
+            public_key, address, _ = self.keys[index]
+            yield {'address': address,
+                   'name': f'validator-{index}',
+                   'power': str(power),
+                   'pub_key': {'type': 'tendermint/PubKeyEd25519',
+                               'value': public_key}}
+
+    def _signing_infos(self):
+        """
+        Yields the signing infos of the validators
+        """
+        for index in range(self.counts['validators']):
+            consensus_address = self.keys[index][2]
+            yield {'address': consensus_address,
+                   'validator_signing_info': {
+                       'address': consensus_address,
+                       'index_offset': str(self._number('signing', index,
+                                                        10000)),
+                       'jailed_until': ZERO_TIME,
+                       'missed_blocks_counter': '0',
+                       'start_height': '0',
+                       'tombstoned': False}}
+
+    def _distribution(self):
+        """
+        Returns the distribution state
+        """
+        validators = range(self.counts['validators'])
+        previous_proposer = ''
+        if self.counts['validators']:
+            previous_proposer = self.keys[0][2]
+        return {
+            'delegator_starting_infos': (
+                {'delegator_address': self.addresses[delegator],
+                 'starting_info': {
+                     'height': '0',
+                     'previous_period': '1',
+                     'stake': f'{self._delegation_amount(index)}{DECIMALS}'},
+                 'validator_address': self.operators[validator]}
+                for index, (delegator, validator) in (
+                    (index, self._delegation_pair(index))
+                    for index in range(self.counts['starting_infos']))),
+            'delegator_withdraw_infos': [],
+            'fee_pool': {'community_pool': [
+                {'amount': f'1000000{DECIMALS}', 'denom': BOND_DENOM}]},
+            'outstanding_rewards': (
+                {'outstanding_rewards': [
+                    {'amount': f'1000{DECIMALS}', 'denom': BOND_DENOM}],
+                 'validator_address': self.operators[index]}
+                for index in validators),
+            'params': {'base_proposer_reward': '0.000000000000000000',
+                       'bonus_proposer_reward': '0.000000000000000000',
+                       'community_tax': '0.100000000000000000',
+                       'withdraw_addr_enabled': True},
+            'previous_proposer': previous_proposer,
+            'validator_accumulated_commissions': (
+                {'accumulated': {'commission': [
+                    {'amount': f'100{DECIMALS}', 'denom': BOND_DENOM}]},
+                 'validator_address': self.operators[index]}
+                for index in validators),
+            'validator_current_rewards': (
+                {'rewards': {'period': '2', 'rewards': []},
+                 'validator_address': self.operators[index]}
+                for index in validators),
+            'validator_historical_rewards': (
+                {'period': '1',
+                 'rewards': {'cumulative_reward_ratio': [],
+                             'reference_count': 2},
+                 'validator_address': self.operators[index]}
+                for index in validators),
+            'validator_slash_events': []
+        }
+
+    def _ibc(self):
+        """
+        Returns the IBC state, with one connection per client
+        """
+        clients = self.counts['ibc_clients']
+        channels = self.counts['ibc_channels']
+        packets = self.counts['ibc_packets']
+        return {
+            'channel_genesis': {
+                'ack_sequences': self._sequences(channels),
+                'acknowledgements': self._packets('ack', packets, channels),
+                'channels': (
+                    {'channel_id': f'channel-{index}',
+                     'connection_hops': [f'connection-{index % clients}'],
+                     'counterparty': {'channel_id': f'channel-{index + 1}',
+                                      'port_id': 'transfer'},
+                     'ordering': 'ORDER_UNORDERED',
+                     'port_id': 'transfer',
+                     'state': 'STATE_OPEN',
+                     'version': 'ics20-1'}
+                    for index in range(channels)),
+                'commitments': self._packets('commitment', packets, channels),
+                'next_channel_sequence': str(channels),
+                'receipts': [],
+                'recv_sequences': self._sequences(channels),
+                'send_sequences': self._sequences(channels)},
+            'client_genesis': {
+                'clients': (
+                    {'client_id': f'07-tendermint-{index}',
+                     'client_state': {
+                         '@type': '/ibc.lightclients.tendermint.v1.'
+                                  'ClientState',
+                         'chain_id': f'counterparty-{index}',
+                         'frozen_height': {'revision_height': '0',
+                                           'revision_number': '0'},
+                         'latest_height': {
+                             'revision_height': str(
+                                 1 + self._number('client', index, 10 ** 7)),
+                             'revision_number': '1'},
+                         'max_clock_drift': '40s',
+                         'trust_level': {'denominator': '3',
+                                         'numerator': '1'},
+                         'trusting_period': '1209600s',
+                         'unbonding_period': '1814400s',
+                         'upgrade_path': ['upgrade', 'upgradedIBCState']}}
+                    for index in range(clients)),
+                'clients_consensus': [],
+                'clients_metadata': [],
+                'create_localhost': False,
+                'next_client_sequence': str(clients),
+                'params': {'allowed_clients': ['07-tendermint']}},
+            'connection_genesis': {
+                'client_connection_paths': (
+                    {'client_id': f'07-tendermint-{index}',
+                     'paths': [f'connection-{index}']}
+                    for index in range(clients)),
+                'connections': (
+                    {'client_id': f'07-tendermint-{index}',
+                     'counterparty': {
+                         'client_id': f'07-tendermint-{index + 1}',
+                         'connection_id': f'connection-{index + 1}',
+                         'prefix': {'key_prefix': 'aWJj'}},
+                     'delay_period': '0',
+                     'id': f'connection-{index}',
+                     'state': 'STATE_OPEN',
+                     'versions': [{'features': ['ORDER_ORDERED',
+                                                'ORDER_UNORDERED'],
+                                   'identifier': '1'}]}
+                    for index in range(clients)),
+                'next_connection_sequence': str(clients),
+                'params': {'max_expected_time_per_block': '30000000000'}}
+        }
+
+    def _packets(self, kind: str, packets: int, channels: int):
+        """
+        Yields packet states spread over the channels
+        """
+        for index in range(packets):
+            yield {'channel_id': f'channel-{index % channels}',
+                   'data': base64.b64encode(
+                       self._digest(kind, index)).decode('ascii'),
+                   'port_id': 'transfer',
+                   'sequence': str(1 + index // channels)}
+
+    @staticmethod
+    def _sequences(channels: int):
+        """
+        Yields the next packet sequence of every channel
+        """
+        for index in range(channels):
+            yield {'channel_id': f'channel-{index}',
+                   'port_id': 'transfer',
+                   'sequence': '1'}
+
+
+class _Deferred:  # pylint: disable=R0903
+    """
+    A value computed when it is written, after the values before it
+    """
+
+    def __init__(self, function):
+        self.function = function
+
+
+def _dump(value, file):
+    """
+    Streams value as compact JSON to a binary file, writing generators
+    as lists, and returns the number of bytes written
+    """
+    pending = []
+    pending_size = 0
+    written = 0
+
+    def write(text):
+        nonlocal pending_size, written
+        pending.append(text)
+        pending_size += len(text)
+        if pending_size >= WRITE_BUFFER_SIZE:
+            data = ''.join(pending).encode('utf-8')
+            file.write(data)
+            written += len(data)
+            pending.clear()
+            pending_size = 0
+
+    encode = json.JSONEncoder(separators=(',', ':')).encode
+
+    def dump(value):
+        if isinstance(value, _Deferred):
+            value = value.function()
+        if isinstance(value, dict):
+            write('{')
+            for position, (key, item) in enumerate(value.items()):
+                write(('"' if position == 0 else ',"') + key + '":')
+                dump(item)
+            write('}')
+        elif isinstance(value, list) or hasattr(value, '__next__'):
+            write('[')
+            for position, item in enumerate(value):
+                if position:
+                    write(',')
+                # Entries of large lists are small and encoded in one call
+                write(encode(item))
+            write(']')
+        else:
+            write(encode(value))
+
+    dump(value)
+    data = ''.join(pending).encode('utf-8')
+    file.write(data)
+    return written + len(data)
+
+
+def main(output='synthetic_genesis.json', preset='default', seed=0):
+    """
+    Writes a synthetic genesis with the counts of a preset
+    """
+    start = time.perf_counter()
+    summary = generate_genesis(output, int(seed), **PRESETS[preset])
+    print(f'{summary["bytes_written"] / 1e6:.1f} MB written to {output} '
+          f'in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
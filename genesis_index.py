@@ -0,0 +1,112 @@
+"""
+Genesis Index
+
+This module provides lookup indexes over the large lists of a genesis
+file, so the tinker helpers don't scan them on every call.
+
+An index maps keys to positions in the list it was built from. It is
+built on the first lookup and checked on every hit, so it is rebuilt
+automatically when the list is replaced (e.g. after a reload) or when
+the item at an indexed position no longer has the key it was indexed
+under. A miss also rebuilds the index before returning None, so items
+added or replaced by other code are always found; a miss costs as much
+as a scan, a hit is a dict lookup.
+
+Lists are scanned with list.__iter__, so a copy-on-write view (see
+cow_tree) only copies the entries that are actually returned.
+"""
+
+
+class ListIndex:
+    """
+    Maps keys to the first item of a list with that key.
+    key is a function returning the key of an item.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self._items = None
+        self._positions = {}
+
+    def get(self, items: list, key):
+        """
+        Returns the first item of items with the given key, or None
+        """
+        return self.get_many(items, [key]).get(key)
+
+    def get_many(self, items: list, keys):
+        """
+        Returns a dictionary of the first item of items for every key
+        that has one. The index is rebuilt at most once.
+        """
+        fresh = self._items is not items
+        if fresh:
+            self._build(items)
+        found = {}
+        for key in keys:
+            position = self._positions.get(key)
+            if fresh:
+                stale = False
+            elif position is None:
+                stale = True
+            else:
+                stale = position >= len(items) or \
+                    self.key(items[position]) != key
+            if stale:
+                self._build(items)
+                fresh = True
+                position = self._positions.get(key)
+            if position is not None:
+                found[key] = items[position]
+        return found
+
+    def add(self, items: list, item):
+        """
+        Appends item to items and indexes it
+        """
+        if self._items is not items:
+            self._build(items)
+        items.append(item)
+        self._positions.setdefault(self.key(item), len(items) - 1)
+
+    def invalidate(self):
+        """
+        Forgets the indexed list, the next lookup rebuilds the index
+        """
+        self._items = None
+        self._positions = {}
+
+    def _build(self, items: list):
+        """
+        Indexes the first position of every key in items
+        """
+        positions = {}
+        key = self.key
+        for position, item in enumerate(list.__iter__(items)):
+            positions.setdefault(key(item), position)
+        self._items = items
+        self._positions = positions
+
+
+def scan(items: list, key, value):
+    """
+    Returns the first item of items for which key(item) == value, or None
+    """
+    for position, item in enumerate(list.__iter__(items)):
+        if key(item) == value:
+            return items[position]
+    return None
+
+
+def scan_many(items: list, key, values):
+    """
+    Returns a dictionary of the first item of items for which
+    key(item) == value, for every value that has one, in a single scan
+    """
+    values = set(values)
+    found = {}
+    for position, item in enumerate(list.__iter__(items)):
+        item_key = key(item)
+        if item_key in values and item_key not in found:
+            found[item_key] = items[position]
+    return found
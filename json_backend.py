@@ -0,0 +1,228 @@
+"""
+JSON Backend
+
+This module provides the JSON parsers and encoders GenesisTinker uses to
+load and save genesis files: orjson when it is installed, the json
+module otherwise.
+
+Every backend gives the same results as the json module:
+loads returns the same tree as json.loads
+dumps returns the bytes of json.dumps(value, indent=False), which is
+what GenesisTinker saves, so checksums do not depend on the backend
+
+orjson differs from the json module on a few values, which are found
+with a scan of the input or output and handed to the json module:
+Integers with 19 digits or more, which orjson may parse as floats or
+cannot encode
+Floats, which orjson formats differently (1e16 instead of 1e+16)
+NaN and Infinity, which orjson rejects when parsing
+Lone surrogates and non-string keys, which orjson cannot encode
+Non-ASCII characters and DEL are written raw by orjson, they are
+escaped afterwards the way the json module escapes them.
+
+Both write the records of a compact tree (see compact_tree) as the
+objects they were parsed from.
+
+orjson writes NaN and Infinity as null, so an output holding null is
+checked for non-finite floats and handed to the json module if it has
+any.
+"""
+
+import json
+import math
+import re
+
+import compact_tree
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Members of objects shallower than this are encoded one at a time
+SPLIT_DEPTH = 2
+
+# Numbers with this many digits may not fit in 64 bits
+LONG_INTEGER_DIGITS = 19
+# Inputs are scanned for long integers in chunks of this size
+SCAN_CHUNK_SIZE = 1 << 24
+
+# Every digit becomes a zero, so a run of digits is a run of zeros
+_DIGITS_TO_ZERO = bytes.maketrans(b'123456789', b'0' * 9)
+_LONG_RUN = b'0' * LONG_INTEGER_DIGITS
+_NUMBER_PRECEDED_BY = frozenset(b' \t\n\r:,[')
+_ZERO = ord('0')
+# A float in the output of orjson once it is unindented: it starts the
+# output or follows a colon or a newline, and has a point or exponent
+_FLOAT_START = re.compile(rb'-?[0-9]+[.eE]')
+_FLOAT_MEMBER = re.compile(rb': -?[0-9]+[.eE]')
+_FLOAT_ITEM = re.compile(rb'\n-?[0-9]+[.eE]')
+_INDENTATION = re.compile(rb'\n +')
+_NOT_ASCII = re.compile(rb'[\x7f-\xff]+')
+
+
+class JsonBackend:
+    """
+    The json module
+    """
+    name = 'json'
+
+    @staticmethod
+    def loads(data):
+        """
+        Returns the tree of the JSON document in data
+        (str, bytes or bytearray)
+        """
+        return json.loads(data)
+
+    @staticmethod
+    def dumps(value):
+        """
+        Returns value as bytes in the layout of
+        json.dumps(value, indent=False)
+        """
+        return json.dumps(value, indent=False,
+                          default=_default).encode('ascii')
+
+    def dump(self, value, target, depth: int = 0):
+        """
+        Writes value to the binary file object target in the layout of
+        json.dump(value, target, indent=False). The members of the top
+        level objects are encoded one at a time, so the whole output is
+        never held in memory.
+        """
+        if depth >= SPLIT_DEPTH or not isinstance(value, dict) or not value:
+            target.write(self.dumps(value))
+            return
+        target.write(b'{\n')
+        for position, (key, member) in enumerate(value.items()):
+            if position:
+                target.write(b',\n')
+            target.write(self.dumps(key if isinstance(key, str)
+                                    else _key_string(key)) + b': ')
+            self.dump(member, target, depth + 1)
+        target.write(b'\n}')
+
+
+class OrjsonBackend(JsonBackend):
+    """
+    orjson, with the json module for the values it handles differently
+    """
+    name = 'orjson'
+
+    @staticmethod
+    def loads(data):
+        if not _has_long_integer(data):
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                pass
+        return json.loads(data)
+
+    @staticmethod
+    def dumps(value):
+        # pylint: disable=E1101
+        try:
+            data = orjson.dumps(value, default=_default,
+                                option=orjson.OPT_INDENT_2)
+        except orjson.JSONEncodeError:
+            return JsonBackend.dumps(value)
+        if b'null' in data and _has_non_finite(value):
+            return JsonBackend.dumps(value)
+        data = _INDENTATION.sub(b'\n', data)
+        if _FLOAT_START.match(data) or _FLOAT_MEMBER.search(data) or \
+                _FLOAT_ITEM.search(data):
+            return JsonBackend.dumps(value)
+        if not data.isascii() or b'\x7f' in data:
+            data = _NOT_ASCII.sub(_escape, data)
+        return data
+
+
+BACKENDS = {backend.name: backend for backend in (OrjsonBackend, JsonBackend)}
+
+
+def available_backends():
+    """
+    Returns the names of the installed backends, fastest first
+    """
+    return [name for name in BACKENDS if name != 'orjson' or orjson]
+
+
+def get_backend(name: str = None):
+    """
+    Returns the backend called name, or the fastest one installed
+    """
+    if name is None:
+        name = available_backends()[0]
+    if name not in available_backends():
+        raise Exception('JSON backend not available', name)
+    return BACKENDS[name]()
+
+
+def _has_long_integer(data):
+    """
+    Returns whether the JSON document in data may hold a number with
+    LONG_INTEGER_DIGITS digits or more. Runs of digits inside strings
+    are only counted when they follow a character a number can follow.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8', 'surrogatepass')
+    for offset in range(0, len(data), SCAN_CHUNK_SIZE):
+        chunk = data[offset:offset + SCAN_CHUNK_SIZE +
+                     LONG_INTEGER_DIGITS].translate(_DIGITS_TO_ZERO)
+        position = chunk.find(_LONG_RUN)
+        while position != -1 and position < SCAN_CHUNK_SIZE:
+            start = offset + position
+            if start and data[start - 1] == ord('-'):
+                start -= 1
+            if start == 0 or data[start - 1] in _NUMBER_PRECEDED_BY:
+                return True
+            # Skip the rest of the run, a run that continues from the
+            # previous chunk is skipped the same way
+            while position < len(chunk) and chunk[position] == _ZERO:
+                position += 1
+            position = chunk.find(_LONG_RUN, position)
+    return False
+
+
+def _has_non_finite(value):
+    """
+    Returns whether value holds NaN or an infinite float
+    """
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, compact_tree.Record):
+            stack.extend(value.to_dict().values())
+    return False
+
+
+def _key_string(key):
+    """
+    Returns the string json.dumps writes for a key that is not a string
+    """
+    return next(iter(json.loads(json.dumps({key: None}))))
+
+
+def _default(value):
+    """
+    Returns the records of a compact tree as dicts, see compact_tree
+    """
+    if isinstance(value, compact_tree.Record):
+        return value.to_dict()
+    raise TypeError(f'Object of type {type(value).__name__} '
+                    'is not JSON serializable')
+
+
+def _escape(match):
+    """
+    Escapes a run of non-ASCII characters the way json.dumps does
+    """
+    return json.dumps(match.group().decode('utf-8'))[1:-1].encode('ascii')
@@ -0,0 +1,405 @@
+"""
+JSON Stream
+
+This module provides a streaming JSON tokenizer and a normaliser that
+rewrites a JSON document in the same layout as `jq '.'`:
+Two space indentation
+"key": value
+Empty containers as {} and []
+Strings escaped the way jq escapes them
+Numbers formatted the way jq 1.6 prints doubles
+
+The document is read in chunks and never parsed into a tree, so memory
+use is bounded by the chunk size and the largest single token.
+Duplicate keys are written as they appear.
+"""
+
+import json
+import math
+import os
+import re
+import sys
+import time
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+_STRING = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+# Strings and punctuation are the tokens, numbers and literals are
+# found in the gaps between them
+_SPLIT = re.compile(rb'(' + _STRING + rb'|[{}\[\]:,])', re.DOTALL)
+_SCALAR = re.compile(rb'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?'
+                     rb'|true|false|null')
+_WHITESPACE = b' \t\n\r'
+_NEEDS_FORMATTING = re.compile(rb'[\\\x00-\x1f\x7f-\xff]')
+_CONTROL = re.compile(rb'[\x00-\x1f\x7f]')
+_SHORT_INTEGER = re.compile(rb'-?(?:0|[1-9][0-9]{0,14})')
+_JQ_ESCAPE = re.compile('[\\\\"\x00-\x1f\x7f]')
+_JQ_ESCAPES = {'"': '\\"', '\\': '\\\\', '\b': '\\b', '\f': '\\f',
+               '\n': '\\n', '\r': '\\r', '\t': '\\t'}
+
+QUOTE = ord('"')
+OPEN_OBJECT = ord('{')
+CLOSE_OBJECT = ord('}')
+OPEN_ARRAY = ord('[')
+CLOSE_ARRAY = ord(']')
+COLON = ord(':')
+COMMA = ord(',')
+
+KEY = 'key'
+COLON_NEXT = 'colon'
+VALUE = 'value'
+COMMA_NEXT = 'comma'
+
+
+def _pieces(source, chunk_size):
+    """
+    Reads the binary file object source one chunk at a time and yields
+    lists of alternating gaps and tokens: [gap, token, gap, token, ...]
+    Tokens are strings and punctuation, gaps hold the whitespace, numbers
+    and literals in between. The last list ends with the trailing gap of
+    the document and an empty token.
+    """
+    buffer = b''
+    eof = False
+    while not eof:
+        # Grow the reads so a long string is not rescanned too often
+        chunk = source.read(max(chunk_size, len(buffer)))
+        eof = not chunk
+        pieces = _SPLIT.split(buffer + chunk)
+        # The trailing gap may be a number cut by the end of the chunk
+        end = len(pieces) - 1
+        gaps = b'\0'.join(pieces[0:end:2])
+        quote = gaps.find(b'"')
+        if quote != -1:
+            # A quote in a gap starts a string that ends in a later chunk
+            end = 2 * gaps.count(b'\0', 0, quote)
+        if eof:
+            if end != len(pieces) - 1 or b'"' in pieces[end]:
+                raise ValueError('Unterminated string')
+            pieces.append(b'')
+        else:
+            buffer = b''.join(pieces[end:])
+            del pieces[end:]
+        yield pieces
+
+
+def tokens(source, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Yields the tokens of the JSON document read from the binary file
+    object source, as bytes:
+    Punctuation: { } [ ] : ,
+    Strings, including the quotes and escapes as they appear
+    Numbers and the true, false and null literals
+    """
+    for pieces in _pieces(source, chunk_size):
+        iterator = iter(pieces)
+        for gap, token in zip(iterator, iterator):
+            if gap:
+                gap = gap.strip(_WHITESPACE)
+                if gap:
+                    yield _scalar(gap)
+            if token:
+                yield token
+
+
+def normalise(source, target, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Reads a JSON document from the binary file object source and writes
+    it to the binary file object target in the layout of `jq '.'`.
+    Returns the number of bytes written.
+    """
+    # pylint: disable=R0912,R0914,R0915
+    written = 0
+    # Newline and indentation of the items at every depth
+    indents = [b'\n']
+    separators = [b',\n']
+    # (in_object, count) of every enclosing container
+    stack = []
+    depth = 0
+    in_object = False
+    count = 0
+    expect = VALUE
+    needs_formatting = _NEEDS_FORMATTING.search
+
+    for pieces in _pieces(source, chunk_size):
+        output = []
+        append = output.append
+        # Most chunks have no string that jq would write differently
+        clean = needs_formatting(b''.join(pieces[1::2])) is None
+        iterator = iter(pieces)
+        for gap, token in zip(iterator, iterator):
+            if gap and gap.strip(_WHITESPACE):
+                # A number or literal
+                if expect != VALUE:
+                    raise ValueError('Unexpected value', gap)
+                if depth and not in_object:
+                    append(separators[depth] if count else indents[depth])
+                    count += 1
+                append(_format_number(_scalar(gap.strip(_WHITESPACE))))
+                if depth:
+                    expect = COMMA_NEXT
+                else:
+                    append(b'\n')
+            if not token:
+                break
+            first = token[0]
+
+            if first == QUOTE:
+                if expect == KEY:
+                    append(separators[depth] if count else indents[depth])
+                    count += 1
+                    expect = COLON_NEXT
+                elif expect == VALUE:
+                    if depth and not in_object:
+                        append(separators[depth] if count else indents[depth])
+                        count += 1
+                    expect = COMMA_NEXT if depth else VALUE
+                else:
+                    raise ValueError('Unexpected string', token[:20])
+                append(token if clean or needs_formatting(token) is None
+                       else _format_string(token))
+                if not depth:
+                    append(b'\n')
+            elif first == COLON:
+                if expect != COLON_NEXT:
+                    raise ValueError('Unexpected colon')
+                append(b': ')
+                expect = VALUE
+            elif first == COMMA:
+                if expect != COMMA_NEXT:
+                    raise ValueError('Unexpected comma')
+                expect = KEY if in_object else VALUE
+            elif first in (OPEN_OBJECT, OPEN_ARRAY):
+                if expect != VALUE:
+                    raise ValueError('Unexpected token', token)
+                if depth and not in_object:
+                    append(separators[depth] if count else indents[depth])
+                    count += 1
+                stack.append((in_object, count))
+                depth += 1
+                if len(indents) <= depth:
+                    indents.append(indents[-1] + b'  ')
+                    separators.append(separators[-1] + b'  ')
+                append(token)
+                in_object = first == OPEN_OBJECT
+                count = 0
+                expect = KEY if in_object else VALUE
+            else:
+                if not depth or in_object != (first == CLOSE_OBJECT) or \
+                        not (expect == COMMA_NEXT or count == 0):
+                    raise ValueError('Unexpected token', token)
+                if count:
+                    append(indents[depth - 1])
+                append(token)
+                in_object, count = stack.pop()
+                depth -= 1
+                if depth:
+                    expect = COMMA_NEXT
+                else:
+                    # End of a top level value
+                    expect = VALUE
+                    append(b'\n')
+        written += target.write(b''.join(output))
+
+    if depth or expect != VALUE:
+        raise ValueError('Unexpected end of JSON document')
+    return written
+
+
+def normalise_file(input_path: str, output, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Normalises the JSON file at input_path into output, which is either
+    a path or a binary file object.
+    Returns the bytes read and written, the time taken and the throughput.
+    """
+    start = time.perf_counter()
+    with open(input_path, 'rb') as source:
+        if isinstance(output, (str, os.PathLike)):
+            with open(output, 'wb') as target:
+                written = normalise(source, target, chunk_size)
+        else:
+            written = normalise(source, output, chunk_size)
+        read = source.tell()
+    seconds = time.perf_counter() - start
+    return {
+        'bytes_read': read,
+        'bytes_written': written,
+        'seconds': seconds,
+        'mb_per_second': read / 1e6 / seconds if seconds else 0.0
+    }
+
+
+def balance_coin_edits(buffer, values):
+    """
+    Finds the coin lists in app_state.bank.balances of a document in the
+    layout of `jq '.'` that contain one of values in a denom and are no
+    longer sorted by denom.
+    buffer can be bytes or a memory map of the document.
+    Returns a list of (start, end, sorted_coins) edits, in order.
+    Every coin is moved as it is written, so applying the edits gives
+    the same output as `jq '.app_state.bank.balances |=
+    map(.coins |= sort_by(.denom))'`.
+    """
+    values = [value.encode('utf-8') if isinstance(value, str) else value
+              for value in values if value]
+    if not values:
+        return []
+    start, end = _balances_region(buffer)
+    if start == -1:
+        return []
+
+    denoms = re.compile(rb'\n {14}"denom": "[^"\n]*?(?:' +
+                        b'|'.join(re.escape(value) for value in values) + b')')
+    edits = []
+    block_end = start
+    for match in denoms.finditer(buffer, start, end):
+        if match.start() < block_end:
+            # Already checked this coin list
+            continue
+        block_start = buffer.rfind(_COINS_START, start, match.start())
+        block_end = buffer.find(_COINS_END, match.start(), end)
+        if block_start == -1 or block_end == -1:
+            continue
+        block_start += len(_COINS_START)
+        coins = _COIN_SPLIT.split(buffer[block_start:block_end])
+        keys = [_denom_key(coin) for coin in coins]
+        if keys == sorted(keys):
+            continue
+        order = sorted(range(len(coins)), key=keys.__getitem__)
+        edits.append((block_start, block_end,
+                      b',\n'.join(coins[index] for index in order)))
+    return edits
+
+
+def apply_edits(buffer, edits, target, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Writes buffer to the binary file object target with every
+    (start, end, replacement) edit applied. The edits must be in order
+    and must not overlap.
+    """
+    position = 0
+    for start, end, replacement in edits + [(len(buffer), len(buffer), b'')]:
+        while position < start:
+            target.write(buffer[position:min(start, position + chunk_size)])
+            position = min(start, position + chunk_size)
+        target.write(replacement)
+        position = end
+
+
+_COINS_START = b'\n          "coins": [\n'
+_COINS_END = b'\n          ]'
+# Coins are objects at an indentation of 12 spaces
+_COIN_SPLIT = re.compile(rb',\n(?= {12}\{)')
+_DENOM = re.compile(rb'\n {14}"denom": ("[^"\\]*(?:\\.[^"\\]*)*")')
+
+
+def _balances_region(buffer):
+    """
+    Returns the start and end offsets of the items of
+    app_state.bank.balances, or (-1, -1) when there are none
+    """
+    not_found = (-1, -1)
+    app_state = buffer.find(b'\n  "app_state": {\n')
+    if app_state == -1:
+        return not_found
+    app_state_end = buffer.find(b'\n  }', app_state)
+    bank = buffer.find(b'\n    "bank": {\n', app_state, app_state_end)
+    if bank == -1:
+        return not_found
+    bank_end = buffer.find(b'\n    }', bank, app_state_end)
+    balances = buffer.find(b'\n      "balances": [\n', bank, bank_end)
+    if balances == -1:
+        return not_found
+    balances_end = buffer.find(b'\n      ]', balances, bank_end)
+    if balances_end == -1:
+        return not_found
+    return balances, balances_end
+
+
+def _denom_key(coin: bytes):
+    """
+    Returns the sort key jq uses for the denom of a coin:
+    missing denoms first, then the UTF-8 bytes of the denom
+    """
+    match = _DENOM.search(b'\n' + coin)
+    if match is None:
+        return (False, b'')
+    denom = match.group(1)
+    if b'\\' in denom:
+        return (True, json.loads(denom).encode('utf-8', 'surrogatepass'))
+    return (True, denom[1:-1])
+
+
+def _scalar(gap: bytes):
+    """
+    Checks that a gap between tokens holds a single number or literal
+    """
+    if not _SCALAR.fullmatch(gap):
+        raise ValueError('Invalid JSON near', gap[:20])
+    return gap
+
+
+def _format_string(token: bytes):
+    """
+    Re-escapes a string token the way jq does.
+    jq writes non-ASCII characters as raw UTF-8 and escapes control
+    characters and DEL.
+    """
+    if _NEEDS_FORMATTING.search(token) is None:
+        return token
+    if b'\\' not in token and not _CONTROL.search(token):
+        try:
+            token.decode('utf-8')
+            return token
+        except UnicodeDecodeError:
+            pass
+    value = json.loads(token.decode('utf-8', 'replace'))
+    return ('"' + _JQ_ESCAPE.sub(_escape_character, value) + '"').encode(
+        'utf-8', 'surrogatepass')
+
+
+def _escape_character(match):
+    """
+    Returns the jq escape sequence of a single character
+    """
+    character = match.group()
+    return _JQ_ESCAPES.get(character, f'\\u{ord(character):04x}')
+
+
+def _format_number(token: bytes):
+    """
+    Formats a number token the way jq 1.6 does (literals are unchanged): as the shortest
+    representation of the double, in exponent form when the decimal
+    point would be more than 15 places past the significant digits or
+    more than three places before them.
+    """
+    if token[0] in b'tfn' or _SHORT_INTEGER.fullmatch(token):
+        return token
+    value = float(token)
+    if math.isinf(value):
+        value = math.copysign(sys.float_info.max, value)
+    if value == 0:
+        return b'-0' if math.copysign(1.0, value) < 0 else b'0'
+
+    sign = '-' if value < 0 else ''
+    mantissa, _, exponent = repr(abs(value)).partition('e')
+    whole, _, fraction = mantissa.partition('.')
+    digits = whole + fraction
+    point = len(whole) + int(exponent or 0)
+    stripped = digits.lstrip('0')
+    point -= len(digits) - len(stripped)
+    digits = stripped.rstrip('0')
+
+    if point <= -4 or point > len(digits) + 15:
+        text = digits[0]
+        if len(digits) > 1:
+            text += '.' + digits[1:]
+        power = point - 1
+        text += f"e{'-' if power < 0 else '+'}{abs(power):02d}"
+    elif point <= 0:
+        text = '0.' + '0' * -point + digits
+    elif point >= len(digits):
+        text = digits + '0' * (point - len(digits))
+    else:
+        text = digits[:point] + '.' + digits[point:]
+    return (sign + text).encode('ascii')
@@ -0,0 +1,250 @@
+"""
+Lazy JSON
+
+This module provides lazy parsing of genesis documents laid out with
+two space indentation, such as the preprocessing file (see json_stream)
+or exports written with an indented encoder.
+
+In that layout every member of an object at depth n starts on its own
+line with 2 * n spaces of indentation, and JSON strings never contain
+a raw newline, so the members of the top level object and of the
+objects it contains can be found by searching for their indentation,
+without tokenizing the values in between. Their values
+are kept as raw bytes and only parsed when they are first accessed, so
+sections no task reads (e.g. wasm, ibc or authz) are never parsed.
+
+dump writes them back in the layout of json.dumps(value, indent=False),
+like the parsed sections: their indentation is removed and non-ASCII
+characters and DEL are escaped. Sections the layout can't be fixed up
+for that way, e.g. with floats, -0, escapes json.dumps writes
+differently or other whitespace, are parsed and encoded again.
+
+A LazyObject parses a member on __getitem__, get, setdefault, pop,
+items and values. Iterating over its keys and membership tests do not
+parse anything.
+"""
+
+import functools
+import json
+import re
+
+# Objects at depth 0 and 1 are split, e.g. the top level and app_state
+MAX_SPLIT_DEPTH = 2
+_VALUE_START = frozenset(b'{["-0123456789tfn')
+_WHITESPACE = frozenset(b' \t\n\r')
+_INDENTATION = re.compile(rb'\n +')
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
+_NOT_ASCII = re.compile(rb'[\x7f-\xff]+')
+# Escapes json.dumps writes in another way, tested at every backslash
+_OTHER_ESCAPE = re.compile(
+    rb'\\(?!["\\bfnrt]|u00(?:0[0-7bef]|1[0-9a-f]|7f))')
+# Outside strings, what json.dumps(value, indent=False) writes in
+# another way: floats, -0, other spaces and line breaks
+_OTHER_LAYOUT = re.compile(
+    rb'[0-9][.eE]|-0(?![0-9])|[\t\r]|(?<!:) |:(?! )|,(?!\n)'
+    rb'|(?<![,\[{])\n(?![\]}])|[\[{]\n[\]}]|[\[{](?![\n\]}])'
+    rb'|(?<![\n\[{])[\]}]')
+
+
+class RawJSON:
+    """
+    A value that has not been parsed yet, at data[start:end].
+    The document is shared by all its values and never copied.
+    """
+    __slots__ = ('data', 'start', 'end', 'depth')
+
+    def __init__(self, data: bytes, start: int, end: int, depth: int):
+        self.data = data
+        self.start = start
+        self.end = end
+        self.depth = depth
+
+    def parse(self):
+        """
+        Returns the parsed value, split into a LazyObject
+        if it is an object shallower than MAX_SPLIT_DEPTH
+        """
+        if self.depth < MAX_SPLIT_DEPTH:
+            members = split_object(self.data, self.start, self.end,
+                                   self.depth)
+            if members is not None:
+                return LazyObject(members)
+        return json.loads(self.data[self.start:self.end])
+
+    def view(self):
+        """
+        Returns a memoryview of the unparsed value
+        """
+        return memoryview(self.data)[self.start:self.end]
+
+    def dumps(self, backend=None):
+        """
+        Returns the unparsed value as bytes in the layout of
+        json.dumps(value, indent=False), parsing it only if its layout
+        can't be fixed up. backend (see json_backend) parses and
+        encodes it if set.
+        """
+        data = _INDENTATION.sub(b'\n', self.view())
+        if _OTHER_ESCAPE.search(data) is None and \
+                _OTHER_LAYOUT.search(_STRING.sub(b'""', data)) is None:
+            if not data.isascii() or b'\x7f' in data:
+                data = _NOT_ASCII.sub(_escape, data)
+            return data
+        if backend is None:
+            return json.dumps(json.loads(data),
+                              indent=False).encode('ascii')
+        return backend.dumps(backend.loads(data))
+
+
+class LazyObject(dict):
+    """
+    A JSON object whose member values are parsed on first access
+    """
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, RawJSON):
+            value = value.parse()
+            dict.__setitem__(self, key, value)
+        return value
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            dict.__setitem__(self, key, default)
+        return self[key]
+
+    def pop(self, key, *default):
+        value = dict.pop(self, key, *default)
+        if isinstance(value, RawJSON):
+            return value.parse()
+        return value
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def raw_keys(self):
+        """
+        Returns the keys of the members that have not been parsed
+        """
+        return [key for key, value in dict.items(self)
+                if isinstance(value, RawJSON)]
+
+
+def loads(data: bytes):
+    """
+    Returns the document in data as a LazyObject if it is an object in
+    the two space layout, fully parsed otherwise
+    """
+    start = 0
+    end = len(data)
+    while start < end and data[start] in _WHITESPACE:
+        start += 1
+    while end > start and data[end - 1] in _WHITESPACE:
+        end -= 1
+    return RawJSON(data, start, end, 0).parse()
+
+
+def split_object(data: bytes, start: int, end: int, depth: int):
+    """
+    Returns a dictionary of the keys of the object at data[start:end],
+    laid out at the given depth, to the RawJSON of their values,
+    or None if it is not an object in that layout
+    """
+    closing = b'\n' + b' ' * (2 * depth) + b'}'
+    if data[start:start + 1] != b'{' or \
+            not data.startswith(closing, end - len(closing), end):
+        return None
+    end -= len(closing)
+    matches = list(_member_pattern(depth).finditer(data, start + 1, end))
+    if not matches or matches[0].start() != start + 1:
+        return None
+
+    members = {}
+    # Every value but the last is followed by a comma
+    ends = [match.start() - 1 for match in matches[1:]] + [end]
+    for match, value_end in zip(matches, ends):
+        if data[match.end()] not in _VALUE_START or \
+                (value_end != end and data[value_end] != ord(',')):
+            return None
+        members[json.loads(match.group(1))] = RawJSON(
+            data, match.end(), value_end, depth + 1)
+    return members
+
+
+@functools.lru_cache()
+def _member_pattern(depth: int):
+    """
+    Returns the pattern of the key of a member of an object at depth
+    """
+    return re.compile(rb'\n' + b' ' * (2 * depth + 2) +
+                      rb'("[^"\\]*(?:\\.[^"\\]*)*"): ')
+
+
+def dump(value, target, backend=None):
+    """
+    Writes value to the file object target in the same layout as
+    json.dump(value, target, indent=False), without parsing the members
+    of lazy objects that were never parsed (see RawJSON.dumps).
+    The other values are written by backend (see json_backend) if set.
+    target must accept both str and bytes-like objects.
+    """
+    if not isinstance(value, LazyObject):
+        if backend is None:
+            json.dump(value, target, indent=False)
+        else:
+            backend.dump(value, target)
+        return
+    if not value:
+        target.write('{}')
+        return
+    target.write('{\n')
+    for position, (key, member) in enumerate(dict.items(value)):
+        if position:
+            target.write(',\n')
+        target.write(json.dumps(key) + ': ')
+        if isinstance(member, RawJSON):
+            target.write(member.dumps(backend))
+        else:
+            dump(member, target, backend)
+    target.write('\n}')
+
+
+def dumps(value, backend=None):
+    """
+    Returns value as bytes in the layout of
+    json.dumps(value, indent=False), see dump
+    """
+    if not isinstance(value, LazyObject):
+        if backend is None:
+            return json.dumps(value, indent=False).encode('ascii')
+        return backend.dumps(value)
+    parts = _Parts()
+    dump(value, parts, backend)
+    return b''.join(parts)
+
+
+class _Parts(list):
+    """
+    Collects what dump writes as bytes
+    """
+
+    def write(self, data):
+        """
+        Appends data, encoded if it is a str
+        """
+        self.append(data.encode('ascii') if isinstance(data, str) else data)
+
+
+def _escape(match):
+    """
+    Escapes a run of non-ASCII characters the way json.dumps does
+    """
+    return json.dumps(match.group().decode('utf-8'))[1:-1].encode('ascii')
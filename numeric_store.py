@@ -0,0 +1,156 @@
+"""
+Numeric Store
+
+This module provides a store of the parsed values of the numeric
+fields the tinker helpers change: coin amounts, validator tokens and
+delegator shares, delegation shares and starting info stakes. Genesis
+files hold them as strings, so every change parses a field and formats
+it back; with a deferring store a field is parsed the first time it is
+read and formatted once, when the store is flushed before the genesis
+is saved.
+
+The values are kept in one column per field name (see COLUMNS), with
+the objects holding the fields identified by their id. A column keeps
+these objects alive, so their ids are not reused while it holds them.
+While a store defers, the fields it has read must only be changed
+through it and only read through it until it is flushed.
+
+A store that does not defer parses and formats on every call, which
+is what the helpers did before it existed.
+"""
+
+from operator import itemgetter
+
+# Field name: (parse, format)
+COLUMNS = {
+    'amount': (int, str),
+    'tokens': (int, str),
+    'delegator_shares': (float, lambda value: format(value, '.18f')),
+    'shares': (float, lambda value: format(value, '.18f')),
+    'stake': (float, lambda value: format(value, '.18f')),
+}
+# Decimal fields are written with 18 digits after the point, which is
+# enough to read back the same float from 0.1 upwards
+EXACT_DECIMAL = 0.1
+
+
+class Column:
+    """
+    The parsed values of one field of many objects
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.parse, self.format = COLUMNS[key]
+        self.holders = {}
+        self.values = {}
+        self.changed = set()
+
+    def get(self, holder):
+        """
+        Returns the value of the field of holder, parsed once
+        """
+        value = self.values.get(id(holder))
+        if value is None:
+            value = self.parse(holder[self.key])
+            self.holders[id(holder)] = holder
+            self.values[id(holder)] = value
+        return value
+
+    def set(self, holder, value):
+        """
+        Sets the field of holder to value, written out by flush
+        """
+        if self.parse is float and value and abs(value) < EXACT_DECIMAL:
+            # What a later parse of the written field would return
+            value = self.parse(self.format(value))
+        key = id(holder)
+        self.holders[key] = holder
+        self.values[key] = value
+        self.changed.add(key)
+
+    def add(self, holder, increase):
+        """
+        Adds increase to the field of holder, returns the new value
+        """
+        value = self.values.get(id(holder))
+        if value is None:
+            value = self.parse(holder[self.key])
+        value += increase
+        self.set(holder, value)
+        return value
+
+    def total(self, holders):
+        """
+        Returns the sum of the field of every holder. The changed values
+        are written out first, so the fields are summed as they are.
+        """
+        self.flush()
+        return sum(map(self.parse, map(itemgetter(self.key), holders)))
+
+    def flush(self):
+        """
+        Writes the changed values to their fields, returns their number
+        """
+        for key in self.changed:
+            self.holders[key][self.key] = self.format(self.values[key])
+        flushed = len(self.changed)
+        self.changed = set()
+        return flushed
+
+
+class NumericStore:
+    """
+    The columns of the numeric fields of a genesis
+    """
+
+    def __init__(self, deferred: bool = True):
+        self.deferred = deferred
+        self.clear()
+
+    def get(self, holder, key: str):
+        """
+        Returns the parsed value of the field key of holder
+        """
+        if not self.deferred:
+            return COLUMNS[key][0](holder[key])
+        return self._columns[key].get(holder)
+
+    def set(self, holder, key: str, value):
+        """
+        Sets the field key of holder to value
+        """
+        if not self.deferred:
+            holder[key] = COLUMNS[key][1](value)
+            return
+        self._columns[key].set(holder, value)
+
+    def add(self, holder, key: str, increase):
+        """
+        Adds increase to the field key of holder, returns the new value
+        """
+        if not self.deferred:
+            parse, format_value = COLUMNS[key]
+            value = parse(holder[key]) + increase
+            holder[key] = format_value(value)
+            return value
+        return self._columns[key].add(holder, increase)
+
+    def total(self, holders, key: str):
+        """
+        Returns the sum of the field key of every holder
+        """
+        return self._columns[key].total(holders)
+
+    def flush(self):
+        """
+        Writes the changed values to their fields, returns their number
+        """
+        return sum(column.flush() for column in self._columns.values())
+
+    def clear(self):
+        """
+        Forgets every value without writing it, after the genesis has
+        been replaced
+        """
+        self._columns = {key: Column(key) for key in COLUMNS}
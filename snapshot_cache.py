@@ -0,0 +1,102 @@
+"""
+Snapshot Cache
+
+This module provides an on-disk cache of parsed genesis trees used by
+GenesisTinker.load_file.
+
+Snapshots are keyed by the sha256 of the input file, so they are
+invalidated as soon as the input changes, and are stored with marshal,
+which loads the plain dict/list/str/int trees produced by json about
+twice as fast as json parses the original text. The marshal format
+depends on the Python version, which is part of the key as well.
+
+Entries are stored in a CacheDirectory, which handles atomic population
+and least recently used eviction.
+"""
+
+import contextlib
+import gc
+import json
+import marshal
+import sys
+from hashlib import sha256
+from cache_directory import CacheDirectory
+
+CHUNK_SIZE = 1 << 20
+
+
+class SnapshotCache(CacheDirectory):
+    """
+    Stores marshalled genesis trees in a directory
+    """
+    data_suffix = '.marshal'
+    suffixes = ('.marshal',)
+
+    def load(self, path: str, loads=None):
+        """
+        Returns the parsed JSON in the file at path,
+        from its snapshot if there is one.
+        Without a snapshot the file is parsed with loads if it is set,
+        e.g. the loads of a json_backend, and json.load otherwise.
+        """
+        with open(path, 'rb') as file:
+            digest = sha256()
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+            key = self._key(digest.hexdigest())
+
+            source = self._open_entry(key)
+            if source is not None:
+                with source, paused_gc():
+                    try:
+                        # Read at once, marshal.load would read the file
+                        # with one call per object
+                        data = marshal.loads(source.read())
+                        self.last_status = 'hit'
+                        return data
+                    except (EOFError, ValueError, TypeError):
+                        # Truncated or written by another Python version
+                        self._remove(key)
+
+            file.seek(0)
+            with paused_gc():
+                if loads is None:
+                    data = json.load(file)
+                else:
+                    data = loads(file.read())
+
+        self.store(key, data)
+        self.last_status = 'miss'
+        return data
+
+    def store(self, key: str, data):
+        """
+        Saves the snapshot of data for key
+        """
+        with self._atomic_file(self._path(key)) as target:
+            target.write(marshal.dumps(data))
+        self.evict(keep=key)
+
+    @staticmethod
+    def _key(digest: str):
+        """
+        Returns the cache key for an input file digest
+        """
+        version = f'{sys.version_info[0]}.{sys.version_info[1]}'
+        return sha256(f'{digest}\n{version}\n{marshal.version}'.encode(
+            'utf-8')).hexdigest()
+
+
+@contextlib.contextmanager
+def paused_gc():
+    """
+    Disables the cyclic garbage collector while building large trees,
+    which would otherwise be traversed over and over as they grow
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
@@ -0,0 +1,249 @@
+"""
+Stream Rewrite
+
+This module provides a rewrite engine for JSON documents too large to
+be parsed in full: the tokens of json_stream are written back as they
+are read, and transforms attached to JSON paths replace the values at
+those paths.
+
+A path is a tuple of object keys and ELEMENT, which stands for every
+item of an array, e.g. ('app_state', 'bank', 'balances', ELEMENT).
+Only the values at the paths of the transforms are parsed, one at a
+time, so memory use is bounded by the chunk size and the largest of
+those values (e.g. a single balance) rather than by the document.
+
+The output has the same layout as json.dump(value, target, indent=False),
+so a rewritten document is byte for byte what GenesisTinker would save
+after loading it and applying the same changes. The exception is
+duplicate keys: they are written as they appear, each with its own
+value, where loading the document keeps one member per key, holding
+the last value.
+"""
+
+import json
+import re
+
+from json_stream import tokens
+
+ELEMENT = '*'
+# Every chunk is split into a list of tokens, small chunks keep it short
+DEFAULT_CHUNK_SIZE = 1 << 16
+# Pieces of output buffered between writes
+WRITE_BUFFER_ITEMS = 1 << 12
+
+# Strings json.dumps would escape differently: escapes, DEL and non-ASCII
+_NEEDS_ENCODING = re.compile(rb'[\\\x7f-\xff]')
+# Integers json.dumps writes the same way, -0 is written as 0
+_INTEGER = re.compile(rb'0|-?[1-9][0-9]*')
+_LITERALS = (b'true', b'false', b'null')
+_CLOSING = {b'{': b'}', b'[': b']'}
+
+
+def rewrite(source, target, transforms: dict,
+            chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Reads a JSON document from the binary file object source and writes
+    it to the binary file object target, with the value at every path of
+    transforms replaced by the result of calling its transform with the
+    parsed value. Transforms may change the value in place and return it.
+    Returns the number of bytes written.
+    """
+    token_iterator = tokens(source, chunk_size)
+    rewriter = _Rewriter(transforms, target)
+    first = next(token_iterator, None)
+    if first is None:
+        raise ValueError('Unexpected end of JSON document')
+    rewriter.value(first, token_iterator, ())
+    if next(token_iterator, None) is not None:
+        raise ValueError('Extra data after the JSON document')
+    rewriter.flush()
+    return rewriter.written
+
+
+def encode(value):
+    """
+    Returns value as bytes in the layout of json.dumps(value, indent=False)
+    """
+    return json.dumps(value, indent=False).encode('ascii')
+
+
+class _Rewriter:
+    """
+    Writes the tokens of a document and applies the transforms
+    """
+
+    def __init__(self, transforms: dict, target):
+        self.transforms = transforms
+        self.target = target
+        self.written = 0
+        # Containers on the way to a transformed path are walked by key
+        self.prefixes = {path[:length] for path in transforms
+                         for length in range(len(path))}
+        self.output = []
+
+    def write(self, data: bytes):
+        """
+        Buffers data and writes it out once the buffer is full
+        """
+        self.output.append(data)
+        if len(self.output) >= WRITE_BUFFER_ITEMS:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes out the buffered data
+        """
+        self.written += self.target.write(b''.join(self.output))
+        self.output = []
+
+    def value(self, token: bytes, token_iterator, path: tuple):
+        """
+        Writes the value starting with token, found at path
+        """
+        transform = self.transforms.get(path)
+        if transform is not None:
+            collected = _collect(token, token_iterator)
+            self.write(encode(transform(json.loads(b''.join(collected)))))
+        elif path in self.prefixes and token == b'{':
+            self._object(token_iterator, path)
+        elif path in self.prefixes and token == b'[':
+            self._array(token_iterator, path)
+        else:
+            self._copy(token, token_iterator)
+
+    def _object(self, token_iterator, path: tuple):
+        """
+        Writes the members of an object that contains a transformed path
+        """
+        token = _next(token_iterator)
+        if token == b'}':
+            self.write(b'{}')
+            return
+        self.write(b'{\n')
+        while True:
+            if token[:1] != b'"' or _next(token_iterator) != b':':
+                raise ValueError('Expected a key near', token[:20])
+            self.write(_format_string(token) + b': ')
+            self.value(_next(token_iterator), token_iterator,
+                       path + (json.loads(token),))
+            token = _next(token_iterator)
+            if token == b'}':
+                self.write(b'\n}')
+                return
+            if token != b',':
+                raise ValueError('Unexpected token', token[:20])
+            self.write(b',\n')
+            token = _next(token_iterator)
+
+    def _array(self, token_iterator, path: tuple):
+        """
+        Writes the items of an array that contains a transformed path
+        """
+        token = _next(token_iterator)
+        if token == b']':
+            self.write(b'[]')
+            return
+        self.write(b'[\n')
+        path = path + (ELEMENT,)
+        while True:
+            self.value(token, token_iterator, path)
+            token = _next(token_iterator)
+            if token == b']':
+                self.write(b'\n]')
+                return
+            if token != b',':
+                raise ValueError('Unexpected token', token[:20])
+            self.write(b',\n')
+            token = _next(token_iterator)
+
+    def _copy(self, token: bytes, token_iterator):
+        """
+        Writes the value starting with token without parsing it
+        """
+        # pylint: disable=R0912
+        output = self.output
+        write = output.append
+        closing = []
+        opened = False
+        while True:
+            if opened:
+                opened = False
+                if token == closing[-1]:
+                    # Empty container
+                    write(token)
+                    closing.pop()
+                    if not closing:
+                        return
+                    token = _next(token_iterator)
+                    continue
+                write(b'\n')
+
+            if token in _CLOSING:
+                write(token)
+                closing.append(_CLOSING[token])
+                opened = True
+            elif token == b',':
+                write(b',\n')
+            elif token == b':':
+                write(b': ')
+            elif token in (b'}', b']'):
+                if not closing or token != closing.pop():
+                    raise ValueError('Unexpected token', token)
+                write(b'\n' + token)
+            elif token[:1] == b'"':
+                write(_format_string(token))
+            else:
+                write(_format_scalar(token))
+
+            if not closing:
+                return
+            if len(output) >= WRITE_BUFFER_ITEMS:
+                self.flush()
+                output = self.output
+                write = output.append
+            token = _next(token_iterator)
+
+
+def _collect(token: bytes, token_iterator):
+    """
+    Returns the list of tokens of the value starting with token
+    """
+    collected = [token]
+    depth = 0
+    while True:
+        if token in _CLOSING:
+            depth += 1
+        elif token in (b'}', b']'):
+            depth -= 1
+        if not depth:
+            return collected
+        token = _next(token_iterator)
+        collected.append(token)
+
+
+def _next(token_iterator):
+    """
+    Returns the next token, which must exist
+    """
+    token = next(token_iterator, None)
+    if token is None:
+        raise ValueError('Unexpected end of JSON document')
+    return token
+
+
+def _format_string(token: bytes):
+    """
+    Returns a string token escaped the way json.dumps escapes it
+    """
+    if _NEEDS_ENCODING.search(token) is None:
+        return token
+    return encode(json.loads(token))
+
+
+def _format_scalar(token: bytes):
+    """
+    Returns a number or literal the way json.dumps writes it
+    """
+    if token in _LITERALS or _INTEGER.fullmatch(token):
+        return token
+    return encode(json.loads(token))
@@ -0,0 +1,163 @@
+"""
+Task Planner
+
+This module provides the optional planning pass run by
+GenesisTinker.run_tasks(optimise=True) over the json tasks.
+
+Tasks are merged only where the final genesis is unchanged:
+Runs of consecutive increase_balance and increase_supply tasks only add
+to amounts, so they are replaced with a single increase_balances task
+and one increase_supply task per denom
+Calls of a setter that set the same value (e.g. set_tally_param for the
+same parameter) are folded into the first one, which runs with the
+arguments of the last, unless a task that is not a GenesisTinker
+method runs in between and could read the value. The first call is the
+one that creates a value that does not exist yet (a new min_deposit
+denom or tally parameter), so values keep their place in the genesis
+
+The cost of a task is estimated as the number of genesis list entries
+it visits, based on the sizes of the loaded genesis.
+"""
+
+import functools
+import inspect
+
+ADDITIVE_TASKS = ('increase_balance', 'increase_supply')
+# Setter name -> arguments that select the value being overwritten
+SETTERS = {
+    'set_chain_id': (),
+    'set_unbonding_time': (),
+    'set_max_deposit_period': (),
+    'set_voting_period': (),
+    'set_min_deposit': ('denom',),
+    'set_tally_param': ('parameter_name',),
+}
+
+
+def plan_tasks(tinker, tasks):
+    """
+    Returns an equivalent, shorter list of tasks for tinker
+    """
+    plan = []
+    run = []
+    for task in tasks:
+        if _name(tinker, task) in ADDITIVE_TASKS and \
+                task_arguments(task) is not None:
+            run.append(task)
+            continue
+        plan.extend(_merge_run(tinker, run))
+        run = []
+        plan.append(task)
+    plan.extend(_merge_run(tinker, run))
+
+    # The first call of every setter runs with the arguments of the last,
+    # so a value that did not exist is still created where it was first
+    folded = []
+    first_calls = {}
+    for task in plan:
+        name = _name(tinker, task)
+        if name is None:
+            first_calls = {}
+        elif name in SETTERS and task_arguments(task) is not None:
+            arguments = task_arguments(task)
+            key = (name,) + tuple(arguments[arg] for arg in SETTERS[name])
+            if key in first_calls:
+                folded[first_calls[key]] = task
+                continue
+            first_calls[key] = len(folded)
+        folded.append(task)
+    return folded
+
+
+def estimate_cost(tinker, task):
+    """
+    Returns the estimated number of genesis list entries visited by task,
+    or None if there is no estimate for it
+    """
+    name = _name(tinker, task)
+    arguments = task_arguments(task)
+    bank = tinker.app_state.get('bank', {})
+    balances = len(bank.get('balances', []))
+    supply = len(bank.get('supply', []))
+    balance_lookup = 1 if tinker.use_indexes else balances
+
+    if name in SETTERS:
+        return 1
+    if name in ('increase_supply', 'create_coin'):
+        return supply
+    if name == 'increase_balance':
+        return balance_lookup + supply
+    if name == 'increase_balances' and arguments is not None:
+        increases = arguments['increases']
+        addresses = len({increase[0] for increase in increases})
+        denoms = len({increase[2] for increase in increases})
+        lookups = addresses if tinker.use_indexes else balances
+        if arguments['create_missing']:
+            lookups += balances
+        return len(increases) + lookups + denoms * supply
+    return None
+
+
+def describe(task):
+    """
+    Returns a short description of a task and its arguments
+    """
+    arguments = []
+    for key, value in task.keywords.items():
+        if isinstance(value, list):
+            arguments.append(f'{key}=<{len(value)} items>')
+        else:
+            arguments.append(f'{key}={value!r}')
+    return f'{task.func.__name__}({", ".join(arguments)})'
+
+
+def task_arguments(task):
+    """
+    Returns all the arguments of a task including defaults,
+    or None if they don't match its signature
+    """
+    try:
+        bound = inspect.signature(task.func).bind(*task.args, **task.keywords)
+    except TypeError:
+        return None
+    bound.apply_defaults()
+    return bound.arguments
+
+
+def _merge_run(tinker, run):
+    """
+    Replaces a run of increase_balance and increase_supply tasks
+    with one increase_balances task and one increase_supply per denom
+    """
+    if len(run) < 2:
+        return run
+
+    increases = []
+    supply_totals = {}
+    for task in run:
+        arguments = task_arguments(task)
+        if _name(tinker, task) == 'increase_balance':
+            increases.append((arguments['address'], arguments['amount'],
+                              arguments['denom']))
+        else:
+            denom = arguments['denom']
+            supply_totals[denom] = supply_totals.get(denom, 0) + \
+                arguments['increase']
+
+    merged = []
+    if increases:
+        merged.append(functools.partial(tinker.increase_balances,
+                                        increases=increases))
+    for denom, increase in supply_totals.items():
+        merged.append(functools.partial(tinker.increase_supply,
+                                        increase=increase, denom=denom))
+    return merged
+
+
+def _name(tinker, task):
+    """
+    Returns the method name of a task bound to tinker, or None
+    """
+    if getattr(task.func, '__self__', None) is not tinker:
+        return None
+    return task.func.__name__
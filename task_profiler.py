@@ -0,0 +1,169 @@
+"""
+Task Profiler
+
+This module provides the measurements reported by
+GenesisTinker.run_tasks for every task and phase of a run.
+
+Every measured block produces an event with its wall time, the CPU time
+of this process and of the child processes it waited for (e.g. the
+byte replacement workers), the peak resident set size of the process
+so far and, when tracemalloc is tracing (python -X tracemalloc), the
+change in traced memory and the traced peak above the start of the
+block. Blocks can be nested: an event is emitted when its block ends,
+so nested events come before the event that contains them, and the
+times of an event include the times of the events nested in it.
+
+Events are collected into a report and can be streamed to a callback
+as they are emitted.
+"""
+
+import contextlib
+import json
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class TaskProfiler:
+    """
+    Measures nested blocks and collects their events.
+    callback, if set, is called with every event as it is emitted.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.events = []
+        self._started = time.perf_counter()
+        self._open = []
+
+    @contextlib.contextmanager
+    def measure(self, kind: str, name: str):
+        """
+        Measures the block run inside the context, e.g.
+        with profiler.measure('task', 'set_chain_id'): ...
+        """
+        tracing = tracemalloc.is_tracing()
+        frame = {'peak': 0}
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            # reset_peak also resets the peak of the enclosing blocks
+            for parent in self._open:
+                parent['peak'] = max(parent['peak'], peak)
+            tracemalloc.reset_peak()
+            frame['memory'] = current
+        self._open.append(frame)
+        start = time.perf_counter()
+        cpu = time.process_time()
+        children = _children_cpu_time()
+        try:
+            yield
+        finally:
+            self._open.pop()
+            event = {
+                'kind': kind,
+                'name': name,
+                'depth': len(self._open),
+                'start': round(start - self._started, 6),
+                'wall_seconds': round(time.perf_counter() - start, 6),
+                'cpu_seconds': round(time.process_time() - cpu, 6),
+                'children_cpu_seconds': _round(_children_cpu_time(), children),
+                'peak_rss_kb': _peak_rss_kb(),
+                'memory_delta': None,
+                'memory_peak': None
+            }
+            if tracing and tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame['peak'])
+                for parent in self._open:
+                    parent['peak'] = max(parent['peak'], peak)
+                event['memory_delta'] = current - frame['memory']
+                event['memory_peak'] = peak - frame['memory']
+            self.emit(event)
+
+    def add(self, kind: str, name: str, wall_seconds: float,
+            cpu_seconds: float):
+        """
+        Emits an event for work measured elsewhere, e.g. the hashing
+        done while the output is written
+        """
+        self.emit({
+            'kind': kind,
+            'name': name,
+            'depth': len(self._open),
+            'start': None,
+            'wall_seconds': round(wall_seconds, 6),
+            'cpu_seconds': round(cpu_seconds, 6),
+            'children_cpu_seconds': None,
+            'peak_rss_kb': _peak_rss_kb(),
+            'memory_delta': None,
+            'memory_peak': None
+        })
+
+    def emit(self, event: dict):
+        """
+        Collects event and passes it to the callback
+        """
+        self.events.append(event)
+        if self.callback is not None:
+            self.callback(event)
+
+    def report(self):
+        """
+        Returns the report of all the events emitted so far
+        """
+        top_level = [event for event in self.events if event['depth'] == 0]
+        peaks = [event['peak_rss_kb'] for event in self.events
+                 if event['peak_rss_kb'] is not None]
+        return {
+            'python': sys.version.split()[0],
+            'wall_seconds': round(sum(event['wall_seconds']
+                                      for event in top_level), 6),
+            'cpu_seconds': round(sum(event['cpu_seconds']
+                                     for event in top_level), 6),
+            'peak_rss_kb': max(peaks) if peaks else None,
+            'events': self.events
+        }
+
+    def write(self, path: str):
+        """
+        Saves the report as JSON to path
+        """
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.report(), file, indent=2)
+
+
+def _children_cpu_time():
+    """
+    Returns the CPU time of the child processes waited for so far
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _round(end, start):
+    """
+    Returns the rounded difference between two optional times
+    """
+    if end is None or start is None:
+        return None
+    return round(end - start, 6)
+
+
+def _peak_rss_kb():
+    """
+    Returns the peak resident set size of this process in kilobytes
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == 'darwin':
+        return peak // 1024
+    return peak
@@ -0,0 +1,70 @@
+"""
+Test the benchmark suite and its regression check.
+python -m pytest -v tests/test_benchmarks.py
+"""
+
+import csv
+import json
+from benchmarks import compact_memory, json_backends, suite
+
+
+def test_run_suite(tmp_path):
+    results = suite.run_suite(str(tmp_path), sizes=[100], repeat=1)
+    assert [result['operation'] for result in results] == \
+        list(suite.OPERATIONS)
+    for result in results:
+        assert result['accounts'] == 100
+        assert result['genesis_bytes'] > 0
+        assert result['seconds'] > 0
+        assert result['memory_peak'] >= 0
+
+
+def test_compare():
+    baseline = [{'accounts': 100, 'operation': 'load_file',
+                 'seconds': 0.01, 'memory_peak': 1 << 20},
+                {'accounts': 100, 'operation': 'save_file',
+                 'seconds': 0.01, 'memory_peak': 1 << 20}]
+    results = [{'accounts': 100, 'operation': 'load_file',
+                'seconds': 0.014, 'memory_peak': 1 << 21},
+               {'accounts': 100, 'operation': 'save_file',
+                'seconds': 0.02, 'memory_peak': 1 << 20},
+               {'accounts': 1000, 'operation': 'save_file',
+                'seconds': 1.0, 'memory_peak': 1 << 30}]
+    regressions = suite.compare(results, baseline)
+    assert len(regressions) == 2
+    assert regressions[0].startswith('load_file with 100 accounts: 2097152')
+    assert regressions[1].startswith('save_file with 100 accounts: 0.02')
+    assert not suite.compare(results, baseline, max_slowdown=3,
+                             max_memory_growth=3)
+
+
+def test_main_reports(tmp_path):
+    report = tmp_path / 'report.json'
+    baseline = tmp_path / 'baseline.json'
+    arguments = ['--sizes', '100', '--repeat', '1',
+                 '--operations', 'increase_balance,create_coin',
+                 '--report', str(report), '--csv', str(tmp_path / 'r.csv'),
+                 '--baseline', str(baseline)]
+    assert suite.main(arguments + ['--save-baseline']) == 0
+    with open(tmp_path / 'r.csv', 'r', encoding='utf-8') as file:
+        rows = list(csv.DictReader(file))
+    assert [row['operation'] for row in rows] == \
+        ['increase_balance', 'create_coin']
+
+    # A baseline with a much smaller memory peak fails the run
+    with open(baseline, 'r', encoding='utf-8') as file:
+        saved = json.load(file)
+    saved['results'][0]['memory_peak'] = -(1 << 30)
+    with open(baseline, 'w', encoding='utf-8') as file:
+        json.dump(saved, file)
+    assert suite.main(arguments) == 1
+
+
+def test_json_backends_match(capsys):
+    assert json_backends.main(['--runs', '1', '--accounts', '100']) == 0
+    assert 'json ' in capsys.readouterr().out
+
+
+def test_compact_memory_match(capsys):
+    assert compact_memory.main(['--accounts', '10000']) == 0
+    assert 'compact ' in capsys.readouterr().out
@@ -0,0 +1,138 @@
+"""
+Test the single-pass byte replacement engine.
+python -m pytest -v tests/test_byte_replacer.py
+"""
+
+import io
+import shutil
+import subprocess
+import pytest
+from byte_replacer import ByteReplacer, find_conflicts, merge_pairs
+
+OLD_VALIDATOR = [
+    ('19CEF0E87C6FBDED2A2A486069C8F4DD51BD3981', 'c'),
+    ('cosmosvalcons1r880p6rud7776232fpsxnj85m4gm6wvpe2pkp2', 'f'),
+    ('cosmosvaloper1lj54q70v2mt9e7c5mtp5xgg5n9c0hkaslmzv5k', 'e'),
+    ('T6bqYkfRS1toJAFN8R34MByeuj1siCx0/0GdIgX8SmI=', 'd'),
+    ('cosmos1lj54q70v2mt9e7c5mtp5xgg5n9c0hkas60kec9', 'a'),
+    ('Aiu5OMUoNnBnWiWOC/Z/Luyq2XFROqubW5oP4Y8y/Lzz', 'b'),
+]
+
+
+def test_replace_counts():
+    replacer = ByteReplacer([('ab', 'X'), ('c', 'YY')])
+    assert replacer.replace(b'abcabzc') == b'XYYXzYY'
+    report = replacer.report()
+    assert report['bytes_scanned'] == 7
+    assert report['replacements'] == {'ab': 2, 'c': 2}
+
+
+def test_longest_pattern_wins():
+    replacer = ByteReplacer([('cosmos1', 'short'), ('cosmos1abc', 'long')])
+    assert replacer.replace(b'"cosmos1abc" "cosmos1x"') == b'"long" "shortx"'
+
+
+def test_invalid_pairs():
+    with pytest.raises(ValueError):
+        ByteReplacer([('', 'a')])
+    with pytest.raises(ValueError):
+        ByteReplacer([('a', 'b'), ('a', 'c')])
+    with pytest.raises(ValueError):
+        ByteReplacer([])
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 64])
+def test_stream_across_chunk_boundaries(chunk_size):
+    data = b'xxabcabcyabcz' * 50
+    expected = data.replace(b'abc', b'Q').replace(b'y', b'YY')
+    replacer = ByteReplacer([('abc', 'Q'), ('y', 'YY')], chunk_size=chunk_size)
+    target = io.BytesIO()
+    replacer.replace_stream(io.BytesIO(data), target)
+    assert target.getvalue() == expected
+    assert replacer.bytes_scanned == len(data)
+    assert replacer.replacements[b'abc'] == 150
+
+
+def test_matches_sed_chain(tmp_path):
+    sed_file = tmp_path / 'sed.json'
+    engine_file = tmp_path / 'engine.json'
+    shutil.copy2('tests/fresh_genesis.json', sed_file)
+    shutil.copy2('tests/fresh_genesis.json', engine_file)
+
+    for old, new in OLD_VALIDATOR:
+        subprocess.run(['sed', '-i', 's%' + old + '%' + new + '%g', sed_file],
+                       check=True)
+    ByteReplacer(OLD_VALIDATOR, chunk_size=1000).replace_file(engine_file)
+
+    assert sed_file.read_bytes() == engine_file.read_bytes()
+
+
+@pytest.mark.parametrize('pairs', [OLD_VALIDATOR,
+                                   OLD_VALIDATOR + [('\n', 'NL')]])
+def test_sharded_matches_sequential(tmp_path, pairs):
+    sequential_file = tmp_path / 'sequential.json'
+    sharded_file = tmp_path / 'sharded.json'
+    shutil.copy2('tests/fresh_genesis.json', sequential_file)
+    shutil.copy2('tests/fresh_genesis.json', sharded_file)
+
+    sequential = ByteReplacer(pairs).replace_file(sequential_file)
+    sharded = ByteReplacer(pairs)
+    with open(sharded_file, 'rb') as source:
+        assert len(sharded.shards(source, 500)) > 10
+    sharded.replace_file(sharded_file, workers=3, shard_size=500)
+
+    assert sequential_file.read_bytes() == sharded_file.read_bytes()
+    assert sequential.report() == sharded.report()
+
+
+def test_shards_end_on_separator(tmp_path):
+    path = tmp_path / 'data'
+    path.write_bytes(b'ab,ab,ab\nab,ab,ab')
+    with open(path, 'rb') as source:
+        # A pattern containing a newline moves shard ends to commas
+        assert ByteReplacer([('ab', 'x')]).shards(source, 2) == [(0, 9),
+                                                                  (9, 17)]
+        assert ByteReplacer([('b\n', 'x')]).shards(source, 2) == \
+            [(0, 3), (3, 6), (6, 12), (12, 15), (15, 17)]
+
+
+def test_merge_pairs_first_wins():
+    pairs = merge_pairs([('a', 'a'), ('a', 'x'), ('b', 'y'), ('a', 'z')])
+    assert pairs == [(b'a', b'x'), (b'b', b'y')]
+
+
+def sequential(pairs, data):
+    for old, new in pairs:
+        data = data.replace(old.encode(), new.encode())
+    return data
+
+
+def test_find_conflicts():
+    # Quoted new values can't form an old value with the bytes around them
+    assert not find_conflicts([(old, f'"{new}"')
+                               for old, new in OLD_VALIDATOR])
+    # A new value inside a later old value could complete it
+    assert find_conflicts(OLD_VALIDATOR)
+    # The introduced value is replaced again by a later pair
+    assert find_conflicts([('A', 'B'), ('B', 'C')])
+    assert not find_conflicts([('B', 'C'), ('A', 'B')])
+    # The shorter value would break the longer one
+    assert find_conflicts([('cosmos1', 'x'), ('cosmos1abc', 'y')])
+    assert not find_conflicts([('cosmos1abc', 'y'), ('cosmos1', 'x')])
+    # The earlier value is found first wherever they overlap
+    assert not find_conflicts([('AB', 'X'), ('BC', 'Y')])
+
+
+@pytest.mark.parametrize('pairs, data', [
+    # Overlapping old values
+    ([('BC', 'Y'), ('AB', 'X')], b'ABC'),
+    ([('CD', 'Y'), ('BC', 'X')], b'BCD'),
+    # New values that form a later old value with the bytes around them
+    ([('Q', 'A'), ('AB', 'Z')], b'QB'),
+    ([('Q', 'B'), ('AB', 'Z')], b'AQ'),
+    ([('Q', 'B'), ('ABC', 'Z')], b'AQC'),
+    ([('Q', ''), ('AB', 'Z')], b'AQB'),
+])
+def test_overlaps_conflict(pairs, data):
+    assert ByteReplacer(pairs).replace(data) != sequential(pairs, data)
+    assert find_conflicts(pairs)
@@ -0,0 +1,139 @@
+"""
+Test compact genesis trees.
+python -m pytest -v tests/test_compact_tree.py
+"""
+
+import json
+import tracemalloc
+import pytest
+import compact_tree
+import json_backend
+from benchmarks.suite import Context
+from cosmos_genesis_tinker import GenesisTinker
+from genesis_generator import generate_genesis
+
+with open('tests/fresh_genesis.json', 'rb') as genesis_file:
+    FRESH = genesis_file.read()
+
+
+def compacted(content):
+    genesis = compact_tree.loads(content)
+    compact_tree.compact(genesis)
+    return genesis
+
+
+def test_records():
+    record = compact_tree.record_type(('denom', 'amount'))('uatom', '5')
+    assert record['denom'] == 'uatom'
+    assert record.get('amount') == '5'
+    assert record.get('missing', 0) == 0
+    assert record.to_dict() == {'denom': 'uatom', 'amount': '5'}
+    assert list(record.to_dict()) == ['denom', 'amount']
+    assert repr(record) == "Record({'denom': 'uatom', 'amount': '5'})"
+    assert compact_tree.record_type(('denom', 'amount')) is type(record)
+    with pytest.raises(KeyError):
+        record['missing']  # pylint: disable=W0104
+
+
+def test_compact_paths():
+    genesis = compacted(FRESH)
+    expected = json.loads(FRESH)
+    assert genesis == expected
+    app_state = genesis['app_state']
+    balances = app_state['bank']['balances']
+    assert isinstance(balances, compact_tree.CompactList)
+    assert isinstance(list.__getitem__(balances, 0), compact_tree.Record)
+    assert isinstance(app_state['staking']['delegations'],
+                      compact_tree.CompactList)
+    assert isinstance(app_state['distribution']['delegator_starting_infos'],
+                      compact_tree.CompactList)
+    # Coins parsed outside the compact lists stay plain
+    supply = app_state['bank']['supply']
+    assert type(supply) is list  # pylint: disable=C0123
+    assert type(supply[0]) is dict  # pylint: disable=C0123
+    # Repeated strings are shared
+    denoms = [coin['denom'] for balance in balances
+              for coin in balance['coins'] if coin['denom'] == 'stake']
+    assert len(denoms) > 1
+    assert len({id(denom) for denom in denoms}) == 1
+
+
+def test_compact_list_reads():
+    genesis = compacted(FRESH)
+    balances = genesis['app_state']['bank']['balances']
+    expected = json.loads(FRESH)['app_state']['bank']['balances']
+
+    balance = balances[0]
+    assert balance == expected[0]
+    assert balances[0] is balance
+    assert list.__getitem__(balances, 0) is balance
+    balance['coins'][0]['amount'] = '1'
+    assert balances[0]['coins'][0]['amount'] == '1'
+    balance['coins'][0]['amount'] = expected[0]['coins'][0]['amount']
+
+    assert balances[1:] == expected[1:]
+    assert list(reversed(balances)) == expected[::-1]
+    assert expected[-1] in balances
+    copied = balances.copy()
+    assert isinstance(copied, compact_tree.CompactList)
+    assert copied == expected and copied is not balances
+    assert balances.pop() == expected[-1]
+    assert balances == expected[:-1]
+    assert balances != expected
+
+
+@pytest.mark.parametrize('backend', json_backend.available_backends())
+def test_saved_like_json(backend):
+    genesis = compacted(FRESH)
+    expected = json.dumps(json.loads(FRESH), indent=False).encode('ascii')
+    assert json_backend.get_backend(backend).dumps(genesis) == expected
+    # Records read by tasks are saved the same way
+    for balance in genesis['app_state']['bank']['balances']:
+        balance['coins'].sort(key=lambda coin: coin['denom'])
+    assert json_backend.get_backend(backend).dumps(genesis) == expected
+
+
+def test_compact_tinker(tmp_path):
+    context = Context(str(tmp_path), 1000)
+    address = context.delegator.address
+    shasums = {}
+    for compact in (False, True):
+        gentink = GenesisTinker(
+            input_file=context.genesis_file,
+            output_file=str(tmp_path / f'tinkered_{compact}.json'),
+            compact=compact)
+        gentink.add_task(gentink.set_chain_id, chain_id='compact-chain')
+        gentink.add_task(gentink.increase_balance, address=address,
+                         amount=5, denom='ucompact')
+        gentink.add_task(gentink.increase_balances,
+                         increases=[(address, 3, 'uatom'),
+                                    ('cosmos1new', 7, 'uatom')],
+                         create_missing=True)
+        gentink.add_task(gentink.increase_delegator_stake_to_validator,
+                         delegator=context.delegator,
+                         validator=context.validator,
+                         increase={'amount': 1000000, 'denom': 'uatom'})
+        assert gentink.run_tasks() is None
+        shasums[compact] = gentink.output_shasum
+        assert json.loads(gentink.generate_json()) == gentink.genesis
+    assert shasums[True] == shasums[False]
+
+
+def test_compact_memory(tmp_path):
+    path = tmp_path / 'genesis.json'
+    generate_genesis(str(path), accounts=5000, balances=5000,
+                     delegations=5000, starting_infos=5000)
+    content = path.read_bytes()
+    memory = {}
+    for compact in (False, True):
+        gentink = GenesisTinker(compact=compact)
+        tracemalloc.start()
+        try:
+            gentink.load_bytes(content)
+            memory[compact] = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert gentink.genesis == json.loads(content)
+    # Current and peak memory
+    assert memory[True][0] * 2 < memory[False][0]
+    assert memory[True][1] < memory[False][1]
@@ -0,0 +1,86 @@
+"""
+Test running several GenesisTinker instances at the same time.
+python -m pytest -v tests/test_concurrency.py
+"""
+
+import json
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+import pytest
+from cosmos_genesis_tinker import GenesisTinker, Delegator
+
+WORKERS = 4
+
+
+def tinker(job):
+    """
+    Runs one tinker with tasks that depend on its index and
+    returns the SHA256 sum of its output
+    """
+    index, directory = job
+    old_del = Delegator()
+    old_del.address = 'cosmos1lj54q70v2mt9e7c5mtp5xgg5n9c0hkas60kec9'
+    old_del.public_key = 'Aiu5OMUoNnBnWiWOC/Z/Luyq2XFROqubW5oP4Y8y/Lzz'
+    new_del = Delegator()
+    new_del.address = f'cosmos1delegator{index}'
+    new_del.public_key = f'key{index}'
+
+    gentink = GenesisTinker(
+        input_file='tests/fresh_genesis.json',
+        output_file=f'{directory}/tinkered_{index}.json',
+        preprocessing_file=f'{directory}/preprocessing_{index}.json',
+        in_memory=bool(index % 2))
+    gentink.add_task(gentink.replace_delegator,
+                     old_delegator=old_del,
+                     new_delegator=new_del)
+    gentink.add_task(gentink.set_chain_id, chain_id=f'chain-{index}')
+    gentink.add_task(gentink.increase_balance,
+                     address=new_del.address, amount=index + 1)
+    if gentink.run_tasks():
+        raise Exception('Tasks failed', index)
+    return gentink.output_shasum
+
+
+def check_outputs(directory, shasums):
+    """
+    Checks that every output only has the changes of its own tinker
+    """
+    for index, shasum in enumerate(shasums):
+        with open(f'{directory}/tinkered_{index}.json', 'rb') as file:
+            content = file.read()
+        assert sha256(content).hexdigest() == shasum
+        genesis = json.loads(content)
+        assert genesis['chain_id'] == f'chain-{index}'
+        balances = {balance['address']: balance
+                    for balance in genesis['app_state']['bank']['balances']}
+        assert f'cosmos1delegator{index}' in balances
+        assert not any(f'cosmos1delegator{other}' in balances
+                       for other in range(WORKERS) if other != index)
+
+
+def test_instances_have_separate_state():
+    first = GenesisTinker()
+    second = GenesisTinker()
+    first.add_task(first.set_chain_id, chain_id='first')
+    first.load_genesis({'chain_id': 'test'})
+    assert not second.tasks()
+    assert not second.genesis
+    assert first._task_list is not second._task_list
+
+
+def test_threads(tmp_path):
+    jobs = [(index, tmp_path) for index in range(WORKERS)]
+    with ThreadPoolExecutor(WORKERS) as executor:
+        shasums = list(executor.map(tinker, jobs))
+    check_outputs(tmp_path, shasums)
+    assert shasums == [tinker((index, tmp_path)) for index in range(WORKERS)]
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(),
+                    reason='requires the fork start method')
+def test_processes(tmp_path):
+    jobs = [(index, tmp_path) for index in range(WORKERS)]
+    with multiprocessing.get_context('fork').Pool(WORKERS) as pool:
+        shasums = pool.map(tinker, jobs)
+    check_outputs(tmp_path, shasums)
@@ -0,0 +1,128 @@
+"""
+Test the synthetic genesis generator.
+python -m pytest -v tests/test_genesis_generator.py
+"""
+
+import json
+from io import BytesIO
+from cosmos_genesis_tinker import GenesisTinker, Delegator
+from genesis_generator import MODULE_ACCOUNTS, PRESETS, generate_genesis, \
+    module_address
+
+COUNTS = dict(PRESETS['small'], denoms=4)
+
+
+def generate(seed=0, **counts):
+    """
+    Returns the bytes and the parsed genesis of a small synthetic genesis
+    """
+    output = BytesIO()
+    summary = generate_genesis(output, seed, **dict(COUNTS, **counts))
+    content = output.getvalue()
+    assert summary['bytes_written'] == len(content)
+    return content, json.loads(content)
+
+
+def test_deterministic():
+    assert generate(1)[0] == generate(1)[0]
+    assert generate(1)[0] != generate(2)[0]
+
+
+def test_counts():
+    _, genesis = generate()
+    app_state = genesis['app_state']
+    staking = app_state['staking']
+    assert len(app_state['auth']['accounts']) == COUNTS['accounts'] + \
+        len(MODULE_ACCOUNTS)
+    assert len(app_state['bank']['supply']) == COUNTS['denoms']
+    assert len(app_state['transfer']['denom_traces']) == COUNTS['denoms'] - 1
+    assert len(staking['validators']) == COUNTS['validators']
+    assert len(staking['delegations']) == COUNTS['delegations']
+    assert len(staking['last_validator_powers']) == \
+        COUNTS['max_validators']
+    assert len(genesis['consensus']['validators']) == \
+        COUNTS['max_validators']
+    assert len(app_state['distribution']['delegator_starting_infos']) == \
+        COUNTS['starting_infos']
+    assert len(app_state['ibc']['channel_genesis']['commitments']) == \
+        COUNTS['ibc_packets']
+
+
+def test_consistent_state():
+    _, genesis = generate()
+    app_state = genesis['app_state']
+    staking = app_state['staking']
+
+    totals = {}
+    for balance in app_state['bank']['balances']:
+        denoms = [coin['denom'] for coin in balance['coins']]
+        assert denoms == sorted(set(denoms))
+        for coin in balance['coins']:
+            totals[coin['denom']] = totals.get(coin['denom'], 0) + \
+                int(coin['amount'])
+    assert {coin['denom']: int(coin['amount'])
+            for coin in app_state['bank']['supply']} == totals
+
+    pairs = {(delegation['delegator_address'],
+              delegation['validator_address'])
+             for delegation in staking['delegations']}
+    assert len(pairs) == len(staking['delegations'])
+
+    pools = {balance['address']: int(balance['coins'][0]['amount'])
+             for balance in app_state['bank']['balances']}
+    bonded = [validator for validator in staking['validators']
+              if validator['status'] == 'BOND_STATUS_BONDED']
+    assert pools[module_address('bonded_tokens_pool')] == \
+        sum(int(validator['tokens']) for validator in bonded)
+    for validator in staking['validators']:
+        shares = sum(float(delegation['shares'])
+                     for delegation in staking['delegations']
+                     if delegation['validator_address'] ==
+                     validator['operator_address'])
+        assert int(validator['tokens']) == round(shares)
+
+    powers = [int(validator['power'])
+              for validator in genesis['consensus']['validators']]
+    assert int(staking['last_total_power']) == sum(powers)
+    assert powers == [int(power['power'])
+                      for power in staking['last_validator_powers']]
+
+
+def test_tinker_tasks(tmp_path):
+    input_file = str(tmp_path / 'synthetic.json')
+    generate_genesis(input_file, 3, **COUNTS)
+    with open(input_file, 'r', encoding='utf-8') as file:
+        genesis = json.load(file)
+    app_state = genesis['app_state']
+    account = app_state['auth']['accounts'][len(MODULE_ACCOUNTS)]
+    staking_validator = app_state['staking']['validators'][0]
+    consensus_validator = genesis['consensus']['validators'][0]
+
+    old_del = Delegator()
+    old_del.address = account['address']
+    old_del.public_key = account['pub_key']['key']
+    new_del = Delegator()
+    new_del.address = 'cosmos1hc8kamyxjjea3n8t49y9s7mzsgr8y0ps5kqm6m'
+    new_del.public_key = 'AkDTt0Kx6m2fsMEiMGDSkhxMkF7QUjeuH8rnMHdzuRZh'
+
+    gentink = GenesisTinker(input_file=input_file,
+                            output_file=str(tmp_path / 'tinkered.json'),
+                            preprocessing_file=str(tmp_path / 'pre.json'))
+    gentink.add_task(gentink.replace_delegator,
+                     old_delegator=old_del, new_delegator=new_del)
+    gentink.add_task(gentink.increase_balance,
+                     address=new_del.address, amount=1000)
+    gentink.add_task(gentink.increase_validator_power,
+                     operator_address=staking_validator['operator_address'],
+                     validator_address=consensus_validator['address'],
+                     power_increase=5)
+    assert gentink.run_tasks() is None
+
+    with open(tmp_path / 'tinkered.json', 'r', encoding='utf-8') as file:
+        tinkered = json.load(file)
+    balances = {balance['address']: balance
+                for balance in tinkered['app_state']['bank']['balances']}
+    assert account['address'] not in balances
+    assert new_del.address in balances
+    assert int(tinkered['consensus']['validators'][0]['power']) == \
+        int(consensus_validator['power']) + 5
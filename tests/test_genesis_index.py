@@ -0,0 +1,182 @@
+"""
+Test the genesis list indexes.
+python -m pytest -v tests/test_genesis_index.py
+"""
+
+import copy
+import pytest
+from cosmos_genesis_tinker import GenesisTinker, Delegator, Validator
+from genesis_index import ListIndex
+
+
+def balances_genesis():
+    return {
+        'app_state': {
+            'bank': {
+                'balances': [
+                    {'address': 'cosmos1a', 'coins': [
+                        {'denom': 'uatom', 'amount': '1'}]},
+                    {'address': 'cosmos1b', 'coins': []}
+                ],
+                'supply': [{'denom': 'uatom', 'amount': '1'}]
+            }
+        }
+    }
+
+
+def test_list_index():
+    items = [{'k': 'a'}, {'k': 'b'}, {'k': 'a', 'second': True}]
+    index = ListIndex(lambda item: item['k'])
+
+    assert index.get(items, 'a') is items[0]
+    assert index.get(items, 'z') is None
+    # Appended, replaced and removed items are picked up
+    items.append({'k': 'c'})
+    assert index.get(items, 'c') is items[3]
+    items[1] = {'k': 'd'}
+    assert index.get(items, 'd') is items[1]
+    assert index.get(items, 'b') is None
+    del items[0]
+    assert index.get(items, 'a') == {'k': 'a', 'second': True}
+    index.add(items, {'k': 'e'})
+    assert index.get(items, 'e') is items[-1]
+    # A different list is indexed from scratch
+    assert index.get([{'k': 'z'}], 'z') == {'k': 'z'}
+
+
+@pytest.mark.parametrize('use_indexes', [True, False])
+def test_increase_balance_index(use_indexes):
+    gentink = GenesisTinker(use_indexes=use_indexes)
+    gentink.genesis = balances_genesis()
+    gentink.increase_balance('cosmos1b', 5)
+    gentink.increase_balance('cosmos1a', 2)
+
+    balances = gentink.app_state['bank']['balances']
+    balances.append({'address': 'cosmos1c', 'coins': []})
+    gentink.increase_balance('cosmos1c', 3, 'stake')
+    assert balances[2]['coins'] == [{'denom': 'stake', 'amount': '3'}]
+
+    # Reloading replaces the indexed list
+    gentink.load_bytes(b'{"app_state": {"bank": {"balances": [], "supply": []}}}')
+    with pytest.raises(Exception):
+        gentink.increase_balance('cosmos1a', 2)
+
+    expected = balances_genesis()
+    expected['app_state']['bank']['balances'][0]['coins'][0]['amount'] = '3'
+    expected['app_state']['bank']['balances'][1]['coins'] = [
+        {'denom': 'uatom', 'amount': '5'}]
+    assert balances[:2] == expected['app_state']['bank']['balances']
+    assert copy.deepcopy(balances[2]) == {
+        'address': 'cosmos1c', 'coins': [{'denom': 'stake', 'amount': '3'}]}
+
+
+def staking_genesis():
+    genesis = balances_genesis()
+    genesis['consensus'] = {'validators': [
+        {'address': 'AA', 'power': '10'}, {'address': 'BB', 'power': '20'}]}
+    genesis['app_state']['auth'] = {'accounts': [
+        {'name': 'bonded_tokens_pool',
+         'base_account': {'address': 'cosmos1b'}}]}
+    genesis['app_state']['staking'] = {
+        'last_total_power': '30',
+        'last_validator_powers': [
+            {'address': 'cosmosvaloper1a', 'power': '10'},
+            {'address': 'cosmosvaloper1b', 'power': '20'}],
+        'validators': [
+            {'operator_address': 'cosmosvaloper1a', 'tokens': '10000000',
+             'delegator_shares': '10000000.0', 'status': 'BOND_STATUS_BONDED'},
+            {'operator_address': 'cosmosvaloper1b', 'tokens': '20000000',
+             'delegator_shares': '20000000.0', 'status': 'BOND_STATUS_BONDED'}],
+        'delegations': [
+            {'delegator_address': 'cosmos1a',
+             'validator_address': 'cosmosvaloper1a', 'shares': '1.0'},
+            {'delegator_address': 'cosmos1a',
+             'validator_address': 'cosmosvaloper1b', 'shares': '2.0'}]
+    }
+    genesis['app_state']['distribution'] = {'delegator_starting_infos': [
+        {'delegator_address': 'cosmos1a', 'starting_info': {'stake': '3.0'}}]}
+    return genesis
+
+
+def test_staking_indexes_match_scans():
+    delegator = Delegator()
+    delegator.address = 'cosmos1a'
+    validator = Validator()
+    validator.operator_address = 'cosmosvaloper1b'
+    validator.address = 'BB'
+
+    results = []
+    for use_indexes in [True, False]:
+        gentink = GenesisTinker(use_indexes=use_indexes)
+        gentink.genesis = staking_genesis()
+        for _ in range(2):
+            gentink.increase_delegator_stake_to_validator(
+                delegator, validator, {'amount': 5000000, 'denom': 'uatom'})
+        results.append(gentink.genesis)
+
+    assert results[0] == results[1]
+    staking = results[0]['app_state']['staking']
+    assert staking['delegations'][1]['shares'] == format(10000002.0, '.18f')
+    assert staking['validators'][1]['tokens'] == '30000000'
+    assert staking['last_validator_powers'][1]['power'] == '30'
+
+
+@pytest.mark.parametrize('use_indexes', [True, False])
+def test_module_accounts(use_indexes):
+    gentink = GenesisTinker(use_indexes=use_indexes)
+    gentink.load_file('tests/fresh_genesis.json')
+    accounts = gentink.get_module_accounts()
+
+    assert 'fee_collector' in accounts
+    assert gentink.get_bonded_pool_address() == accounts['bonded_tokens_pool']
+    assert gentink.get_not_bonded_pool_address() == \
+        accounts['not_bonded_tokens_pool']
+    assert gentink.get_module_account_address('missing') is None
+
+    # Edited accounts are picked up
+    gentink.app_state['auth']['accounts'][1] = {
+        'name': 'bonded_tokens_pool', 'base_account': {'address': 'cosmos1x'}}
+    assert gentink.get_bonded_pool_address() == 'cosmos1x'
+
+
+@pytest.mark.parametrize('use_indexes', [True, False])
+def test_increase_balances_matches_single_calls(use_indexes):
+    increases = [('cosmos1a', 5, 'uatom'), ('cosmos1b', 2, 'stake'),
+                 ('cosmos1a', 1, 'aaa'), ('cosmos1a', 7, 'uatom'),
+                 ('cosmos1b', 3, 'uatom')]
+    single = GenesisTinker(use_indexes=use_indexes)
+    single.genesis = balances_genesis()
+    for address, amount, denom in increases:
+        single.increase_balance(address, amount, denom)
+
+    bulk = GenesisTinker(use_indexes=use_indexes)
+    bulk.genesis = balances_genesis()
+    bulk.increase_balances(increases)
+
+    assert bulk.genesis['app_state']['bank']['balances'] == \
+        single.genesis['app_state']['bank']['balances']
+    assert sorted(bulk.genesis['app_state']['bank']['supply'],
+                  key=lambda coin: coin['denom']) == \
+        sorted(single.genesis['app_state']['bank']['supply'],
+               key=lambda coin: coin['denom'])
+
+
+def test_increase_balances_missing():
+    gentink = GenesisTinker()
+    gentink.genesis = balances_genesis()
+    with pytest.raises(Exception):
+        gentink.increase_balances([('cosmos1a', 5, 'uatom'),
+                                   ('cosmos1c', 1, 'uatom')])
+    assert gentink.genesis == balances_genesis()
+
+    gentink.increase_balances([('cosmos1c', 1, 'uatom'),
+                               ('cosmos1aa', 2, 'uatom'),
+                               ('cosmos1a', 5, 'uatom')], create_missing=True)
+    balances = gentink.app_state['bank']['balances']
+    assert [balance['address'] for balance in balances] == \
+        ['cosmos1a', 'cosmos1aa', 'cosmos1b', 'cosmos1c']
+    assert balances[0]['coins'] == [{'denom': 'uatom', 'amount': '6'}]
+    assert gentink.app_state['bank']['supply'] == [
+        {'denom': 'uatom', 'amount': '9'}]
+    gentink.increase_balance('cosmos1c', 1)
+    assert balances[3]['coins'] == [{'denom': 'uatom', 'amount': '2'}]
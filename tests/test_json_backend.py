@@ -0,0 +1,117 @@
+"""
+Test that every JSON backend parses and saves like the json module.
+python -m pytest -v tests/test_json_backend.py
+"""
+
+import io
+import json
+import pytest
+import json_backend
+from cosmos_genesis_tinker import GenesisTinker
+from genesis_generator import generate_genesis
+
+BACKENDS = json_backend.available_backends()
+
+with open('tests/fresh_genesis.json', 'rb') as genesis_file:
+    FRESH = genesis_file.read()
+
+VALUES = [
+    {'moniker': 'Umbrella ☔', 'identity': '\U0001f600 \x7f \x01  '},
+    {'amount': 123456789012345678901234567890, 'power': -2 ** 63 - 1,
+     'max': 2 ** 64, 'small': [0, -1, 2 ** 63 - 1]},
+    {'rates': [1.5, 1e16, 1e-7, -0.0, 0.1], 'empty': [{}, [], '']},
+    {'escapes': '"\\/\b\f\n\r\t', 'lone surrogate': '\ud800'},
+    {1: 'int key', True: 'bool key', None: 'null key'},
+    [[], [[]], {'a': {}}],
+    1.5,
+    float('nan'),
+    float('inf'),
+    {'rates': [float('-inf'), None, 1]},
+    'text',
+    None,
+]
+
+DOCUMENTS = [
+    pytest.param(FRESH, id='fresh_genesis'),
+    b'{"amount": 123456789012345678901234567890}',
+    b'{"amount": "123456789012345678901234567890"}',
+    b'[-1234567890123456789, 18446744073709551616]',
+    b'12345678901234567890',
+    b'{"big": 1e400, "nan": NaN, "inf": -Infinity}',
+    b'{"moniker": "Umbrella \xe2\x98\x94", "escaped": "\\u2614\\ud83d\\ude00"}',
+    b'{"duplicate": 1, "duplicate": 2}',
+    b'{"rate": 0.100000000000000000000001, "e": 1E2}',
+    b'"\\ud800"',
+]
+
+
+@pytest.fixture(name='backend', params=BACKENDS)
+def fixture_backend(request):
+    return json_backend.get_backend(request.param)
+
+
+def test_default_backend():
+    assert json_backend.get_backend().name == BACKENDS[0]
+    assert BACKENDS[-1] == 'json'
+    with pytest.raises(Exception, match='not available'):
+        json_backend.get_backend('missing')
+
+
+@pytest.mark.parametrize('value', VALUES)
+def test_dumps_matches_json(backend, value):
+    expected = json.dumps(value, indent=False).encode('ascii')
+    assert backend.dumps(value) == expected
+    target = io.BytesIO()
+    backend.dump(value, target)
+    assert target.getvalue() == expected
+
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+def test_loads_matches_json(backend, document):
+    expected = json.loads(document)
+    loaded = backend.loads(document)
+    # NaN is not equal to itself
+    assert json.dumps(loaded) == json.dumps(expected)
+    assert backend.dumps(loaded) == \
+        json.dumps(expected, indent=False).encode('ascii')
+    assert json.dumps(backend.loads(document.decode('utf-8'))) == \
+        json.dumps(expected)
+
+
+def test_long_integer_across_chunks(backend, monkeypatch):
+    monkeypatch.setattr(json_backend, 'SCAN_CHUNK_SIZE', 16)
+    for padding in range(20):
+        document = b'[' + b' ' * padding + b'"' + b'1' * 40 + b'", ' + \
+            b'9' * 30 + b']'
+        assert backend.loads(document) == json.loads(document)
+        assert not json_backend._has_long_integer(
+            b'[' + b' ' * padding + b'"' + b'1' * 40 + b'"]')
+
+
+def test_generated_genesis(backend, tmp_path):
+    path = tmp_path / 'genesis.json'
+    generate_genesis(str(path), accounts=500, balances=500)
+    document = path.read_bytes()
+    genesis = backend.loads(document)
+    assert genesis == json.loads(document)
+    genesis['app_state']['staking']['validators'][0]['description'][
+        'moniker'] = 'Umbrella ☔'
+    assert backend.dumps(genesis) == \
+        json.dumps(genesis, indent=False).encode('ascii')
+
+
+def test_tinker_shasum(tmp_path):
+    shasums = set()
+    for name in BACKENDS:
+        gentink = GenesisTinker(input_file='tests/fresh_genesis.json',
+                                output_file=str(tmp_path / f'{name}.json'),
+                                json_backend=name)
+        gentink.add_task(gentink.set_chain_id, chain_id='Umbrella ☔')
+        gentink.add_task(gentink.increase_balance,
+                         address='cosmos1lj54q70v2mt9e7c5mtp5xgg5n9c0hkas60kec9',
+                         amount=10 ** 30)
+        gentink.run_tasks()
+        shasums.add(gentink.output_shasum)
+        assert gentink.generate_json() == \
+            json.dumps(gentink.genesis, indent=False)
+    assert len(shasums) == 1
@@ -0,0 +1,107 @@
+"""
+Test the streaming JSON tokenizer and normaliser.
+python -m pytest -v tests/test_json_stream.py
+"""
+
+import io
+import json
+import subprocess
+import pytest
+from json_stream import apply_edits, balance_coin_edits, normalise, \
+    normalise_file, tokens
+
+
+def normalised(data: bytes, chunk_size: int = 7):
+    target = io.BytesIO()
+    normalise(io.BytesIO(data), target, chunk_size)
+    return target.getvalue()
+
+
+def test_matches_jq(tmp_path):
+    out_filename = tmp_path / 'normalised.json'
+    jq_output = subprocess.run(['jq', '.', 'tests/fresh_genesis.json'],
+                               capture_output=True, check=True).stdout
+
+    report = normalise_file('tests/fresh_genesis.json', out_filename,
+                            chunk_size=100)
+
+    assert out_filename.read_bytes() == jq_output
+    assert report['bytes_written'] == len(jq_output)
+    assert report['mb_per_second'] > 0
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 5, 1000])
+def test_layout(chunk_size):
+    data = b'{"a" : [ ] ,"b":{ }, "c":[{},[[1, 2]]],"d" :"x", "e": null}'
+    expected = (b'{\n  "a": [],\n  "b": {},\n  "c": [\n    {},\n    [\n'
+                b'      [\n        1,\n        2\n      ]\n    ]\n  ],\n'
+                b'  "d": "x",\n  "e": null\n}\n')
+    assert normalised(data, chunk_size) == expected
+
+
+def test_numbers_like_jq():
+    data = (b'[1.0, 1e2, -0, 0.0001, 1e-5, 1e15, 1e16, 2.5e16, 2.5e17,'
+            b' 123456789012345678, 12345678901234567890123, 1.5E+3]')
+    expected = (b'[\n  1,\n  100,\n  -0,\n  0.0001,\n  1e-05,\n'
+                b'  1000000000000000,\n  1e+16,\n  25000000000000000,\n'
+                b'  2.5e+17,\n  123456789012345680,\n'
+                b'  12345678901234568000000,\n  1500\n]\n')
+    assert normalised(data) == expected
+
+
+def test_strings_like_jq():
+    data = '["\\u0000\\u007f\\"\\\\\\/\\n\\u00e9", "Umbrella ☔"]'.encode()
+    expected = '[\n  "\\u0000\\u007f\\"\\\\/\\né",\n  "Umbrella ☔"\n]\n'
+    assert normalised(data) == expected.encode()
+
+
+def test_tokens():
+    data = b'{"a": [1, true, "x,y"]}'
+    assert list(tokens(io.BytesIO(data), 3)) == \
+        [b'{', b'"a"', b':', b'[', b'1', b',', b'true', b',', b'"x,y"',
+         b']', b'}']
+
+
+@pytest.mark.parametrize('data', [b'{"a" 1}', b'[1,]', b'{"a": 1', b'[1 2]',
+                                  b'["abc]', b'[nul]', b'{"a": 1]'])
+def test_invalid_json(data):
+    with pytest.raises(ValueError):
+        normalised(data)
+
+
+def test_balance_coin_edits_match_jq(tmp_path):
+    old_operator = 'cosmosvaloper1aaa'
+    new_operator = 'cosmosvaloper1zzz'
+    # Tokenized shares carry the operator address in their denom
+    coins = [{'amount': '1', 'denom': old_operator + '/1'},
+             {'amount': '2', 'denom': 'cosmosvaloper1bbb/2'},
+             {'amount': '3', 'denom': 'uatom'}]
+    genesis = {
+        'app_state': {
+            'bank': {
+                'balances': [
+                    {'address': 'cosmos1a', 'coins': coins},
+                    {'address': 'cosmos1b', 'coins': coins[:1]},
+                    {'address': 'cosmos1c', 'coins': []}
+                ],
+                'supply': coins
+            },
+            'other': {'coins': coins}
+        },
+        'chain_id': 'test'
+    }
+    original = normalised(json.dumps(genesis).encode())
+    data = original.replace(old_operator.encode(), new_operator.encode())
+    sorted_file = tmp_path / 'sorted.json'
+    sorted_file.write_bytes(data)
+    jq_output = subprocess.run(
+        ['jq', '.app_state.bank.balances |= map(.coins |= sort_by(.denom))',
+         sorted_file], capture_output=True, check=True).stdout
+
+    edits = balance_coin_edits(data, [new_operator])
+    target = io.BytesIO()
+    apply_edits(data, edits, target, chunk_size=10)
+
+    assert len(edits) == 1
+    assert target.getvalue() == jq_output
+    assert not balance_coin_edits(original, [old_operator, 'uatom'])
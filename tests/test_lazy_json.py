@@ -0,0 +1,146 @@
+"""
+Test lazy parsing of genesis files.
+python -m pytest -v tests/test_lazy_json.py
+"""
+
+import json
+import pytest
+import lazy_json
+from cosmos_genesis_tinker import GenesisTinker, Delegator
+
+with open('tests/fresh_genesis.json', 'rb') as genesis_file:
+    FRESH = genesis_file.read()
+
+
+class Writer:
+    """
+    Collects the str and bytes written to it
+    """
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(data.encode('utf-8') if isinstance(data, str)
+                          else bytes(data))
+
+    def value(self):
+        return b''.join(self.parts)
+
+
+def dumped(value):
+    writer = Writer()
+    lazy_json.dump(value, writer)
+    return writer.value()
+
+
+def test_sections_parsed_on_access():
+    genesis = lazy_json.loads(FRESH)
+    assert isinstance(genesis, lazy_json.LazyObject)
+    assert genesis.raw_keys() == list(json.loads(FRESH))
+
+    assert genesis['chain_id'] == 'local-chain'
+    app_state = genesis['app_state']
+    assert isinstance(app_state, lazy_json.LazyObject)
+    assert app_state['gov'] == json.loads(FRESH)['app_state']['gov']
+    assert 'ibc' in app_state.raw_keys()
+    assert 'gov' not in app_state.raw_keys()
+    assert app_state.get('missing') is None
+    assert len(genesis.items()) == len(json.loads(FRESH))
+    assert not genesis.raw_keys()
+
+
+def test_untouched_sections_match_json_dump():
+    genesis = lazy_json.loads(FRESH)
+    genesis['chain_id'] = 'lazy-chain'
+    genesis['app_state']['gov']['params']['voting_period'] = '1s'
+    output = dumped(genesis)
+    assert 'ibc' in genesis['app_state'].raw_keys()
+
+    expected = json.loads(FRESH)
+    expected['chain_id'] = 'lazy-chain'
+    expected['app_state']['gov']['params']['voting_period'] = '1s'
+    assert output == json.dumps(expected, indent=False).encode('ascii')
+    assert lazy_json.dumps(genesis) == output
+
+
+@pytest.mark.parametrize('value', [
+    {'floats': [1.50, 1E2, 1e16, -0.0], 'zero': -0},
+    {'escapes': '\\u0041 \\/ é \x7f ☔ \U0001f600 \b\x08\x1f\\'},
+    {'empty': [{}, [], ''], 'nested': {'a': [{'b': None}]}},
+])
+@pytest.mark.parametrize('ensure_ascii', [False, True])
+def test_unparsed_layout_fixed_up(value, ensure_ascii):
+    content = json.dumps({'app_state': {'section': value}}, indent=2,
+                         ensure_ascii=ensure_ascii).encode('utf-8')
+    content = content.replace(b'1.5', b'1.50').replace(b'100.0', b'1E2')
+    genesis = lazy_json.loads(content)
+    assert dumped(genesis) == \
+        json.dumps(json.loads(content), indent=False).encode('ascii')
+    assert genesis['app_state'].raw_keys() == ['section']
+
+
+def test_parsed_sections_match_json_dump():
+    genesis = lazy_json.loads(FRESH)
+    for key in list(genesis):
+        if isinstance(genesis[key], lazy_json.LazyObject):
+            genesis[key].values()
+    assert dumped(genesis) == \
+        json.dumps(json.loads(FRESH), indent=False).encode('utf-8')
+
+
+@pytest.mark.parametrize('content', [
+    json.dumps(json.loads(FRESH)).encode('utf-8'),
+    json.dumps(json.loads(FRESH), indent=4).encode('utf-8'),
+    b'[1, 2]',
+    b'{}'
+])
+def test_other_layouts_parsed_in_full(content):
+    value = lazy_json.loads(content)
+    assert not isinstance(value, lazy_json.LazyObject)
+    assert value == json.loads(content)
+
+
+def test_lazy_tinker(tmp_path):
+    old_del = Delegator()
+    old_del.address = 'cosmos1lj54q70v2mt9e7c5mtp5xgg5n9c0hkas60kec9'
+    old_del.public_key = 'Aiu5OMUoNnBnWiWOC/Z/Luyq2XFROqubW5oP4Y8y/Lzz'
+    new_del = Delegator()
+    new_del.address = 'cosmos123'
+    new_del.public_key = 'key456'
+
+    outputs = {}
+    for lazy in (False, True):
+        output_file = str(tmp_path / f'tinkered_{lazy}.json')
+        gentink = GenesisTinker(input_file='tests/fresh_genesis.json',
+                                output_file=output_file,
+                                preprocessing_file=str(tmp_path / 'pre.json'),
+                                lazy=lazy)
+        gentink.add_task(gentink.replace_delegator,
+                         old_delegator=old_del, new_delegator=new_del)
+        gentink.add_task(gentink.set_chain_id, chain_id='lazy-chain')
+        gentink.add_task(gentink.set_voting_period, voting_period='60s')
+        gentink.add_task(gentink.increase_balance,
+                         address='cosmos123', amount=5)
+        assert gentink.run_tasks() is None
+        if lazy:
+            assert 'ibc' in gentink.genesis['app_state'].raw_keys()
+        with open(output_file, 'rb') as file:
+            outputs[lazy] = json.load(file)
+    assert outputs[True] == outputs[False]
+
+
+def test_lazy_output_matches_eager(tmp_path):
+    shasums = {}
+    for lazy in (False, True):
+        output_file = tmp_path / f'tinkered_{lazy}.json'
+        gentink = GenesisTinker(input_file='tests/fresh_genesis.json',
+                                output_file=str(output_file), lazy=lazy)
+        gentink.add_task(gentink.set_chain_id, chain_id='lazy-chain')
+        assert gentink.run_tasks() is None
+        shasums[lazy] = gentink.output_shasum
+        assert gentink.generate_json().encode('ascii') == \
+            output_file.read_bytes()
+        if lazy:
+            assert 'auth' in gentink.genesis['app_state'].raw_keys()
+    assert shasums[True] == shasums[False]
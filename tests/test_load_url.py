@@ -0,0 +1,159 @@
+"""
+Test loading genesis files from a local HTTP server.
+python -m pytest -v tests/test_load_url.py
+"""
+
+import functools
+import gzip
+import io
+import json
+import socket
+import tarfile
+import threading
+from hashlib import sha256
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from zipfile import ZipFile
+import pytest
+from requests.exceptions import Timeout
+import download_cache
+from cosmos_genesis_tinker import GenesisTinker
+from download_cache import DownloadCache
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        self.server.requests.append(self.path)
+
+
+# Marks gzip files with Content-Encoding like Apache's AddEncoding,
+# and sends encoded.json compressed for transport
+class EncodingHandler(QuietHandler):
+    def end_headers(self):
+        if self.path.endswith('.gz') or self.path == '/encoded.json':
+            self.send_header('Content-Encoding', 'gzip')
+        super().end_headers()
+
+
+def serve(tmp_path, handler_class):
+    with open('tests/fresh_genesis.json', 'rb') as genesis_file:
+        content = genesis_file.read()
+    (tmp_path / 'genesis.json').write_bytes(content)
+    (tmp_path / 'encoded.json').write_bytes(gzip.compress(content))
+    (tmp_path / 'genesis.json.gz').write_bytes(gzip.compress(content))
+    with tarfile.open(tmp_path / 'genesis.tar.gz', 'w:gz') as archive:
+        info = tarfile.TarInfo('genesis.json')
+        info.size = len(content)
+        archive.addfile(info, io.BytesIO(content))
+    with ZipFile(tmp_path / 'genesis.zip', 'w') as archive:
+        archive.writestr('genesis.json', content)
+
+    handler = functools.partial(handler_class, directory=str(tmp_path))
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}/', content, httpd.requests
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def server(tmp_path):
+    yield from serve(tmp_path, QuietHandler)
+
+
+@pytest.fixture
+def encoding_server(tmp_path):
+    yield from serve(tmp_path, EncodingHandler)
+
+
+@pytest.mark.parametrize('name', ['genesis.json', 'genesis.json.gz',
+                                  'genesis.tar.gz', 'genesis.zip'])
+def test_load_url(server, name):
+    base_url, content, _ = server
+    digest = sha256(content).hexdigest()
+
+    gentink = GenesisTinker().load_url(base_url + name, digest)
+
+    assert gentink.genesis == json.loads(content)
+
+
+@pytest.mark.parametrize('name', ['genesis.json.gz', 'genesis.tar.gz',
+                                  'encoded.json'])
+@pytest.mark.parametrize('cached', [False, True])
+def test_load_url_content_encoding(encoding_server, tmp_path, name, cached):
+    base_url, content, _ = encoding_server
+    digest = sha256(content).hexdigest()
+    cache = DownloadCache(str(tmp_path / 'cache')) if cached else None
+
+    gentink = GenesisTinker(download_cache=cache).load_url(base_url + name,
+                                                           digest)
+
+    assert gentink.genesis == json.loads(content)
+
+
+def test_load_url_invalid_digest(server):
+    base_url, _, _ = server
+    with pytest.raises(Exception, match='invalid digest'):
+        GenesisTinker().load_url(base_url + 'genesis.json.gz', 'bad')
+
+
+@pytest.mark.parametrize('name', ['genesis.json', 'genesis.tar.gz',
+                                  'genesis.zip'])
+def test_cache_hit_skips_network(server, tmp_path, name):
+    base_url, content, requests = server
+    digest = sha256(content).hexdigest()
+    cache = DownloadCache(str(tmp_path / 'cache'))
+
+    GenesisTinker(download_cache=cache).load_url(base_url + name, digest)
+    assert cache.last_status == 'miss'
+    assert len(requests) == 1
+
+    gentink = GenesisTinker(download_cache=cache)
+    gentink.load_url(base_url + name, digest)
+    assert cache.last_status == 'hit'
+    assert len(requests) == 1
+    assert gentink.genesis == json.loads(content)
+
+
+def test_cache_revalidates(server, tmp_path):
+    base_url, content, requests = server
+    url = base_url + 'genesis.json.gz'
+    cache = DownloadCache(str(tmp_path / 'cache'))
+
+    GenesisTinker(download_cache=cache).load_url(url)
+    GenesisTinker(download_cache=cache).load_url(url)
+    assert cache.last_status == 'revalidated'
+    assert len(requests) == 2
+
+    # The content digest is known after the first download
+    GenesisTinker(download_cache=cache).load_url(url,
+                                                 sha256(content).hexdigest())
+    assert cache.last_status == 'hit'
+    assert len(requests) == 2
+
+
+def test_cache_evicts_least_recently_used(server, tmp_path):
+    base_url, _, _ = server
+    for name in 'abc':
+        (tmp_path / name).write_bytes(b'x' * 100)
+    cache = DownloadCache(str(tmp_path / 'cache'), max_bytes=250)
+
+    for name in 'aba':
+        cache.open(base_url + name, 'pinned').close()
+    cache.open(base_url + 'c', 'pinned').close()
+
+    assert cache.size() == 200
+    for name, status in [('a', 'hit'), ('c', 'hit'), ('b', 'miss')]:
+        cache.open(base_url + name, 'pinned').close()
+        assert cache.last_status == status
+
+
+def test_cache_download_times_out(tmp_path, monkeypatch):
+    monkeypatch.setattr(download_cache, 'TIMEOUT', 0.2)
+    # Accepts the connection and never answers
+    with socket.create_server(('127.0.0.1', 0)) as listener:
+        url = f'http://127.0.0.1:{listener.getsockname()[1]}/genesis.json'
+        cache = DownloadCache(str(tmp_path / 'cache'))
+        with pytest.raises(Timeout):
+            GenesisTinker(download_cache=cache).load_url(url)
@@ -0,0 +1,110 @@
+"""
+Test the store of parsed numeric fields.
+python -m pytest -v tests/test_numeric_store.py
+"""
+
+import json
+import pytest
+from benchmarks.suite import Context
+from cosmos_genesis_tinker import GenesisTinker
+from numeric_store import NumericStore
+
+
+def test_deferred_fields():
+    store = NumericStore()
+    coin = {'denom': 'uatom', 'amount': '10'}
+    validator = {'tokens': '5', 'delegator_shares': '5.000000000000000000'}
+    assert store.add(coin, 'amount', 5) == 15
+    assert store.add(coin, 'amount', 2 ** 70) == 15 + 2 ** 70
+    assert store.get(validator, 'tokens') == 5
+    store.add(validator, 'delegator_shares', 2.5)
+    # Nothing is written until the store is flushed
+    assert coin['amount'] == '10'
+    assert store.flush() == 2
+    assert coin['amount'] == str(15 + 2 ** 70)
+    assert validator == {'tokens': '5',
+                         'delegator_shares': '7.500000000000000000'}
+    assert store.flush() == 0
+    # The values stay parsed after a flush
+    assert store.add(coin, 'amount', 1) == 16 + 2 ** 70
+
+
+def test_write_through_fields():
+    store = NumericStore(deferred=False)
+    info = {'stake': '1.500000000000000000'}
+    assert store.add(info, 'stake', 1) == 2.5
+    assert info['stake'] == '2.500000000000000000'
+    assert store.flush() == 0
+
+
+@pytest.mark.parametrize('increases', [
+    [1e-20, 1e-20], [0.05, 0.05, -0.1], [1 / 3, 1 / 3, 1 / 3], [1e20, 0.1]])
+def test_decimals_match_formatting_every_time(increases):
+    stored = {'shares': '0.000000000000000000'}
+    written = dict(stored)
+    store = NumericStore()
+    for increase in increases:
+        store.add(stored, 'shares', increase)
+        written['shares'] = format(float(written['shares']) + increase,
+                                   '.18f')
+    store.flush()
+    assert stored == written
+
+
+def test_total():
+    store = NumericStore()
+    coins = [{'amount': str(amount)} for amount in range(10)]
+    assert store.total(coins, 'amount') == 45
+    store.add(coins[0], 'amount', 100)
+    assert store.total(coins, 'amount') == 145
+    assert coins[0]['amount'] == '100'
+    assert store.total(iter(coins[1:]), 'amount') == 45
+
+
+def run(context, output_file, numeric_store, compact=False):
+    gentink = GenesisTinker(input_file=context.genesis_file,
+                            output_file=output_file,
+                            numeric_store=numeric_store, compact=compact)
+    address = context.delegator.address
+    for _ in range(3):
+        gentink.add_task(gentink.increase_balance, address=address,
+                         amount=5)
+        gentink.add_task(gentink.increase_balances,
+                         increases=[(address, 3, 'uatom'),
+                                    (address, 4, 'unumeric')])
+        gentink.add_task(gentink.increase_validator_stake,
+                         operator_address=context.validator.operator_address,
+                         increase=7)
+        gentink.add_task(gentink.increase_delegator_stake_to_validator,
+                         delegator=context.delegator,
+                         validator=context.validator,
+                         increase={'amount': 1000000, 'denom': 'uatom'})
+    assert gentink.run_tasks() is None
+    return gentink
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_numeric_store_tinker(tmp_path, compact):
+    context = Context(str(tmp_path), 1000)
+    expected = run(context, str(tmp_path / 'expected.json'), False)
+    gentink = run(context, str(tmp_path / 'stored.json'), True, compact)
+    assert gentink.output_shasum == expected.output_shasum
+    assert json.loads(gentink.generate_json()) == expected.genesis
+    supply = {coin['denom']: int(coin['amount'])
+              for coin in gentink.app_state['bank']['supply']}
+    assert gentink.get_total_balance('unumeric') == supply['unumeric']
+    assert gentink.get_total_balance('unumeric') == \
+        expected.get_total_balance('unumeric')
+    assert gentink.get_total_balance('uatom') == \
+        expected.get_total_balance('uatom')
+
+
+def test_total_balance_of_fresh_genesis():
+    gentink = GenesisTinker(numeric_store=True)
+    with open('tests/fresh_genesis.json', 'rb') as file:
+        gentink.load_bytes(file.read())
+    assert gentink.get_total_balance('stake') == 10000004100
+    gentink.increase_balance('cosmos1fl48vsnmsdzcv85q5d2q4z5ajdha8yu34mf0eh',
+                             5, 'stake')
+    assert gentink.get_total_balance('stake') == 10000004105
+    assert gentink.get_total_balance('missing') == 0
@@ -0,0 +1,67 @@
+"""
+Test the parsed genesis snapshot cache.
+python -m pytest -v tests/test_snapshot_cache.py
+"""
+
+import json
+import shutil
+from cosmos_genesis_tinker import GenesisTinker
+from snapshot_cache import SnapshotCache
+
+
+def test_snapshot_reload(tmp_path):
+    cache = SnapshotCache(str(tmp_path / 'cache'))
+    with open('tests/fresh_genesis.json', 'r', encoding='utf8') as file:
+        expected = json.load(file)
+
+    for status in ['miss', 'hit']:
+        gentink = GenesisTinker(snapshot_cache=cache)
+        gentink.load_file('tests/fresh_genesis.json')
+        assert cache.last_status == status
+        assert gentink.genesis == expected
+    assert len(cache.entries()) == 1
+
+
+def test_snapshot_invalidated_by_change(tmp_path):
+    cache = SnapshotCache(str(tmp_path / 'cache'))
+    path = tmp_path / 'genesis.json'
+    path.write_text('{"chain_id": "a"}')
+    assert cache.load(str(path)) == {'chain_id': 'a'}
+
+    path.write_text('{"chain_id": "b"}')
+    assert cache.load(str(path)) == {'chain_id': 'b'}
+    assert cache.last_status == 'miss'
+
+
+def test_corrupted_snapshot(tmp_path):
+    cache = SnapshotCache(str(tmp_path / 'cache'))
+    path = tmp_path / 'genesis.json'
+    path.write_text('{"chain_id": "a"}')
+    cache.load(str(path))
+    (key, _, _), = cache.entries()
+    (tmp_path / 'cache' / (key + '.marshal')).write_bytes(b'\xff')
+
+    assert cache.load(str(path)) == {'chain_id': 'a'}
+    assert cache.last_status == 'miss'
+    assert cache.load(str(path)) == {'chain_id': 'a'}
+    assert cache.last_status == 'hit'
+
+
+def test_snapshot_eviction(tmp_path):
+    cache = SnapshotCache(str(tmp_path / 'cache'))
+    paths = []
+    for index in range(3):
+        path = tmp_path / f'genesis_{index}.json'
+        shutil.copy('tests/fresh_genesis.json', path)
+        with open(path, 'a', encoding='utf8') as file:
+            file.write(' ' * index)
+        paths.append(str(path))
+    cache.load(paths[0])
+    cache.max_bytes = cache.size() * 2
+
+    for path in paths:
+        cache.load(path)
+
+    assert len(cache.entries()) == 2
+    cache.load(paths[0])
+    assert cache.last_status == 'miss'
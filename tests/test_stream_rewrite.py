@@ -0,0 +1,162 @@
+"""
+Test the streaming rewrite of genesis files.
+python -m pytest -v tests/test_stream_rewrite.py
+"""
+
+import io
+import json
+import os
+import tracemalloc
+import pytest
+import stream_rewrite
+from cosmos_genesis_tinker import GenesisTinker, Delegator
+from genesis_generator import generate_genesis
+
+with open('tests/fresh_genesis.json', 'rb') as genesis_file:
+    FRESH = genesis_file.read()
+
+
+def rewritten(content, transforms, chunk_size=7):
+    target = io.BytesIO()
+    stream_rewrite.rewrite(io.BytesIO(content), target, transforms,
+                           chunk_size)
+    return target.getvalue()
+
+
+@pytest.mark.parametrize('content', [
+    pytest.param(FRESH, id='fresh_genesis'),
+    b'{"a": [1, 2.50, 1E2, -0.0, "\\u00e9\xc3\xa9\\/", {}, [], '
+    b'{"b": [{}, true, false]}], "k\\n": null}',
+    b' [ ] ',
+    b'"text"',
+    b'[-0, 0, -10, "del\x7f"]',
+])
+def test_layout_matches_json_dump(content):
+    expected = json.dumps(json.loads(content), indent=False).encode()
+    assert rewritten(content, {}) == expected
+
+
+def test_duplicate_keys_are_kept():
+    content = b'{"a": 1, "b": {"c": 2, "c": 3}, "a": 4}'
+    # Unlike json.loads, which keeps the last value of every key
+    assert rewritten(content, {}) == \
+        b'{\n"a": 1,\n"b": {\n"c": 2,\n"c": 3\n},\n"a": 4\n}'
+    assert rewritten(content, {('a',): lambda value: value * 10}) == \
+        b'{\n"a": 10,\n"b": {\n"c": 2,\n"c": 3\n},\n"a": 40\n}'
+
+
+def test_transforms_replace_values_at_paths():
+    genesis = json.loads(FRESH)
+    genesis['chain_id'] = 'stream-1'
+    for balance in genesis['app_state']['bank']['balances']:
+        balance['coins'] = []
+
+    def empty_coins(balance):
+        balance['coins'] = []
+        return balance
+
+    output = rewritten(FRESH, {
+        ('chain_id',): lambda chain_id: 'stream-1',
+        ('app_state', 'bank', 'balances', stream_rewrite.ELEMENT):
+            empty_coins})
+    assert output == json.dumps(genesis, indent=False).encode()
+
+
+@pytest.mark.parametrize('content', [b'{"a": [1, 2}', b'{"a": 1', b'{} []'])
+def test_invalid_documents(content):
+    with pytest.raises(ValueError):
+        rewritten(content, {('a',): lambda value: value})
+
+
+def add_tasks(gentink):
+    gentink.add_task(gentink.set_chain_id, chain_id='stream-chain')
+    gentink.add_task(gentink.set_unbonding_time, unbonding_time='60s')
+    gentink.add_task(gentink.set_voting_period, voting_period='30s')
+    gentink.add_task(gentink.set_max_deposit_period, max_deposit_period='20s')
+    gentink.add_task(gentink.set_min_deposit, min_amount='10', denom='ustake')
+    gentink.add_task(gentink.set_tally_param, parameter_name='quorum',
+                     value='0.1')
+    gentink.add_task(gentink.increase_balance, address='cosmos123', amount=5)
+    gentink.add_task(gentink.increase_balance, address='cosmos123', amount=7,
+                     denom='ustream')
+    gentink.add_task(gentink.create_coin, denom='unew', amount='3')
+    gentink.add_task(gentink.increase_supply, increase=2, denom='ustream')
+
+
+@pytest.mark.parametrize('in_memory', [False, True])
+def test_streaming_matches_loading(tmp_path, in_memory):
+    old_del = Delegator()
+    old_del.address = 'cosmos1lj54q70v2mt9e7c5mtp5xgg5n9c0hkas60kec9'
+    old_del.public_key = 'Aiu5OMUoNnBnWiWOC/Z/Luyq2XFROqubW5oP4Y8y/Lzz'
+    new_del = Delegator()
+    new_del.address = 'cosmos123'
+    new_del.public_key = 'key456'
+
+    shasums = {}
+    for streaming in (False, True):
+        output_file = str(tmp_path / f'tinkered_{streaming}.json')
+        gentink = GenesisTinker(input_file='tests/fresh_genesis.json',
+                                output_file=output_file,
+                                preprocessing_file=str(tmp_path / 'pre.json'),
+                                in_memory=in_memory, streaming=streaming)
+        gentink.add_task(gentink.replace_delegator,
+                         old_delegator=old_del, new_delegator=new_del)
+        add_tasks(gentink)
+        assert gentink.run_tasks() is None
+        shasums[streaming] = gentink.output_shasum
+        if streaming:
+            assert gentink.genesis == {}
+            assert not os.path.exists(tmp_path / 'pre.json')
+    assert shasums[True] == shasums[False]
+
+
+def test_streaming_generated_genesis(tmp_path):
+    input_file = str(tmp_path / 'genesis.json')
+    generate_genesis(input_file, accounts=5000, balances=5000,
+                     delegations=100, starting_infos=100, validators=10,
+                     max_validators=5, ibc_packets=0)
+    with open(input_file, 'rb') as file:
+        address = json.load(file)['app_state']['bank']['balances'][-1][
+            'address']
+
+    shasums = {}
+    peaks = {}
+    for streaming in (False, True):
+        gentink = GenesisTinker(
+            input_file=input_file,
+            output_file=str(tmp_path / f'tinkered_{streaming}.json'),
+            streaming=streaming)
+        gentink.add_task(gentink.set_chain_id, chain_id='stream-chain')
+        gentink.add_task(gentink.increase_balance, address=address, amount=9)
+        tracemalloc.start()
+        try:
+            assert gentink.run_tasks() is None
+            peaks[streaming] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        shasums[streaming] = gentink.output_shasum
+    assert shasums[True] == shasums[False]
+    # Only one balance is parsed at a time
+    assert peaks[True] * 10 < peaks[False]
+
+
+def test_unsupported_task(tmp_path):
+    gentink = GenesisTinker(input_file='tests/fresh_genesis.json',
+                            output_file=str(tmp_path / 'tinkered.json'),
+                            streaming=True)
+    gentink.add_task(gentink.set_chain_id, chain_id='stream-chain')
+    gentink.add_task(gentink.increase_validator_stake,
+                     operator_address='cosmosvaloper1', increase=1)
+    with pytest.raises(Exception, match='not supported in streaming mode'):
+        gentink.run_tasks()
+    assert not os.path.exists(tmp_path / 'tinkered.json')
+
+
+def test_missing_balance(tmp_path):
+    output_file = tmp_path / 'tinkered.json'
+    gentink = GenesisTinker(input_file='tests/fresh_genesis.json',
+                            output_file=str(output_file), streaming=True)
+    gentink.add_task(gentink.increase_balance, address='cosmos1missing')
+    with pytest.raises(Exception, match='Could not find balance'):
+        gentink.run_tasks()
+    assert not output_file.exists()
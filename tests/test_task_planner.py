@@ -0,0 +1,93 @@
+"""
+Test the json task planner.
+python -m pytest -v tests/test_task_planner.py
+"""
+
+from cosmos_genesis_tinker import GenesisTinker
+from task_planner import plan_tasks
+
+
+def add_tasks(gentink, reader=None):
+    address = 'cosmos1lj54q70v2mt9e7c5mtp5xgg5n9c0hkas60kec9'
+    gentink.add_task(gentink.set_chain_id, chain_id='first')
+    for denom in ['uatom', 'stake', 'uatom', 'ibc/ABC', 'aaa']:
+        gentink.add_task(gentink.increase_balance, address=address,
+                         amount=7, denom=denom)
+    gentink.add_task(gentink.increase_supply, increase=3, denom='uatom')
+    gentink.add_task(gentink.set_tally_param, parameter_name='quorum',
+                     value='0.1')
+    gentink.add_task(gentink.set_tally_param, parameter_name='threshold',
+                     value='0.2')
+    if reader is not None:
+        gentink.add_task(reader)
+    gentink.add_task(gentink.set_tally_param, parameter_name='quorum',
+                     value='0.3')
+    gentink.add_task(gentink.set_chain_id, chain_id='second')
+    gentink.add_task(gentink.increase_balance, address=address)
+
+
+def test_optimised_genesis_unchanged(tmp_path, capsys):
+    outputs = []
+    for optimise in [False, True]:
+        out_filename = tmp_path / f'genesis_{optimise}.json'
+        gentink = GenesisTinker(input_file='tests/fresh_genesis.json',
+                                output_file=str(out_filename))
+        add_tasks(gentink)
+        assert gentink.run_tasks(optimise=optimise) is None
+        outputs.append(out_filename.read_bytes())
+
+    assert outputs[0] == outputs[1]
+    out = capsys.readouterr().out
+    assert 'Original plan: 12 tasks' in out
+    assert 'Optimised plan: 6 tasks' in out
+
+
+def test_plan():
+    gentink = GenesisTinker()
+    gentink.genesis = {}
+
+    def reader():
+        pass
+
+    add_tasks(gentink, reader)
+    plan = plan_tasks(gentink, gentink.tasks())
+    gentink.clear_tasks()
+
+    assert [(task.func.__name__, task.keywords.get('parameter_name'))
+            for task in plan] == [
+        ('set_chain_id', None),
+        ('increase_balances', None),
+        ('increase_supply', None),
+        # Kept since reader could depend on it
+        ('set_tally_param', 'quorum'),
+        ('set_tally_param', 'threshold'),
+        ('reader', None),
+        ('set_tally_param', 'quorum'),
+        ('set_chain_id', None),
+        ('increase_balance', None)]
+    assert len(plan[1].keywords['increases']) == 5
+
+
+def test_folded_setters_create_values_in_place(tmp_path):
+    outputs = []
+    for optimise in [False, True]:
+        out_filename = tmp_path / f'genesis_{optimise}.json'
+        gentink = GenesisTinker(input_file='tests/fresh_genesis.json',
+                                output_file=str(out_filename))
+        for denom, amount in [('aaa', '1'), ('bbb', '2'), ('aaa', '3')]:
+            gentink.add_task(gentink.set_min_deposit, min_amount=amount,
+                             denom=denom)
+        for name, value in [('new_a', '0.1'), ('new_b', '0.2'),
+                            ('new_a', '0.3')]:
+            gentink.add_task(gentink.set_tally_param, parameter_name=name,
+                             value=value)
+        assert gentink.run_tasks(optimise=optimise) is None
+        params = gentink.gov['params']
+        assert [(deposit['denom'], deposit['amount'])
+                for deposit in params['min_deposit']][-2:] == \
+            [('aaa', '3'), ('bbb', '2')]
+        assert list(params)[-2:] == ['new_a', 'new_b']
+        assert params['new_a'] == '0.3'
+        outputs.append(out_filename.read_bytes())
+
+    assert outputs[0] == outputs[1]
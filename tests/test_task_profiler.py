@@ -0,0 +1,85 @@
+"""
+Test the per-task measurements reported by run_tasks.
+python -m pytest -v tests/test_task_profiler.py
+"""
+
+import json
+import tracemalloc
+from cosmos_genesis_tinker import GenesisTinker, Delegator
+from task_profiler import TaskProfiler
+
+
+def test_run_tasks_report(tmp_path):
+    old_del = Delegator()
+    old_del.address = 'cosmos1lj54q70v2mt9e7c5mtp5xgg5n9c0hkas60kec9'
+    old_del.public_key = 'Aiu5OMUoNnBnWiWOC/Z/Luyq2XFROqubW5oP4Y8y/Lzz'
+    new_del = Delegator()
+    new_del.address = 'cosmos123'
+    new_del.public_key = 'key456'
+
+    gentink = GenesisTinker(input_file='tests/fresh_genesis.json',
+                            output_file=str(tmp_path / 'tinkered.json'),
+                            preprocessing_file=str(tmp_path / 'pre.json'))
+    gentink.add_task(gentink.replace_delegator,
+                     old_delegator=old_del, new_delegator=new_del)
+    gentink.add_task(gentink.set_chain_id, chain_id='profiled')
+    gentink.add_task(gentink.increase_balance, address='cosmos123', amount=5)
+
+    streamed = []
+    report_file = tmp_path / 'report.json'
+    assert gentink.run_tasks(report_file=str(report_file),
+                             on_event=streamed.append) is None
+
+    events = gentink.report['events']
+    assert streamed == events
+    with open(report_file, 'r', encoding='utf-8') as file:
+        assert json.load(file) == gentink.report
+
+    names = [(event['kind'], event['name']) for event in events]
+    for expected in [('phase', 'preprocess'), ('task', 'replace_delegator'),
+                     ('phase', 'replace'), ('phase', 'load'),
+                     ('task', 'set_chain_id'), ('task', 'increase_balance'),
+                     ('phase', 'hash'), ('phase', 'save'),
+                     ('run', 'run_tasks')]:
+        assert expected in names
+    # Nested events are emitted before the events containing them
+    assert names.index(('phase', 'preprocess')) < \
+        names.index(('task', 'replace_delegator'))
+    assert names.index(('phase', 'hash')) < names.index(('phase', 'save'))
+    assert names[-1] == ('run', 'run_tasks')
+
+    run = events[-1]
+    assert run['depth'] == 0
+    assert all(event['depth'] > 0 for event in events[:-1])
+    assert all(event['wall_seconds'] <= run['wall_seconds']
+               for event in events)
+    assert gentink.report['wall_seconds'] == run['wall_seconds']
+
+
+def test_nested_memory_peaks():
+    tracemalloc.start()
+    try:
+        profiler = TaskProfiler()
+        with profiler.measure('run', 'outer'):
+            with profiler.measure('task', 'allocate'):
+                data = bytearray(1 << 20)
+                del data
+            with profiler.measure('task', 'small'):
+                pass
+    finally:
+        tracemalloc.stop()
+
+    allocate, small, outer = profiler.events
+    assert allocate['memory_peak'] >= 1 << 20
+    assert allocate['memory_delta'] < 1 << 20
+    assert small['memory_peak'] < 1 << 20
+    # The peak of the outer block survives the nested resets
+    assert outer['memory_peak'] >= 1 << 20
+
+
+def test_memory_not_traced():
+    profiler = TaskProfiler()
+    with profiler.measure('task', 'untraced'):
+        pass
+    assert profiler.events[0]['memory_delta'] is None
+    assert profiler.events[0]['memory_peak'] is None
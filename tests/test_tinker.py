@@ -7,8 +7,8 @@ python -m pytest -v --genesis stateful
 
 import pytest
 import json
-import time
 import gzip
+from hashlib import sha256
 from functools import partial
 from cosmos_genesis_tinker import GenesisTinker, \
     TinkerTaskList, \
@@ -106,8 +106,6 @@ def test_task_order(input_data):
     out_filename = data['output_file']
     new_name = 'tinkered-chain'
 
-    start_time = time.time()
-
     gentink = GenesisTinker(input_file=in_filename, output_file=out_filename)
     gentink.add_task(gentink.replace_delegator,
                      old_delegator=data['target_delegator'],
@@ -129,8 +127,6 @@ def test_task_order(input_data):
     gentink2.add_task(gentink2.set_chain_id, chain_id=new_name)
     happy_result = gentink2.run_tasks()
 
-    end_time = time.time()
-
     assert sad_result
     assert happy_result is None
 
@@ -142,15 +138,10 @@ def test_set_chain_id(input_data):
     out_filename = data['output_file']
     new_name = 'tinkered-chain'
 
-    start_time = time.time()
-
     gentink = GenesisTinker(input_file=in_filename, output_file=out_filename)
     gentink.add_task(gentink.set_chain_id, chain_id=new_name)
     gentink.run_tasks()
 
-    end_time = time.time()
-    print(f'Time elapsed: {end_time-start_time:.3f}s', end=' ')
-
     with open(out_filename, 'r') as new_file:
         new_genesis = json.load(new_file)
     assert new_genesis['chain_id'] == new_name
@@ -162,15 +153,10 @@ def test_set_unbonding_time(input_data):
     new_time = '5s'
     in_filename = data['input_file']
     out_filename = data['output_file']
-    start_time = time.time()
-
     gentink = GenesisTinker(input_file=in_filename, output_file=out_filename)
     gentink.add_task(gentink.set_unbonding_time, unbonding_time=new_time)
     gentink.run_tasks()
 
-    end_time = time.time()
-    print(f'Time elapsed: {end_time-start_time:.3f}s', end=' ')
-
     with open(out_filename, 'r') as new_file:
         new_genesis = json.load(new_file)
     assert new_genesis['app_state']['staking']['params']['unbonding_time'] == new_time
@@ -192,8 +178,6 @@ def test_governance_functions(input_data):
     new_denom = 'uatom'
     new_params = [{'name': 'quorum', 'value': "0.000000000000000001"},
                   {'name': 'threshold', 'value': "0.000000000000000001"}]
-    start_time = time.time()
-
     gentink = GenesisTinker(input_file=in_filename, output_file=out_filename)
     gentink.add_task(gentink.set_max_deposit_period,
                      max_deposit_period=new_time)
@@ -206,9 +190,6 @@ def test_governance_functions(input_data):
                          value=parameter['value'])
     gentink.run_tasks()
 
-    end_time = time.time()
-    print(f'Time elapsed: {end_time-start_time:.3f}s', end=' ')
-
     # max_deposit_period
     with open(out_filename, 'r') as new_file:
         new_genesis = json.load(new_file)
@@ -234,17 +215,12 @@ def test_create_coin(input_data):
     out_filename = data['output_file']
     new_denom = 'myco'
     new_amount = '9000'
-    start_time = time.time()
-
     gentink = GenesisTinker(input_file=in_filename, output_file=out_filename)
     gentink.add_task(gentink.create_coin,
                      denom=new_denom,
                      amount=new_amount)
     gentink.run_tasks()
 
-    end_time = time.time()
-    print(f'Time elapsed: {end_time-start_time:.3f}s', end=' ')
-
     with open(out_filename, 'r') as new_file:
         new_genesis = json.load(new_file)
     supply = new_genesis['app_state']['bank']['supply']
@@ -266,16 +242,12 @@ def test_replace_delegator(input_data):
     new_del.address = 'cosmos123'
     new_del.public_key = 'key456'
 
-    start_time = time.time()
-
     gentink = GenesisTinker(input_file=in_filename, output_file=out_filename)
     gentink.add_task(gentink.replace_delegator,
                      old_delegator=old_del,
                      new_delegator=new_del)
 
     gentink.run_tasks()
-    end_time = time.time()
-    print(f'Time elapsed: {end_time-start_time:.3f}s', end=' ')
 
     with open(out_filename, 'r') as new_file:
         new_genesis = json.load(new_file)
@@ -353,14 +325,11 @@ def test_replace_validator(input_data):
     new_val.operator_address = 'e'
     new_val.consensus_address = 'f'
 
-    start_time = time.time()
     gentink = GenesisTinker(input_file=in_filename, output_file=out_filename)
     gentink.add_task(gentink.replace_validator,
                      old_validator=old_val,
                      new_validator=new_val)
     gentink.run_tasks()
-    end_time = time.time()
-    print(f'Time elapsed: {end_time-start_time:.3f}s', end=' ')
 
     # Check results
     with open(out_filename, 'r') as new_file:
@@ -558,6 +527,156 @@ def test_replace_validator(input_data):
         assert new_val.consensus_address in val_sign_addrs
 
 
+def test_byte_tasks_single_pass(input_data, tmp_path):
+    data = input_data
+    new_del = Delegator()
+    new_del.address = 'cosmos123'
+    new_del.public_key = 'key456'
+    new_val = Validator()
+    new_val.self_delegation_address = 'a'
+    new_val.self_delegation_public_key = 'b'
+    new_val.address = 'c'
+    new_val.public_key = 'd'
+    new_val.operator_address = 'e'
+    new_val.consensus_address = 'f'
+
+    in_filename = data['input_file']
+    out_filename = data['output_file']
+    step_filename = str(tmp_path / 'step_genesis.json')
+    sequential_filename = str(tmp_path / 'sequential_genesis.json')
+
+    # One run per task
+    gentink = GenesisTinker(input_file=in_filename, output_file=step_filename)
+    gentink.add_task(gentink.replace_validator,
+                     old_validator=data['target_validator'],
+                     new_validator=new_val)
+    gentink.run_tasks()
+    gentink = GenesisTinker(input_file=step_filename,
+                            output_file=sequential_filename)
+    gentink.add_task(gentink.replace_delegator,
+                     old_delegator=data['target_delegator'],
+                     new_delegator=new_del)
+    gentink.run_tasks()
+
+    # Both tasks in one pass
+    gentink = GenesisTinker(input_file=in_filename, output_file=out_filename)
+    gentink.add_task(gentink.replace_validator,
+                     old_validator=data['target_validator'],
+                     new_validator=new_val)
+    gentink.add_task(gentink.replace_delegator,
+                     old_delegator=data['target_delegator'],
+                     new_delegator=new_del)
+    assert gentink.run_tasks() is None
+
+    with open(sequential_filename, 'rb') as sequential_file, \
+            open(out_filename, 'rb') as new_file:
+        assert sequential_file.read() == new_file.read()
+
+
+def test_byte_tasks_conflict(input_data, tmp_path):
+    data = input_data
+    new_val = Validator()
+    new_val.self_delegation_address = 'cosmos1new'
+    new_val.self_delegation_public_key = 'b'
+    new_val.address = 'c'
+    new_val.public_key = 'd'
+    new_val.operator_address = 'e'
+    new_val.consensus_address = 'f'
+    # Replaces the address introduced by the validator task
+    old_del = Delegator()
+    old_del.address = 'cosmos1new'
+    old_del.public_key = 'b'
+    new_del = Delegator()
+    new_del.address = 'cosmos123'
+    new_del.public_key = 'key456'
+
+    # One run per task
+    step_filename = str(tmp_path / 'step_genesis.json')
+    sequential_filename = str(tmp_path / 'sequential_genesis.json')
+    gentink = GenesisTinker(input_file=data['input_file'],
+                            output_file=step_filename)
+    gentink.add_task(gentink.replace_validator,
+                     old_validator=data['target_validator'],
+                     new_validator=new_val)
+    gentink.run_tasks()
+    gentink = GenesisTinker(input_file=step_filename,
+                            output_file=sequential_filename)
+    gentink.add_task(gentink.replace_delegator,
+                     old_delegator=old_del,
+                     new_delegator=new_del)
+    gentink.run_tasks()
+
+    # Conflicting replacements are applied one after the other
+    gentink = GenesisTinker(input_file=data['input_file'],
+                            output_file=data['output_file'])
+    gentink.add_task(gentink.replace_validator,
+                     old_validator=data['target_validator'],
+                     new_validator=new_val)
+    gentink.add_task(gentink.replace_delegator,
+                     old_delegator=old_del,
+                     new_delegator=new_del)
+    assert gentink.run_tasks() is None
+    assert not gentink.tasks()
+    with open(sequential_filename, 'rb') as sequential_file, \
+            open(data['output_file'], 'rb') as new_file:
+        assert sequential_file.read() == new_file.read()
+
+
+@pytest.mark.parametrize('with_json_task', [False, True])
+def test_in_memory_bytes_phase(input_data, tmp_path, with_json_task):
+    data = input_data
+    new_val = Validator()
+    new_val.self_delegation_address = 'a'
+    new_val.self_delegation_public_key = 'b'
+    new_val.address = 'c'
+    new_val.public_key = 'd'
+    new_val.operator_address = 'e'
+    new_val.consensus_address = 'f'
+    outputs = []
+    for in_memory in [False, True]:
+        out_filename = str(tmp_path / f'genesis_{in_memory}.json')
+        preprocessing_filename = tmp_path / f'preprocessing_{in_memory}.json'
+        gentink = GenesisTinker(input_file=data['input_file'],
+                                output_file=out_filename,
+                                preprocessing_file=str(preprocessing_filename),
+                                in_memory=in_memory)
+        gentink.add_task(gentink.replace_validator,
+                         old_validator=data['target_validator'],
+                         new_validator=new_val)
+        if with_json_task:
+            gentink.add_task(gentink.set_chain_id, chain_id='in-memory')
+        assert gentink.run_tasks() is None
+        with open(out_filename, 'rb') as out_file:
+            outputs.append(out_file.read())
+        if in_memory:
+            assert not preprocessing_filename.exists()
+
+    assert outputs[0] == outputs[1]
+
+
+@pytest.mark.parametrize('with_json_task', [False, True])
+def test_shasum_matches_output(input_data, capsys, with_json_task):
+    data = input_data
+    new_del = Delegator()
+    new_del.address = 'cosmos123'
+    new_del.public_key = 'key456'
+
+    gentink = GenesisTinker(input_file=data['input_file'],
+                            output_file=data['output_file'])
+    gentink.add_task(gentink.replace_delegator,
+                     old_delegator=data['target_delegator'],
+                     new_delegator=new_del)
+    if with_json_task:
+        gentink.add_task(gentink.set_chain_id, chain_id='hashed')
+    gentink.run_tasks()
+
+    with open(data['output_file'], 'rb') as out_file:
+        digest = sha256(out_file.read()).hexdigest()
+    assert f'SHA256SUM: {digest}' in capsys.readouterr().out
+    if with_json_task:
+        assert gentink.generate_shasum() == digest
+
+
 def test_increase_balance(input_data):
     # Tests increase_supply as well
     data = (input_data)
@@ -568,8 +687,6 @@ def test_increase_balance(input_data):
     delta = 1000000  # 1atom
     denom = 'uatom'
 
-    start_time = time.time()
-
     gentink = GenesisTinker(input_file=in_filename, output_file=out_filename)
     gentink.add_task(gentink.increase_balance,
                      address=address,
@@ -577,9 +694,6 @@ def test_increase_balance(input_data):
                      denom=denom)
     gentink.run_tasks()
 
-    end_time = time.time()
-    print(f'Time elapsed: {end_time-start_time:.3f}s', end=' ')
-
     with open(out_filename, 'r') as new_file:
         new_genesis = json.load(new_file)
 
@@ -639,8 +753,6 @@ def test_increase_delegator_stake_to_validator(input_data):
     delta = 1000000
     power_increase = 1
 
-    start_time = time.time()
-
     gentink = GenesisTinker(input_file=in_filename, output_file=out_filename)
     gentink.bonded_pool_address = bonded_pool
     gentink.not_bonded_pool_address = not_bonded_pool
@@ -651,9 +763,6 @@ def test_increase_delegator_stake_to_validator(input_data):
                      increase={'amount': delta, 'denom': stake_denom})
     gentink.run_tasks()
 
-    end_time = time.time()
-    print(f'Time elapsed: {end_time-start_time:.3f}s', end=' ')
-
     with open(out_filename, 'r') as new_file:
         new_genesis = json.load(new_file)
 
@@ -0,0 +1,91 @@
+"""
+Test producing several genesis variants from one load.
+python -m pytest -v tests/test_variants.py
+"""
+
+import json
+from hashlib import sha256
+import pytest
+import cow_tree
+from cosmos_genesis_tinker import BYTES_TASKS, GenesisTinker, Delegator
+
+OLD_DELEGATOR = {'address': 'cosmos1lj54q70v2mt9e7c5mtp5xgg5n9c0hkas60kec9',
+                 'public_key': 'Aiu5OMUoNnBnWiWOC/Z/Luyq2XFROqubW5oP4Y8y/Lzz'}
+
+
+def delegator(address, public_key):
+    new_delegator = Delegator()
+    new_delegator.address = address
+    new_delegator.public_key = public_key
+    return new_delegator
+
+
+def variant_tasks():
+    old_del = delegator(**OLD_DELEGATOR)
+    return {
+        'chain': [('set_chain_id', {'chain_id': 'variant-1'}),
+                  ('set_voting_period', {'voting_period': '60s'})],
+        'balance': [('increase_balance',
+                     {'address': OLD_DELEGATOR['address'], 'amount': 5})],
+        'delegator': [('replace_delegator',
+                       {'old_delegator': old_del,
+                        'new_delegator': delegator('cosmos123', 'key456')}),
+                      ('increase_balance',
+                       {'address': 'cosmos123', 'amount': 5})],
+        'same_delegator': [('replace_delegator',
+                            {'old_delegator': old_del,
+                             'new_delegator': delegator('cosmos123',
+                                                        'key456')})],
+        'empty': []
+    }
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_variants_match_single_runs(tmp_path, workers):
+    variants = {str(tmp_path / f'{name}.json'): tasks
+                for name, tasks in variant_tasks().items()}
+
+    gentink = GenesisTinker(input_file='tests/fresh_genesis.json')
+    shasums = gentink.run_variants(variants, workers=workers)
+
+    for output_file, tasks in variants.items():
+        expected_file = output_file + '.expected'
+        single = GenesisTinker(input_file='tests/fresh_genesis.json',
+                               output_file=expected_file,
+                               preprocessing_file=str(tmp_path / 'pre.json'))
+        for name, kwargs in tasks:
+            single.add_task(getattr(single, name), **kwargs)
+        if not tasks:
+            single.add_task(single.increase_supply, increase=0)
+        assert single.run_tasks() is None
+        with open(output_file, 'rb') as variant_file, \
+                open(expected_file, 'rb') as single_file:
+            variant = variant_file.read()
+            expected = single_file.read()
+        # Byte-only runs keep the preprocessed layout instead of json.dump's
+        assert json.loads(variant) == json.loads(expected)
+        if any(name not in BYTES_TASKS for name, _ in tasks):
+            assert variant == expected
+        assert shasums[output_file] == sha256(variant).hexdigest()
+
+
+def test_cow_view_shares_untouched_subtrees():
+    with open('tests/fresh_genesis.json', 'r', encoding='utf8') as file:
+        base = json.load(file)
+    original = json.dumps(base)
+    view = cow_tree.view(base)
+
+    view['app_state']['bank']['balances'][0]['coins'].append(
+        {'denom': 'new', 'amount': '1'})
+    view['app_state']['gov']['params']['voting_period'] = '1s'
+    view['chain_id'] = 'changed'
+    for balance in view['app_state']['bank']['balances']:
+        balance['address'] = 'cosmos1x'
+
+    assert json.dumps(base) == original
+    assert dict.__getitem__(view['app_state'], 'ibc') is \
+        base['app_state']['ibc']
+    assert view['app_state']['bank']['balances'][0]['coins'][-1] == \
+        {'denom': 'new', 'amount': '1'}
+    with cow_tree.reading():
+        assert json.loads(json.dumps(view))['chain_id'] == 'changed'